@@ -0,0 +1,37 @@
+from src.ConditionalRandomFields.Ablation import FeatureAblation, prune_model
+import argparse
+import logging
+import json
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Parallel leave-one-out / forward-selection ablation of the feature templates")
+    parser.add_argument("--data", default="data/aug_TIM.csv")
+    parser.add_argument("--epochs", type=int, default=3, help="Epochs per variant")
+    parser.add_argument("--forward-rounds", type=int, default=None, help="Forward-selection rounds (defaults to one per template)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="data/ablation.json")
+    parser.add_argument("--prune", default=None, help="Trained weights file to export a pruned copy of")
+    parser.add_argument("--pruned-output", default="data/weights.pruned.json")
+    parser.add_argument("--threshold", type=float, default=1e-3, help="Templates with |weight| at or below this are pruned")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    ablation = FeatureAblation(filename=args.data, epochs=args.epochs, workers=args.workers, seed=args.seed,
+                               forward_rounds=args.forward_rounds)
+    print("🧪 Starting feature ablation...")
+    ablation.run()
+    ablation.save(args.output)
+    print(ablation.report())
+
+    if args.prune:
+        with open(args.prune, "r") as f:
+            model = json.load(f)
+        pruned = prune_model(model, threshold=args.threshold, firing=ablation.firing)
+        with open(args.pruned_output, "w") as f:
+            json.dump(pruned, f)
+        print(f"✂️ Pruned {pruned['pruned'] or 'no templates'} -> {args.pruned_output} ({len(pruned['templates'])} templates left)")
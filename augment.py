@@ -1,13 +1,32 @@
-from src.ConditionalRandomFields.CRFFunctions import Augment
+from src.ConditionalRandomFields.CRFFunctions import Augment, TagCache
+from src.ConditionalRandomFields.Compact import compact_file
+import argparse
 
-def PrepareData():
+def PrepareData(compact=False, workers=None, incremental=False, tag_cache_path="data/tag_cache.json", output="data/aug_TIM.csv"):
     augmenter = Augment()
-    augmenter.split_events()
-    augmenter.concat_predicates()
-    augmenter.store_sequences()
-    augmenter.save_data()
+    if incremental:
+        tag_cache = TagCache(tag_cache_path)
+        summary = augmenter.augment_incremental(tag_cache=tag_cache, workers=workers)
+        if summary["removed"]:
+            tag_cache.save(tag_cache_path)
+    else:
+        augmenter.augment_file(output, workers=workers)
+
+    if compact and output.endswith(".csv"):
+        output, report = compact_file(output)
+        print(f"🗜️ {report['rows']} rows -> {report['templates']} templates in {output} "
+              f"(compression {report['compression_ratio']:.1f}x)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Build the augmented training data")
+    parser.add_argument("--compact", action="store_true", help="Also write a template-deduplicated, weighted copy")
+    parser.add_argument("--workers", type=int, default=None, help="Processes used to label token sequences")
+    parser.add_argument("--incremental", action="store_true", help="Only augment raw event rows not in data/aug_manifest.json")
+    parser.add_argument("--output", default="data/aug_TIM.csv", help="Output file; .parquet or .arrow writes the columnar format (not with --incremental)")
+    return parser.parse_args()
 
 if __name__ == "__main__":
+    args = parse_args()
     print("🚀 Starting data preparation...")
-    PrepareData()
+    PrepareData(compact=args.compact, workers=args.workers, incremental=args.incremental, output=args.output)
     print("✅ Data preparation complete!")
\ No newline at end of file
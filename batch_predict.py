@@ -0,0 +1,29 @@
+from src.ConditionalRandomFields.BatchPredict import BatchPredictor
+import argparse
+import logging
+import os
+import sys
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Parse utterances from a file or stdin into JSONL across a process pool")
+    parser.add_argument("input", nargs="?", default="-", help="One utterance per line; '-' reads stdin")
+    parser.add_argument("--output", default="-", help="JSONL destination; '-' writes stdout")
+    parser.add_argument("--model", default="data/weights.json", help="weights.json or .crfm model bundle")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker processes (0 runs in-process)")
+    parser.add_argument("--batch-size", type=int, default=32, help="Utterances per task sent to a worker")
+    parser.add_argument("--depth", type=int, default=None, help="Batches in flight (defaults to twice the workers)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    predictor = BatchPredictor(args.model, workers=args.workers, batch_size=args.batch_size, depth=args.depth)
+    stats = predictor.run(args.input, args.output)
+    # Stats go to stderr so they never mix with JSONL on stdout
+    print(f"⚡ Parsed {stats['utterances']} utterances in {stats['seconds']:.2f}s "
+          f"({stats['utterances_per_second']:.1f}/s, {stats['failures']} failed) with {args.workers} workers", file=sys.stderr)
+    if stats["loader"] is not None:
+        print(f"📦 Writer waited {stats['loader']['stall_seconds']:.2f}s on workers | "
+              f"avg. batches ready {stats['loader']['avg_queue_depth']:.1f}/{predictor.depth}", file=sys.stderr)
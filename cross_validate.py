@@ -0,0 +1,24 @@
+from src.ConditionalRandomFields.CrossValidate import CrossValidate
+import argparse
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Run k-fold cross-validation of the CRF in parallel")
+    parser.add_argument("--data", default="data/aug_TIM.csv")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--num-features", type=int, default=None, help="Weight count (defaults to one per feature template)")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to one per fold)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    validator = CrossValidate(filename=args.data, folds=args.folds, epochs=args.epochs, seed=args.seed,
+                              num_features=args.num_features, workers=args.workers)
+    print(f"🔀 Running {args.folds}-fold cross-validation on {args.data}...")
+    validator.run()
+    print(validator.report())
@@ -0,0 +1,28 @@
+from src.ConditionalRandomFields.Search import HyperparameterSearch
+import argparse
+import logging
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Parallel hyperparameter search with successive halving")
+    parser.add_argument("--data", default="data/aug_TIM.csv")
+    parser.add_argument("--strategy", choices=["grid", "random"], default="random")
+    parser.add_argument("--trials", type=int, default=27, help="Configurations to sample for random search")
+    parser.add_argument("--min-epochs", type=int, default=1)
+    parser.add_argument("--max-epochs", type=int, default=9)
+    parser.add_argument("--eta", type=int, default=3, help="Keep the best 1/eta configurations after each rung")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="data/search_leaderboard.json")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    search = HyperparameterSearch(filename=args.data, strategy=args.strategy, trials=args.trials, min_epochs=args.min_epochs,
+                                  max_epochs=args.max_epochs, eta=args.eta, workers=args.workers, seed=args.seed)
+    print("🔎 Starting hyperparameter search...")
+    search.run()
+    search.save(args.output)
+    print(search.report())
@@ -0,0 +1,145 @@
+import json
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.ConditionalRandomFields.FeatureFunctions import FeatureFunctions
+from src.ConditionalRandomFields.Search import _init_worker, run_trial, prepare_data
+from src.ConditionalRandomFields.Templates import FEATURE_TEMPLATES, select_templates
+from src.ConditionalRandomFields.Vocabulary import VOCAB
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def feature_firing(data, tag_cache, templates=FEATURE_TEMPLATES): #MARK: Firing counts
+    """
+    How often every template fires on the gold labels of `data`: rows it fires in,
+    its summed value, and the positions where its conditions hold at all.
+    """
+    counts = {name: {"rows": 0, "value": 0.0, "active_positions": 0} for name in templates.names}
+    for text, sequence in zip(data["full_text"], data["sequence"]):
+        label = sequence.split(" ") if isinstance(sequence, str) else list(sequence)
+        tags = tag_cache.get(text)
+        if len(tags) != len(label):
+            continue
+        functions = FeatureFunctions(tags, label, None, text, templates)
+        values = functions.feature_matrix(VOCAB.encode_labels(label)[None, :])[0]
+        active = templates.active_positions(functions.tags, functions.feature_text, text).sum(axis=1)
+        for name, value, positions in zip(templates.names, values, active):
+            counts[name]["rows"] += int(value != 0)
+            counts[name]["value"] += float(value)
+            counts[name]["active_positions"] += int(positions)
+    return counts
+
+def prune_model(model, threshold=1e-3, firing=None): #MARK: Pruning
+    """
+    Copy of a saved model (the weights.json dict) without the templates whose weight
+    is within `threshold` of zero or that never fired (per `firing`, if given).
+    Later weights (hashed, transition) move down so the layout stays contiguous.
+    """
+    names = model.get("templates") or FEATURE_TEMPLATES.names
+    size = model.get("size", len(model["weights"]))
+    weights = np.zeros(size)
+    for index, weight in model["weights"].items():
+        weights[int(index)] = float(weight)
+
+    dead = {name for name, counts in (firing or {}).items() if counts["rows"] == 0}
+    keep = [i for i, name in enumerate(names) if abs(weights[i]) > threshold and name not in dead]
+    kept = np.r_[weights[keep], weights[len(names):]]
+    pruned = dict(model)
+    pruned["templates"] = [names[i] for i in keep]
+    pruned["weights"] = {str(i): float(weight) for i, weight in enumerate(kept) if weight != 0}
+    pruned["size"] = len(kept)
+    pruned["pruned"] = [name for name in names if name not in pruned["templates"]]
+    return pruned
+
+class FeatureAblation: #MARK: Ablation
+    """
+    Leave-one-out and greedy forward-selection ablations of the feature templates.
+
+    Every variant of a round trains in a process pool with the same seed, split and
+    hyperparameters, so validation losses are comparable. Forward selection adds, each
+    round, the template that lowers validation loss most and stops when none does.
+    """
+    def __init__(self, filename="data/aug_TIM.csv", names=None, epochs=3, workers=None, seed=0, config=None,
+                 forward_rounds=None, tag_cache_path="data/tag_cache.json"):
+        self.filename = filename
+        self.names = list(names or FEATURE_TEMPLATES.names)
+        self.epochs = epochs
+        self.workers = workers
+        self.seed = seed
+        self.config = config or {"learning_rate": 0.008, "l2_strength": 0.001, "clip": 0.5, "drop_rate": 0.2}
+        self.forward_rounds = forward_rounds if forward_rounds is not None else len(self.names)
+        self.tag_cache_path = tag_cache_path
+        self.firing = {}
+        self.variants = []
+        self.forward_order = []
+
+    def prepare(self):
+        data, tag_cache = prepare_data(self.filename, self.tag_cache_path)
+        self.firing = feature_firing(data, tag_cache, select_templates(self.names))
+
+    def run_round(self, pool, variants):
+        futures = {pool.submit(run_trial, self.filename, self.config, 0, self.epochs, None, self.seed, None, variant["features"]): variant
+                   for variant in variants}
+        for future in as_completed(futures):
+            variant = futures[future]
+            try:
+                result = future.result()
+                variant.update(result, weights=dict(zip(variant["features"], result["weights"])))
+            except Exception as e:
+                logger.error(f"Variant {variant['kind']} {variant.get('feature')} failed: {e}")
+                variant["validation_loss"] = float("inf")
+        self.variants.extend(variants)
+        return variants
+
+    def run(self):
+        self.prepare()
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.tag_cache_path,)) as pool:
+            full = {"kind": "full", "feature": None, "features": self.names}
+            leave_one_out = [{"kind": "leave_one_out", "feature": name, "features": [other for other in self.names if other != name]}
+                             for name in self.names if len(self.names) > 1]
+            self.run_round(pool, [full] + leave_one_out)
+            logger.info(f"Full model validation loss {full['validation_loss']:.4f}")
+
+            selected, best_loss = [], float("inf")
+            for round_number in range(self.forward_rounds):
+                candidates = [name for name in self.names if name not in selected]
+                if not candidates:
+                    break
+                variants = self.run_round(pool, [{"kind": "forward", "round": round_number, "feature": name, "features": selected + [name]}
+                                                 for name in candidates])
+                best = min(variants, key=lambda variant: variant["validation_loss"])
+                if best["validation_loss"] >= best_loss:
+                    break
+                selected.append(best["feature"])
+                best_loss = best["validation_loss"]
+                logger.info(f"Forward round {round_number + 1}: + {best['feature']} -> {best_loss:.4f}")
+            self.forward_order = selected
+        return self.variants
+
+    def summary(self):
+        """Per template: firing counts, validation loss delta when left out (positive = it helps), forward rank."""
+        full = next(variant for variant in self.variants if variant["kind"] == "full")
+        rows = {}
+        for name in self.names:
+            left_out = next((variant for variant in self.variants if variant["kind"] == "leave_one_out" and variant["feature"] == name), None)
+            rows[name] = {
+                **self.firing.get(name, {}),
+                "weight": full.get("weights", {}).get(name),
+                "leave_one_out_delta": left_out["validation_loss"] - full["validation_loss"] if left_out is not None else None,
+                "forward_rank": self.forward_order.index(name) + 1 if name in self.forward_order else None,
+            }
+        return rows
+
+    def save(self, filename="data/ablation.json"):
+        with open(filename, "w") as f:
+            json.dump({"features": self.summary(), "forward_order": self.forward_order, "variants": self.variants}, f, indent=2)
+        logger.info(f"Ablation results saved to {filename}")
+
+    def report(self):
+        lines = [f"{'feature':>8} | {'rows':>6} | {'active':>7} | {'weight':>7} | {'LOO Δ':>8} | forward"]
+        for name, row in self.summary().items():
+            delta = f"{row['leave_one_out_delta']:>+8.4f}" if row["leave_one_out_delta"] is not None else f"{'-':>8}"
+            weight = f"{row['weight']:>7.3f}" if row["weight"] is not None else f"{'-':>7}"
+            lines.append(f"{name:>8} | {row.get('rows', 0):>6} | {row.get('active_positions', 0):>7} | {weight} | {delta} | {row['forward_rank'] or '-'}")
+        return "\n".join(lines)
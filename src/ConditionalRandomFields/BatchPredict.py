@@ -0,0 +1,100 @@
+import sys
+import json
+import time
+import logging
+from src.ConditionalRandomFields.CRF import Predict
+from src.ConditionalRandomFields.CRFFunctions import TagCache
+from src.ConditionalRandomFields.Loader import DataLoader
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_MODEL = None
+
+def _init_worker(filename, quiet=True):
+    # One resident model per worker process, loaded before its first batch
+    global _MODEL
+    if quiet:
+        logging.getLogger("src.ConditionalRandomFields.CRF").setLevel(logging.WARNING)
+    _MODEL = Predict("", filename)
+
+def predict_batch(texts): #MARK: Batch worker
+    """Parse records for `texts`, tagged with one `nlp.pipe` pass over the batch."""
+    tags = TagCache().build(texts)
+    records = []
+    for text in texts:
+        predictor = Predict(text, model=_MODEL)
+        labels = predictor.predict(tags=tags.get(text))
+        parsed = (predictor.process_labels(labels) or {}) if labels else {}
+        records.append({"text": text, "labels": list(labels) if labels else None, "task": parsed.get("task"),
+                        "time": parsed.get("time"), "date": parsed.get("date"), "confidence": predictor.confidence})
+    return records
+
+def read_utterances(source):
+    """Non-empty lines of a file (or stdin for "-"), read lazily."""
+    f = sys.stdin if source == "-" else open(source, "r")
+    try:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+class BatchPredictor: #MARK: Batch predictor
+    """
+    Streams utterances through `workers` processes that each keep one model resident.
+
+    Batches are read and dispatched lazily, at most `depth` ahead of the writer, so
+    memory stays flat however long the input is; records are written as JSONL in
+    input order.
+    """
+    def __init__(self, filename="data/weights.json", workers=4, batch_size=32, depth=None, quiet=True):
+        self.filename = filename
+        self.workers = workers
+        self.batch_size = max(1, batch_size)
+        self.depth = depth or max(1, 2 * workers)
+        self.quiet = quiet
+        self.loader = None
+        self.utterances = 0
+        self.failures = 0
+        self.seconds = 0.0
+
+    def records(self, utterances):
+        self.loader = DataLoader(batched(utterances, self.batch_size), predict_batch, workers=self.workers, depth=self.depth,
+                                 backend="process", initializer=_init_worker, initargs=(self.filename, self.quiet))
+        for records in self.loader:
+            for record in records:
+                self.utterances += 1
+                self.failures += record["labels"] is None
+                yield record
+
+    def run(self, source="-", output="-"):
+        start = time.perf_counter()
+        out = sys.stdout if output == "-" else open(output, "w")
+        try:
+            for record in self.records(read_utterances(source)):
+                out.write(json.dumps(record) + "\n")
+        finally:
+            if out is not sys.stdout:
+                out.close()
+            else:
+                out.flush()
+            self.seconds = time.perf_counter() - start
+        return self.stats()
+
+    def stats(self):
+        return {"utterances": self.utterances, "failures": self.failures, "seconds": self.seconds,
+                "utterances_per_second": self.utterances / self.seconds if self.seconds > 0 else 0.0,
+                "loader": self.loader.stats() if self.loader is not None else None}
@@ -0,0 +1,161 @@
+import os
+import json
+import struct
+import hashlib
+import logging
+import numpy as np
+from src.ConditionalRandomFields.Vocabulary import VOCAB, Vocabulary
+from src.ConditionalRandomFields.Templates import FeatureTemplates
+from src.ConditionalRandomFields.Hashing import HashedFeatures
+from src.ConditionalRandomFields.Transitions import Transitions
+from src.ConditionalRandomFields.Gazetteer import Gazetteer
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+BUNDLE_MAGIC = b"CRFMODEL"
+BUNDLE_VERSION = 1
+BUNDLE_SUFFIX = ".crfm"
+# magic, format version, header length
+PREAMBLE = struct.Struct("<8sII")
+ALIGNMENT = 64
+WEIGHT_DTYPE = "<f8"
+
+class ModelBundleError(ValueError):
+    """The file is not a model bundle, is corrupted, or does not fit this code."""
+
+def is_bundle(filename):
+    return str(filename).endswith(BUNDLE_SUFFIX)
+
+def _canonical(header):
+    return json.dumps(header, sort_keys=True, separators=(",", ":")).encode("utf-8")
+
+def _checksum(header, weight_bytes):
+    digest = hashlib.sha256(_canonical({key: value for key, value in header.items() if key != "checksum"}))
+    digest.update(weight_bytes)
+    return digest.hexdigest()
+
+def write_bundle(filename, weights, templates: FeatureTemplates, hashing: HashedFeatures = None, transitions: Transitions = None,
+                 tagger=None, vocab: Vocabulary = VOCAB, metadata=None): #MARK: Write
+    """
+    Write a model bundle: a fixed preamble, a JSON header with everything needed to
+    rebuild the model (template spec, vocabularies, hashing/transition/gazetteer/tagger
+    config) and a SHA-256 checksum, then the weights as raw little-endian float64,
+    aligned so they can be memory-mapped.
+    """
+    weights = np.ascontiguousarray(np.asarray(weights, dtype=WEIGHT_DTYPE))
+    expected = templates.size + (hashing.size if hashing is not None else 0) + (transitions.size if transitions is not None else 0)
+    if len(weights) != expected:
+        raise ModelBundleError(f"Expected {expected} weights for this model layout, got {len(weights)}")
+
+    header = {
+        "format": BUNDLE_VERSION,
+        "labels": vocab.labels,
+        "tags": vocab.tags,
+        "lexicon": vocab.lexicon,
+        "templates": templates.templates,
+        "gazetteer": templates.gazetteer.config() if templates.gazetteer is not None else None,
+        "hashing": hashing.config() if hashing is not None else None,
+        "transitions": transitions.config() if transitions is not None else None,
+        "tagger": tagger,
+        "weights": {"dtype": WEIGHT_DTYPE, "count": len(weights)},
+        "metadata": metadata or {},
+    }
+    # Checksum what a reader will parse: JSON turns the templates' int offsets into string keys
+    header = json.loads(json.dumps(header))
+    header["checksum"] = _checksum(header, weights.tobytes())
+    encoded = json.dumps(header).encode("utf-8")
+    data_offset = -(-(PREAMBLE.size + len(encoded)) // ALIGNMENT) * ALIGNMENT
+
+    tmp_path = f"{filename}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(PREAMBLE.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(encoded)))
+        f.write(encoded)
+        f.write(b"\0" * (data_offset - PREAMBLE.size - len(encoded)))
+        f.write(weights.tobytes())
+    os.replace(tmp_path, filename)
+    logger.info(f"Wrote model bundle with {len(weights)} weights and {templates.size} templates to {filename}")
+    return filename
+
+class ModelBundle: #MARK: Load
+    """
+    A loaded model bundle. `weights` is a read-only memory map into the file, so
+    loading costs a header parse (plus one checksum pass when `verify`) whatever the
+    weight count. Any schema mismatch raises ModelBundleError immediately.
+
+    `shared` (a dict) lets many bundles reuse one compiled FeatureTemplates and
+    HashedFeatures per distinct spec instead of compiling their own.
+    """
+    def __init__(self, header, weights, filename=None, shared=None):
+        self.header = header
+        self.weights = weights
+        self.filename = filename
+        shared = {} if shared is None else shared
+        spec = _canonical({"templates": header["templates"], "gazetteer": header.get("gazetteer")})
+        self.shared_keys = [("templates", spec)]
+        if ("templates", spec) not in shared:
+            gazetteer = Gazetteer.from_config(header["gazetteer"]) if header.get("gazetteer") else None
+            shared[("templates", spec)] = FeatureTemplates(header["templates"], gazetteer=gazetteer)
+        self.templates = shared[("templates", spec)]
+        self.hashing = None
+        if header.get("hashing"):
+            spec = _canonical(header["hashing"])
+            self.shared_keys.append(("hashing", spec))
+            if ("hashing", spec) not in shared:
+                shared[("hashing", spec)] = HashedFeatures.from_config(header["hashing"])
+            self.hashing = shared[("hashing", spec)]
+        self.transitions = Transitions.from_config(header["transitions"]) if header.get("transitions") else None
+        self.tagger = header.get("tagger")
+
+    @property
+    def nbytes(self):
+        return int(self.weights.nbytes)
+
+    @classmethod
+    def load(cls, filename, verify=True, vocab: Vocabulary = VOCAB, shared=None):
+        with open(filename, "rb") as f:
+            preamble = f.read(PREAMBLE.size)
+            if len(preamble) < PREAMBLE.size:
+                raise ModelBundleError(f"{filename} is too short to be a model bundle")
+            magic, version, header_length = PREAMBLE.unpack(preamble)
+            if magic != BUNDLE_MAGIC:
+                raise ModelBundleError(f"{filename} is not a model bundle")
+            if version != BUNDLE_VERSION:
+                raise ModelBundleError(f"{filename} has bundle format {version}, this code reads format {BUNDLE_VERSION}")
+            try:
+                header = json.loads(f.read(header_length).decode("utf-8"))
+            except ValueError as e:
+                raise ModelBundleError(f"{filename} has a corrupted header: {e}") from None
+
+        cls.check_schema(header, vocab, filename)
+        data_offset = -(-(PREAMBLE.size + header_length) // ALIGNMENT) * ALIGNMENT
+        count = header["weights"]["count"]
+        if os.path.getsize(filename) != data_offset + count * np.dtype(WEIGHT_DTYPE).itemsize:
+            raise ModelBundleError(f"{filename} is truncated or has trailing data")
+        weights = np.memmap(filename, dtype=WEIGHT_DTYPE, mode="r", offset=data_offset, shape=(count,)) if count else np.zeros(0)
+        if verify and _checksum(header, memoryview(weights).cast("B")) != header.get("checksum"):
+            raise ModelBundleError(f"{filename} failed its checksum")
+
+        bundle = cls(header, weights, filename, shared=shared)
+        expected = bundle.templates.size + (bundle.hashing.size if bundle.hashing else 0) + (bundle.transitions.size if bundle.transitions else 0)
+        if count != expected:
+            raise ModelBundleError(f"{filename} holds {count} weights but its templates/hashing/transitions need {expected}")
+        return bundle
+
+    @staticmethod
+    def check_schema(header, vocab, filename=None):
+        # Label, tag and lexicon codes are baked into the weights' meaning, so they must match exactly
+        for key, current in (("labels", vocab.labels), ("tags", vocab.tags), ("lexicon", vocab.lexicon)):
+            if header.get(key) != current:
+                raise ModelBundleError(f"{filename} was built with {key} {header.get(key)}, this code uses {current}")
+        if header.get("weights", {}).get("dtype") != WEIGHT_DTYPE:
+            raise ModelBundleError(f"{filename} stores weights as {header.get('weights', {}).get('dtype')}, expected {WEIGHT_DTYPE}")
+
+    def check_tagger(self, tagger):
+        """Fail on a different tagger model; a different version of the same model only warns."""
+        if self.tagger is None or tagger is None:
+            return
+        if self.tagger.get("name") != tagger.get("name"):
+            raise ModelBundleError(f"{self.filename} was trained with tagger {self.tagger.get('name')}, not {tagger.get('name')}")
+        if self.tagger.get("version") != tagger.get("version"):
+            logger.warning(f"{self.filename} was trained with {self.tagger.get('name')} {self.tagger.get('version')}, running {tagger.get('version')}")
@@ -2,182 +2,473 @@ import pandas as pd
 import numpy as np
 import logging
 import json
+import math
+import os
 import sys
-from src.ConditionalRandomFields.CRFFunctions import Augment, Process, FeatureFunctions, Score, BackProp
+import random
+import itertools
+from functools import partial
+from src.ConditionalRandomFields.CRFFunctions import Augment, Process, FeatureFunctions, Score, BackProp, TagCache, tagger_config
+from src.ConditionalRandomFields.Checkpoint import Checkpoint
+from src.ConditionalRandomFields.Split import SplitIndex
+from src.ConditionalRandomFields.Loader import DataLoader
+from src.ConditionalRandomFields.Sampling import HardExampleSampler
+from src.ConditionalRandomFields.Labeling import tim_frame
+from src.ConditionalRandomFields.Dataset import is_columnar, read_frame, TRAINING_COLUMNS
+from src.ConditionalRandomFields.Vocabulary import VOCAB
+from src.ConditionalRandomFields.Templates import FeatureTemplates, FEATURE_TEMPLATES, select_templates
+from src.ConditionalRandomFields.Gazetteer import Gazetteer
+from src.ConditionalRandomFields.Bundle import ModelBundle, ModelBundleError, write_bundle, is_bundle
+from src.ConditionalRandomFields.Hashing import HashedFeatures
+from src.ConditionalRandomFields.Sparse import SparseWeights
+from src.ConditionalRandomFields.Transitions import Transitions
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+def save_model(filename, weights, templates: FeatureTemplates, hashing: HashedFeatures = None, transitions: Transitions = None,
+               metadata=None): #MARK: Save model
+    # Only non-zero weights are written; "size" restores the zeros on load
+    weights = SparseWeights.load(weights)
+    model = {"weights": weights.to_dict(), "size": len(weights), "templates": templates.names}
+    if hashing is not None:
+        model["hashing"] = hashing.config()
+    if transitions is not None:
+        model["transitions"] = transitions.config()
+    if templates.gazetteer is not None:
+        model["gazetteer"] = templates.gazetteer.config()
+    if metadata:
+        model["metadata"] = metadata
+    # Written to a temporary file first so a running predictor never reads a half-written model
+    tmp_path = f"{filename}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(model, f)
+    os.replace(tmp_path, filename)
+    return filename
+
 class Prepare: #MARK: Prepare
-    def __init__(self, filename="data/TIM.csv"):
+    def __init__(self, filename="data/TIM.csv", incremental=False, tag_cache_path="data/tag_cache.json"):
         self.filename = filename
         self.augmenter = Augment() 
 
         try:
-            self.augmenter.split_events()
-            self.augmenter.concat_predicates()
-            self.augmenter.store_sequences()
-            self.augmenter.save_data()
+            if incremental:
+                tag_cache = TagCache(tag_cache_path)
+                self.summary = self.augmenter.augment_incremental(tag_cache=tag_cache)
+                if self.summary["removed"]:
+                    tag_cache.save(tag_cache_path)
+                logger.info(f"Incremental augmentation completed from {self.augmenter.events_path}")
+                return
+
+            self.augmenter.augment_file()
             logger.info(f"Data augmentation completed and saved to {self.augmenter.events_path}")
         except Exception as e:
             logger.error(f"Error during data augmentation: {e}")
             raise
 
+def load_dataset(filename, columns=TRAINING_COLUMNS): #MARK: Load
+    """
+    The training rows of a dataset file: `columns` of a Parquet/Arrow file, or a CSV
+    (augmented rows, or the gold span layout of data/TIM.csv labeled on the fly).
+    """
+    data = pd.DataFrame(read_frame(filename, columns=columns) if is_columnar(filename) else pd.read_csv(filename))
+    if "sequence" not in data and "task" in data:
+        # Gold span layout (data/TIM.csv): label it directly instead of going through augmentation
+        data = tim_frame(data)
+    return data
+
+_LOADER_TAG_CACHE = None
+
+def _init_loader(tag_cache_path):
+    # Loader processes read the saved tag cache once instead of receiving it with every row
+    global _LOADER_TAG_CACHE
+    _LOADER_TAG_CACHE = TagCache(tag_cache_path)
+
+def featurize_row(item, tag_cache=None, shuffle_seed=None): #MARK: Featurize
+    idx, text, sequence = item
+    tag_cache = tag_cache if tag_cache is not None else _LOADER_TAG_CACHE
+    label = sequence.split(" ") if isinstance(sequence, str) else list(sequence)
+    try:
+        processor = Process(label, len(label), text)
+        rng = random.Random(f"{shuffle_seed}-{idx}") if shuffle_seed is not None else None
+        sequences = processor.get_sequences(rng=rng)
+        tags = VOCAB.encode_tags(tag_cache.get(text) if tag_cache is not None else processor.get_tags())
+        label = VOCAB.encode_labels(label)
+    except Exception as e:
+        return {"idx": idx, "text": text, "label": label, "error": e}
+    return {"idx": idx, "text": text, "label": label, "tags": tags, "sequences": sequences, "error": None}
+
 class Train: #MARK: Training
-    def __init__(self, weights=None, training_size=0.8, testing_size=0.2, filename="data/aug_TIM.csv", num_features=11):  
-        self.data = pd.read_csv(filename)
-        self.data = pd.DataFrame(self.data)
-        self.training_data = self.data.sample(frac=training_size).reset_index(drop=True) 
-        self.validation_data = self.data.sample(frac=testing_size).reset_index(drop=True)
-        print(f"📏 Training data size: {len(self.training_data)}, 📏 Validation data size: {len(self.validation_data)}")
+    def __init__(self, weights=None, training_size=0.8, testing_size=0.2, filename="data/aug_TIM.csv", num_features=None,
+                 seed=None, epoch=0, checkpoint: Checkpoint = None, learning_rate=0.008, l2_strength=0.001, clip=(-0.5, 0.5),
+                 drop_rate=0.2, batch_size=32, split: SplitIndex = None, fold=None, tag_cache: TagCache = None,
+                 loader_workers=2, prefetch=64, loader_backend="thread", sampler: HardExampleSampler = None, stream=None,
+                 rows_per_epoch=10_000, templates: FeatureTemplates = None, hashing: HashedFeatures = None,
+                 transitions: Transitions = None, verbose=True):  
+        self.data = load_dataset(filename)
+        self.seed = seed
+        self.epoch = epoch
+        self.checkpoint = checkpoint
+        self.learning_rate = learning_rate
+        self.l2_strength = l2_strength
+        self.clip = tuple(clip)
+        self.drop_rate = drop_rate
+        self.batch_size = batch_size
+        self.dropout_seed = seed if seed is not None else int(np.random.SeedSequence().entropy % 2**63)
+        self.tag_cache = tag_cache
+        self.loader_workers = loader_workers
+        self.prefetch = prefetch
+        self.loader_backend = loader_backend
+        self.loader_stats = None
+        self._validation_items = None
+        self.verbose = verbose
+        self.stream = stream
+        self.templates = templates if templates is not None else FEATURE_TEMPLATES
+        self.hashing = hashing
+        self.transitions = transitions
+        self.rows_per_epoch = rows_per_epoch
+        if stream is not None and sampler is not None:
+            raise ValueError("Hard-example sampling needs a fixed training split and cannot be used with a stream")
+
+        if split is None:
+            split = SplitIndex(filename, training_size=training_size, validation_size=testing_size)
+        self.split = split.load(len(self.data))
+        if fold is None:
+            training_rows, validation_rows = self.split.train, self.split.validation
+        else:
+            training_rows, validation_rows = self.split.fold(fold)
+
+        epoch_seed = None if seed is None else seed + epoch
+        self.sampler = sampler
+        base_training_data = self.data.iloc[training_rows].reset_index(drop=True)
+        if stream is not None:
+            # Training rows come straight from the augmentation stream; the file only supplies validation
+            base_training_data = base_training_data.iloc[:0]
+            self.training_data = base_training_data
+            self.importance = np.ones(rows_per_epoch)
+        elif sampler is None:
+            self.training_data = base_training_data.sample(frac=1, random_state=epoch_seed)
+            self.importance = np.ones(len(self.training_data))
+        else:
+            sampler.attach(len(base_training_data))
+            rows, self.importance = sampler.draw(epoch)
+            self.training_data = base_training_data.iloc[rows]
+        self.training_rows = self.training_data.index.to_numpy()
+        self.training_data = self.training_data.reset_index(drop=True) 
+        if stream is not None and "weight" in base_training_data:
+            # Streamed examples are drawn one by one, so the file's row weights do not apply to them
+            logger.info("Ignoring the weight column of the training file while training on a stream")
+        elif "weight" in base_training_data:
+            # Compacted data: each row stands in for `weight` near-identical rows
+            multiplicity = base_training_data["weight"].to_numpy(dtype=float)
+            self.importance = self.importance * (multiplicity / multiplicity.mean())[self.training_rows]
+        self.validation_data = self.data.iloc[validation_rows].reset_index(drop=True)
+        if self.verbose:
+            training_size = f"{rows_per_epoch} (streamed)" if stream is not None else len(self.training_data)
+            print(f"📏 Training data size: {training_size}, 📏 Validation data size: {len(self.validation_data)}")
         if weights is None:
-            self.weights = np.random.rand(num_features)
-            self.weights = [weight * (1 - 0.1) - 0.1 for weight in self.weights] 
+            # One weight per feature template unless a size is forced
+            self.weights = np.random.rand(num_features or self.templates.size)
+            self.weights = self.weights * (1 - 0.1) - 0.1
+            # Hashed and transition weights start at zero after the template weights
+            self.weights = np.r_[self.weights, np.zeros(self.sparse_size)]
         else:
             self.weights = weights
+        # Updates only touch the weights whose features fired (see Sparse.SparseWeights)
+        size = self.templates.size + self.sparse_size if self.sparse_size else None
+        self.weights = SparseWeights.load(self.weights, size=size)
+        if self.sparse_size and len(self.weights) != size:
+            raise ValueError(f"Expected {self.templates.size} template + {self.sparse_size} hashed/transition weights, got {len(self.weights)}")
 
         self.avg_loss = 0.0         
         self.validation_avg_loss = 0.0 
+        self.start_row = 0
+        self.sum_loss = 0.0
+        self.count = 0
+        self.steps = 0
+
+    def resume(self, state): #MARK: Resume
+        self.weights = SparseWeights.load(state["weights"])
+        self.learning_rate = state["optimizer"]["learning_rate"]
+        self.l2_strength = state["optimizer"].get("l2_strength", self.l2_strength)
+        self.clip = tuple(state["optimizer"].get("clip", self.clip))
+        self.steps = state["optimizer"]["steps"]
+        self.start_row = state["row"]
+        self.dropout_seed = state.get("dropout_seed", self.dropout_seed)
+        self.sum_loss = state["progress"]["sum_loss"]
+        self.count = state["progress"]["count"]
+        self.avg_loss = self.sum_loss / self.count if self.count > 0 else 0.0
+        logger.info(f"Resuming epoch {self.epoch + 1} at row {self.start_row}")
+
+    def checkpoint_state(self, row):
+        return {
+            "seed": self.seed,
+            "dropout_seed": self.dropout_seed,
+            "epoch": self.epoch,
+            "row": row,
+            "weights": self.weights.state(),
+            "optimizer": {"learning_rate": self.learning_rate, "l2_strength": self.l2_strength, "clip": list(self.clip), "steps": self.steps},
+            "progress": {"sum_loss": self.sum_loss, "count": self.count},
+            "sampler": self.sampler.state_dict() if self.sampler is not None else None,
+            "hashing": self.hashing.config() if self.hashing is not None else None,
+            "transitions": self.transitions.config() if self.transitions is not None else None,
+            "gazetteer": self.templates.gazetteer.config() if self.templates.gazetteer is not None else None,
+        }
+
+    @property
+    def sparse_size(self):
+        # Weights laid out after the templates: hashed slots, then the transition block
+        return ((self.hashing.size if self.hashing is not None else 0) +
+                (self.transitions.size if self.transitions is not None else 0))
+
+    def dropout_masks(self, batch):
+        # Seeded per (epoch, batch) so a resumed epoch regenerates exactly the same masks
+        rng = np.random.default_rng([self.dropout_seed, self.epoch, batch])
+        num_weights = self.templates.size if self.sparse_size else len(self.weights)
+        return FeatureFunctions.dropout_masks(rng, self.batch_size, num_weights, drop_rate=self.drop_rate)
 
     def train(self): #MARK: Train
         if self.training_data is not None:
-            total_rows = len(self.training_data)
-
-            count = 0
-            sum_loss = 0.0
-            for idx, (index, row) in enumerate(self.training_data.iterrows()):
-                count += 1
-                text = row["full_text"]
-                label = row["sequence"].split(" ")
-                
-                try:
-                    processor = Process(label, len(label), text)
-                    sequences = processor.get_sequences()
-                    tags = processor.get_tags()
-
-                    if len(label) != len(tags):
-                        print()  
-                        logger.error(f"Length mismatch at row {idx}: {len(label)} labels for {len(tags)} tags")
-                        return None
-                    
-                except Exception as e:
+            if self.stream is not None:
+                total_rows = self.rows_per_epoch
+                rows = ((example["full_text"], example["sequence"]) for example in itertools.islice(self.stream, total_rows))
+            else:
+                total_rows = len(self.training_data)
+                rows = zip(self.training_data["full_text"], self.training_data["sequence"])
+
+            items = ((idx, text, sequence) for idx, (text, sequence) in enumerate(rows) if idx >= self.start_row)
+            # Threads share the in-memory tag cache; worker processes load the saved one once each.
+            # Streamed texts are new every epoch, so they are tagged by the workers instead of growing the cache.
+            tag_cache = self.tag_cache if self.stream is None else None
+            initializer, initargs = None, ()
+            if self.loader_backend == "process" and tag_cache is not None and tag_cache.filename and self.loader_workers > 0:
+                initializer, initargs = _init_loader, (tag_cache.filename,)
+            featurize = partial(featurize_row, tag_cache=tag_cache if self.loader_backend == "thread" else None,
+                                shuffle_seed=f"{self.dropout_seed}-{self.epoch}")
+            loader = DataLoader(items, featurize, workers=self.loader_workers, depth=self.prefetch, backend=self.loader_backend,
+                                initializer=initializer, initargs=initargs)
+
+            masks = None
+            for item in loader:
+                idx = item["idx"]
+                if masks is None or idx % self.batch_size == 0:
+                    masks = self.dropout_masks(idx // self.batch_size)
+                if self.checkpoint is not None and idx > self.start_row and self.checkpoint.due(idx):
+                    self.checkpoint.save(self.checkpoint_state(row=idx))
+                self.count += 1
+                text = item["text"]
+                label = item["label"]
+
+                if item["error"] is not None:
                     print() 
-                    logger.error(f"Error processing row {idx}: {e}")
+                    logger.error(f"Error processing row {idx}: {item['error']}")
+                    continue
+
+                sequences = item["sequences"]
+                tags = item["tags"]
+                if len(label) != len(tags):
+                    print()  
+                    logger.error(f"Length mismatch at row {idx}: {len(label)} labels for {len(tags)} tags")
                     continue
 
-                scorer = Score(sequences, label, self.weights, text) 
-                feature_functions = FeatureFunctions(tags, label, self.weights, text)
-                apply_drop = np.random.choice([True, False])
-                true_scores = feature_functions.call_features(apply_drop=apply_drop, is_training=True)
+                scorer = Score(sequences, label, self.weights, text, self.templates, self.hashing, self.transitions) 
+                feature_functions = FeatureFunctions(tags, label, self.weights, text, self.templates)
+                true_scores = feature_functions.call_features(mask=masks[idx % self.batch_size], is_training=True)
                 sum_scores = np.sum(true_scores) if true_scores is not None else 0.0
                 z_out = scorer.z_out(tags)
                 
                 try:
-                    backprop = BackProp(self.weights, tags, sequences, text)  
-                    true_probability = scorer.probability(true_scores, scorer.z)  
+                    backprop = BackProp(self.weights, tags, sequences, text, learning_rate=self.learning_rate,
+                                        l2_strength=self.l2_strength, clip=self.clip)  
+                    true_probability = scorer.probability(scorer.true_score(true_scores, tags, label), scorer.z)  
                     loss = backprop.loss(true_probability)
                     self.gradients = backprop.gradient(true_scores, scorer)
-                    self.weights = backprop.update_weights(self.gradients)
+                    importance = self.importance[idx]
+                    self.weights = backprop.update_weights(self.gradients * importance)
+                    self.steps += 1
+                    if self.sampler is not None:
+                        self.sampler.update(self.training_rows[idx], loss)
 
-                    sum_loss += loss
-                    self.avg_loss = sum_loss / count if count > 0 else 0.0
+                    self.sum_loss += importance * loss
+                    self.avg_loss = self.sum_loss / self.count if self.count > 0 else 0.0
                     if true_probability > 1:
                         print(f"\n❌ Probability exceeded 1 at row {idx}: {true_probability:.6f}")
                         
-                    print(f"\r🔄 Row {idx + 1}/{total_rows} | 📉 Avg. Loss: {self.avg_loss:.4f} | 💯 True Score: {sum_scores:.4} | ✅ Prob: {true_probability:.6f} | ⚖️ Z: {z_out:.4f} | 🏃 Avg. Gradient: {np.mean(self.gradients):.4f}", 
-                          end="", flush=True)
+                    if self.verbose:
+                        print(f"\r🔄 Row {idx + 1}/{total_rows} | 📉 Avg. Loss: {self.avg_loss:.4f} | 💯 True Score: {sum_scores:.4} | ✅ Prob: {true_probability:.6f} | ⚖️ Z: {z_out:.4f} | 🏃 Avg. Gradient: {self.gradients.mean():.4f}", 
+                              end="", flush=True)
                     
                 except Exception as e:
                     print()  
                     logger.error(f"Error in backpropagation for row {idx}: {e}")
                     continue
             
-            print(f"\n✅ Training completed! Processed {total_rows} rows.")
+            self.loader_stats = loader.stats()
+            if self.verbose:
+                print(f"\n✅ Training completed! Processed {total_rows} rows.")
+                print(f"📦 Loader: {self.loader_stats['bound']}-bound | stalled {self.loader_stats['stall_seconds']:.2f}s "
+                      f"of {self.loader_stats['seconds']:.2f}s | avg. queue depth {self.loader_stats['avg_queue_depth']:.1f}/{self.prefetch}")
             
         return self.weights
 
+    def validation_items(self):
+        # Tags and candidate sets do not depend on the weights, so they are built once per trainer
+        if self._validation_items is None:
+            featurize = partial(featurize_row, tag_cache=self.tag_cache, shuffle_seed="validation")
+            rows = zip(self.validation_data["full_text"], self.validation_data["sequence"])
+            self._validation_items = [featurize((idx, text, sequence)) for idx, (text, sequence) in enumerate(rows)]
+        return self._validation_items
+
     def validation(self): #MARK: Validate
         count = 0
         sum_loss = 0.0
-        for idx, (index ,row) in enumerate(self.validation_data.iterrows()):
-            text = row["full_text"]
-            label = row["sequence"].split(" ")
-            
-            try:
-                processor = Process(label, len(label), text)
-                sequences = processor.get_sequences()
-                tags = processor.get_tags()
+        row_weights = self.validation_data["weight"].to_numpy(dtype=float) if "weight" in self.validation_data else None
+        for item in self.validation_items():
+            idx = item["idx"]
+            text = item["text"]
+            label = item["label"]
 
-                if len(label) != len(tags):
-                    logger.error(f"Length mismatch at validation row {idx}: {len(label)} labels for {len(tags)} tags")
-                    continue
-                
-            except Exception as e:
-                logger.error(f"Error processing validation row {idx}: {e}")
+            if item["error"] is not None:
+                logger.error(f"Error processing validation row {idx}: {item['error']}")
                 continue
 
-            scorer = Score(sequences, label, self.weights, text) 
-            feature_functions = FeatureFunctions(tags, label, self.weights, text)
+            sequences = item["sequences"]
+            tags = item["tags"]
+            if len(label) != len(tags):
+                logger.error(f"Length mismatch at validation row {idx}: {len(label)} labels for {len(tags)} tags")
+                continue
+
+            scorer = Score(sequences, label, self.weights, text, self.templates, self.hashing, self.transitions) 
+            feature_functions = FeatureFunctions(tags, label, self.weights, text, self.templates)
             true_scores = feature_functions.call_features(is_training=False)
             sum_scores = np.sum(true_scores) if true_scores is not None else 0.0
             z_out = scorer.z_out(tags)
-            true_probability = scorer.probability(true_scores, scorer.z)
-            backprop = BackProp(self.weights, tags, sequences, text)
+            true_probability = scorer.probability(scorer.true_score(true_scores, tags, label), scorer.z)
+            backprop = BackProp(self.weights, tags, sequences, text, learning_rate=self.learning_rate,
+                                l2_strength=self.l2_strength, clip=self.clip)
             loss = backprop.loss(true_probability)
 
-            sum_loss += loss
-            count += 1
+            weight = row_weights[idx] if row_weights is not None else 1
+            sum_loss += weight * loss
+            count += weight
             self.validation_avg_loss = sum_loss / count if count > 0 else 0.0
-            print(f"\r 🔄 Validation Row {idx + 1}/{len(self.validation_data)} | 📉 Avg. Loss: {self.validation_avg_loss:.4f} | 💯 True Score: {sum_scores:.4f}| ✅ Prob: {true_probability:.6f} | ⚖️ Z: {z_out:.4f}", end="", flush=True)
+            if self.verbose:
+                print(f"\r 🔄 Validation Row {idx + 1}/{len(self.validation_data)} | 📉 Avg. Loss: {self.validation_avg_loss:.4f} | 💯 True Score: {sum_scores:.4f}| ✅ Prob: {true_probability:.6f} | ⚖️ Z: {z_out:.4f}", end="", flush=True)
 
     def save_weights(self, filename="data/weights.json"):
         try:
-            with open(filename, "w") as f:
-                json.dump({"weights": {str(i): weight for i, weight in enumerate(self.weights)}}, f)
+            save_model(filename, self.weights, self.templates, self.hashing, self.transitions)
             logger.info(f"Weights saved to {filename}")
         except Exception as e:
             logger.error(f"Error saving weights to {filename}: {e}")
             raise
     
+    def save_bundle(self, filename="data/model.crfm"):
+        try:
+            write_bundle(filename, self.weights, self.templates, self.hashing, self.transitions, tagger=tagger_config(),
+                         metadata={"seed": self.seed, "epoch": self.epoch, "steps": self.steps, "train_loss": self.avg_loss})
+        except Exception as e:
+            logger.error(f"Error saving model bundle to {filename}: {e}")
+            raise
+    
 class Predict: #MARK: Predict
-    def __init__(self, input, filename="data/weights.json"):
+    def __init__(self, input, filename="data/weights.json", model: ModelBundle = None):
+        self.hashing = None
+        self.transitions = None
+        self.templates = FEATURE_TEMPLATES
+        self.metadata = {}
+        self.confidence = None
+        self.input = input
+        if model is not None:
+            # Already loaded (e.g. by a ModelRegistry): no file access at all
+            self.weights, self.templates, self.hashing, self.transitions = model.weights, model.templates, model.hashing, model.transitions
+            return
+        if is_bundle(filename):
+            # Binary bundles are self-describing and fail fast on any schema mismatch
+            bundle = ModelBundle.load(filename)
+            bundle.check_tagger(tagger_config())
+            self.weights, self.templates, self.hashing, self.transitions = bundle.weights, bundle.templates, bundle.hashing, bundle.transitions
+            self.metadata = bundle.header.get("metadata", {})
+            logger.info(f"Loaded model bundle {filename}: {len(self.weights)} weights, templates {self.templates.names}")
+            return
         try:
             with open(filename, "r") as f:
                 self.weights = json.load(f)
 
             if self.weights:
-                self.weights = [float(weight) for weight in self.weights["weights"].values()]
+                self.metadata = self.weights.get("metadata", {})
+                gazetteer = Gazetteer.from_config(self.weights["gazetteer"]) if "gazetteer" in self.weights else None
+                names = self.weights.get("templates")
+                if names is not None and names != FEATURE_TEMPLATES.names:
+                    # Lexicon features or a pruned model: rebuild exactly the templates the weights belong to
+                    try:
+                        self.templates = select_templates(names, gazetteer)
+                    except ValueError as e:
+                        logger.warning(f"Weights in {filename} were trained with templates {names}, not {FEATURE_TEMPLATES.names}: {e}")
+                self.hashing = HashedFeatures.from_config(self.weights["hashing"]) if "hashing" in self.weights else None
+                self.transitions = Transitions.from_config(self.weights["transitions"]) if "transitions" in self.weights else None
+                expected = (self.templates.size + (self.hashing.size if self.hashing is not None else 0) +
+                            (self.transitions.size if self.transitions is not None else 0))
+                size = self.weights.get("size")
+                if size is None and (self.hashing is not None or self.transitions is not None):
+                    size = expected
+                weights = self.weights["weights"]
+                legacy = not any(key in self.weights for key in ("size", "templates", "hashing", "transitions"))
+                if legacy and any(int(index) >= expected for index in weights):
+                    # Files saved before templates were recorded carry spare trailing weights (num_features=11)
+                    logger.warning(f"{filename} is in the old {len(weights)}-weight layout; using the first {expected} "
+                                   f"for templates {self.templates.names} and ignoring the rest. Re-save it with save_model() to upgrade.")
+                    weights = {index: weight for index, weight in weights.items() if int(index) < expected}
+                    size = expected
+                self.weights = SparseWeights.from_dict(weights, size=size)
+                if len(self.weights) != expected:
+                    raise ModelBundleError(f"{filename} holds {len(self.weights)} weights but its templates/hashing/transitions need {expected}")
 
-            logger.info(f"Loaded weights from {filename}: {self.weights}")
+            logger.info(f"Loaded {len(self.weights)} weights from {filename}: {self.weights[:self.templates.size]}")
         except FileNotFoundError:
             logger.warning(f"File {filename} not found, using default weights")
             return None
-        
-        self.input = input
     
-    def predict(self):
+    def predict(self, tags=None):
         try:
             processor = Process(["T", "TM", "D", "O"], len(self.input.split(" ")), self.input)
             sequences = processor.get_sequences(max_permutations=10000)
-            tags = processor.get_tags()
+            tags = processor.get_tags() if tags is None else tags
+            if self.transitions is not None:
+                sequences = self.add_viterbi_path(sequences)
             
-            scorer = Score(sequences, self.input.split(" "), self.weights, self.input) 
+            scorer = Score(sequences, self.input.split(" "), self.weights, self.input, self.templates, self.hashing, self.transitions) 
             scores = scorer.score_sequences(tags)
-            if scores:
-                best_score = max(scores)
-                if sequences:
-                    best_sequence = sequences[scores.index(best_score)]
+            if scores is not None and len(scores):
+                best_score = scores.max()
+                if len(sequences):
+                    best_sequence = tuple(VOCAB.decode_labels(sequences[int(scores.argmax())]))
                 else:
                     logger.error("No sequences found, cannot determine best sequence")
                     return None
 
-                scorer.z_out(tags)
-                logger.info(f"Best sequence found: {best_sequence} with probability {scorer.probability(scores)} and best score {best_score}")
+                # Softmax over the candidates, shifted by the best score so it cannot overflow; fsum makes
+                # it independent of the (shuffled) candidate order
+                self.confidence = 1 / math.fsum(np.exp(scores - best_score))
+                logger.info(f"Best sequence found: {best_sequence} with probability {self.confidence:.4f} and best score {best_score}")
                 return best_sequence
         except Exception as e:
             logger.error(f"Error processing input: {e}")
             return None
         
+    def add_viterbi_path(self, sequences):
+        # The permutation cap can leave the best first-order path out of the candidates; decode it and add it
+        tokens = self.input.split(" ")
+        offset = self.templates.size
+        emissions = np.zeros((len(tokens), self.transitions.num_labels))
+        if self.hashing is not None:
+            emissions += self.hashing.emissions(self.weights, self.hashing.indices(tokens) + offset)
+            offset += self.hashing.size
+        path, _ = self.transitions.viterbi(self.weights, offset, emissions)
+        if len(path) != sequences.shape[1] or (sequences == path).all(axis=1).any():
+            return sequences
+        return np.vstack([sequences, path])
+
     def process_labels(self, labels):
         try:
             task = []
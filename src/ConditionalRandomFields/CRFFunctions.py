@@ -1,12 +1,20 @@
 import pandas as pd
 import numpy as np
 import spacy
-import itertools
 import logging
 import random
 import datetime
+import time
 import ast
+import json
+import os
+import hashlib
+from collections import Counter
 from src.ConditionalRandomFields.FeatureFunctions import FeatureFunctions
+from src.ConditionalRandomFields.Labeling import label_spans
+from src.ConditionalRandomFields.Dataset import is_columnar, write_dataset, DatasetWriter
+from src.ConditionalRandomFields.Vocabulary import VOCAB
+from src.ConditionalRandomFields.Sparse import SparseVector, SparseWeights, CSRActivations
 
 nlp = spacy.load("en_core_web_md")
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -14,15 +22,56 @@ logger = logging.getLogger(__name__)
 
 #PYTHONUNBUFFERED=1 python -m unittest -b tests/test_train.py
 
+AUGMENT_COLUMNS = ["full_text", "event", "start_time", "end_time", "date", "predicate", "sequence", "source"]
+CATEGORICAL_COLUMNS = ["start_time", "end_time", "date", "predicate"]
+
+def parse_events(value):
+    try:
+        return [item for item in ast.literal_eval(value) if len(item) >= 4]
+    except Exception:
+        return None
+
+def clean_text(series):
+    return series.astype(str).str.replace("-", " ", regex=False).str.replace("'", "", regex=False)
+
+def clean_events(series):
+    # Events also get "/" split apart, as add_row does; predicate phrases keep theirs
+    return clean_text(series).str.replace("/", " ", regex=False)
+
 class Augment: #MARK: Augmentation
-    def __init__(self, events_path="data/training-events.csv", predicate_path="data/predicate_phrases.csv"):
+    def __init__(self, events_path="data/training-events.csv", predicate_path="data/predicate_phrases.csv", chunksize=50_000, seed=None):
         self.events_path = events_path
         self.predicate_path = predicate_path
-        self.raw_events = pd.read_csv(events_path)
+        self.chunksize = chunksize
+        self.rng = np.random.default_rng(seed)
         self.predicate_data = pd.read_csv(predicate_path)
-        logger.info(f"Data loaded from {events_path} and {predicate_path}")
+        logger.info(f"Predicates loaded from {predicate_path}, events will be streamed from {events_path}")
 
-        self.data = pd.DataFrame(columns=["full_text", "event", "start_time", "end_time", "date", "predicate", "sequence"])
+        # Rows are collected as column lists / per-chunk frames and concatenated once on access
+        self._pending = {column: [] for column in AUGMENT_COLUMNS}
+        self._frames = []
+        self._data = pd.DataFrame(columns=AUGMENT_COLUMNS)
+        self._occurrences = Counter()
+        self._pools = None
+
+    @property
+    def data(self):
+        if self._frames or self._pending["event"]:
+            if self._pending["event"]:
+                self._frames.append(pd.DataFrame(self._pending))
+                self._pending = {column: [] for column in AUGMENT_COLUMNS}
+            frames = [self._data] if len(self._data) else []
+            self._data = pd.concat(frames + self._frames, ignore_index=True)
+            for column in CATEGORICAL_COLUMNS:
+                self._data[column] = self._data[column].astype("category")
+            self._frames = []
+        return self._data
+
+    @data.setter
+    def data(self, frame):
+        self._data = frame
+        self._frames = []
+        self._pending = {column: [] for column in AUGMENT_COLUMNS}
 
     def add_row(self, event, start_time, end_time, date, predicate=None):
         if "-" in event:
@@ -31,84 +80,254 @@ class Augment: #MARK: Augmentation
             event = event.replace("'", "")
         if "/" in event:
             event = event.replace("/", " ")
-        new_row = pd.DataFrame({
-            "full_text": [""],
-            "event": [event], 
-            "start_time": [start_time], 
-            "end_time": [end_time],
-            "date": [date],
-            "predicate": [predicate],
-            "sequence": [""]
+        for column, value in zip(AUGMENT_COLUMNS, ["", event, start_time, end_time, date, predicate, "", None]):
+            self._pending[column].append(value)
+
+    def fingerprint(self, chunk):
+        # Content hash of the raw row, plus an occurrence number so duplicate rows stay distinct.
+        # The number counts earlier copies, so deleting one copy retires the last id ("<sha1>:n"),
+        # not the deleted row's: the copies are identical, so the manifest and output stay right.
+        fingerprints = []
+        for value in chunk["events"].astype(str):
+            digest = hashlib.sha1(value.encode("utf-8")).hexdigest()
+            self._occurrences[digest] += 1
+            fingerprints.append(f"{digest}:{self._occurrences[digest]}")
+        return pd.Series(fingerprints, index=chunk.index)
+
+    def explode_events(self, chunk, fingerprints=None):
+        parsed = chunk["events"].map(parse_events)
+        failed = parsed.isna()
+        if failed.any():
+            logger.error(f"Error processing events in rows {chunk.index[failed].tolist()[:10]}{' ...' if failed.sum() > 10 else ''}")
+
+        items = parsed[~failed].explode().dropna()
+        if items.empty:
+            return pd.DataFrame(columns=AUGMENT_COLUMNS)
+        fields = pd.DataFrame(items.map(lambda item: tuple(item[:4])).tolist(), columns=["event", "start_time", "end_time", "date"])
+        date = fields["date"].astype(str)
+        return pd.DataFrame({
+            "full_text": "",
+            "event": clean_events(fields["event"]),
+            "start_time": fields["start_time"].astype(str).astype("category"),
+            "end_time": fields["end_time"].astype(str).astype("category"),
+            "date": date.where(date != "", "today").astype("category"),
+            "predicate": None,
+            "sequence": "",
+            "source": fingerprints.loc[items.index].to_numpy() if fingerprints is not None else None,
         })
-        self.data = pd.concat([self.data, new_row], ignore_index=True)
+
+    def raw_chunks(self):
+        # Raw event rows `chunksize` at a time, with their content fingerprints
+        self._occurrences = Counter()
+        for chunk in pd.read_csv(self.events_path, chunksize=self.chunksize):
+            yield chunk, self.fingerprint(chunk)
 
     def split_events(self):
-        for index, row in self.raw_events.iterrows():
-            try:
-                info = ast.literal_eval(row["events"])
-                for i, item in enumerate(info):
-                    if item[3] == "":
-                        self.add_row(item[0], item[1], item[2], "today")
-                    else:
-                        self.add_row(item[0], item[1], item[2], item[3])
-            except Exception as e:
-                logger.error(f"Error processing events in row {index}: {e}")
-                continue
+        # Keeps every event in memory; augment_file() is the bounded path for whole files
+        for chunk, fingerprints in self.raw_chunks():
+            self._frames.append(self.explode_events(chunk, fingerprints))
+        logger.info(f"Split {len(self.data)} events from {self.events_path}")
+
+    def augment_events(self, events, workers=None):
+        # Predicates, text and labels for one frame of exploded events
+        if events.empty:
+            return events
+        events = events.reset_index(drop=True)
+        self.attach_predicates(events, self.rng)
+        events["sequence"] = label_spans(events, workers=workers)
+        return events
+
+    def augment_file(self, filename="data/aug_TIM.csv", manifest_path="data/aug_manifest.json", tag_cache=None, workers=None): #MARK: Augment file
+        """
+        Augment the whole events file into `filename` (CSV, Parquet or Arrow).
+
+        Each chunk of raw rows is exploded, given predicates, labeled and written
+        before the next one is read, so peak memory is one chunk; only the manifest's
+        per-source row counts are kept across chunks.
+        """
+        sources = Counter()
+        with DatasetWriter(filename, tag_cache=tag_cache, columns=AUGMENT_COLUMNS) as writer:
+            for chunk, fingerprints in self.raw_chunks():
+                events = self.augment_events(self.explode_events(chunk, fingerprints), workers=workers)
+                writer.write(events)
+                # Rows without usable events are recorded too, so incremental runs do not retry them
+                sources.update(dict.fromkeys(fingerprints, 0))
+                sources.update(events["source"].dropna().value_counts().to_dict())
+        if manifest_path:
+            self.save_manifest(manifest_path, sources)
+        logger.info(f"Augmented {writer.rows} events from {self.events_path} into {filename}")
+        return writer.rows
 
     def concat_predicates(self):
-        for index, row in self.data.iterrows():
-            event = row["event"]
-            random_fix = random.choice(["prefix", "suffix"])
-            random_phrase = random.choice(self.predicate_data[random_fix])
-            if "-" in random_phrase:
-                random_phrase = random_phrase.replace("-", " ")
-            if "'" in random_phrase:
-                random_phrase = random_phrase.replace("'", "")
-
-            if random_phrase:
-                if random_fix == "prefix":
-                    self.data.at[index, "predicate"] = random_phrase
-                    self.data.at[index, "full_text"] = f"{random_phrase} {event} on {row['date']} from {row['start_time']} to {row['end_time']}"
-                else:
-                    self.data.at[index, "predicate"] = random_phrase
-                    self.data.at[index, "full_text"] = f"{event} {random_phrase} on {row['date']} from {row['start_time']} to {row['end_time']}"
-
-    def store_sequences(self):
-        for index, row in self.data.iterrows():
-            full_text_tokens = row["full_text"].split(" ")
-            sequence = []
-            for token in full_text_tokens:
-                if token.lower() in str(row["predicate"].lower()):
-                    sequence.append("O")
-                    continue
-
-                elif token.lower() in str(row["event"].lower()):
-                    sequence.append("T")
-                    continue
-
-                elif token.lower() in str(row["date"].lower()):
-                    sequence.append("D")
-                    continue
-
-                elif token.lower() in str(row["start_time"].lower()) or str(token.lower() in row["end_time"].lower()):
-                    sequence.append("TM")
-                    continue
-                else:
-                    sequence.append("O")
-
-            if len(sequence) != len(full_text_tokens):
-                logger.error(f"Sequence length mismatch at index {index}: {len(sequence)} vs {len(full_text_tokens)}")
-                return None
-            self.data.at[index, "sequence"] = " ".join(sequence)
+        data = self.data
+        if data.empty:
+            return
+        self.attach_predicates(data, self.rng)
+
+    def attach_predicates(self, data, rng):
+        is_prefix = rng.random(len(data)) < 0.5
+        phrases = np.empty(len(data), dtype=object)
+        for fix, mask in (("prefix", is_prefix), ("suffix", ~is_prefix)):
+            choices = clean_text(self.predicate_data[fix].dropna()).to_numpy()
+            phrases[mask] = choices[rng.integers(len(choices), size=int(mask.sum()))]
+        phrases = pd.Series(phrases, index=data.index)
+
+        event = data["event"].astype(str)
+        date = data["date"].astype(str)
+        start_time = data["start_time"].astype(str)
+        head = (phrases + " " + event).where(is_prefix, event + " " + phrases)
+        data["predicate"] = phrases.astype("category")
+        data["full_text"] = head + " on " + date + " from " + start_time + " to " + data["end_time"].astype(str)
+
+        # Character spans of every component, used by store_sequences to label tokens
+        phrase_length = phrases.str.len().to_numpy()
+        event_length = event.str.len().to_numpy()
+        data["predicate_start"] = np.where(is_prefix, 0, event_length + 1)
+        data["event_start"] = np.where(is_prefix, phrase_length + 1, 0)
+        data["date_start"] = phrase_length + event_length + 1 + len(" on ")
+        data["start_time_start"] = data["date_start"] + date.str.len().to_numpy() + len(" from ")
+        data["end_time_start"] = data["start_time_start"] + start_time.str.len().to_numpy() + len(" to ")
+
+    def variants(self):
+        # Event, date and time pools for streaming: every distinct value in the raw events plus synthetic variants
+        if self._data.empty and not self._frames:
+            # Only distinct values are kept, one chunk of raw rows at a time
+            events, dates, times = set(), set(), set()
+            for chunk, _ in self.raw_chunks():
+                exploded = self.explode_events(chunk)
+                events.update(exploded["event"].astype(str))
+                dates.update(exploded["date"].astype(str))
+                times.update(exploded["start_time"].astype(str))
+                times.update(exploded["end_time"].astype(str))
+        else:
+            data = self.data
+            events = set(data["event"].astype(str))
+            dates = set(data["date"].astype(str))
+            times = set(data["start_time"].astype(str)) | set(data["end_time"].astype(str))
+        months = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+        weekdays = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+        dates.update(["today", "tomorrow", "tonight"] + weekdays + [f"{month} {day}" for month in months for day in range(1, 29)])
+        times.update(f"{hour}{minute}{meridiem}" for hour in range(1, 13) for minute in ("", ":00", ":15", ":30", ":45") for meridiem in ("am", "pm"))
+        # Sorted, so a seed draws the same examples whatever order the values were seen in
+        return np.array(sorted(events)), np.array(sorted(dates)), np.array(sorted(times))
+
+    def stream(self, seed=None, limit=None, batch_size=1024): #MARK: Stream
+        """
+        Yield freshly augmented, labeled examples without writing any files.
+
+        Every batch pairs random events from the raw data with a random predicate
+        (prefix or suffix) and random date/time variants, then builds and labels the
+        text with the same vectorized code as the file pipeline. `limit=None`
+        streams forever; `self.stream_stats` tracks examples and seconds spent.
+        The value pools are built once per Augment and hold distinct values only.
+        """
+        if self._pools is None:
+            self._pools = self.variants()
+        events, dates, times = self._pools
+        rng = np.random.default_rng(seed)
+        self.stream_stats = {"examples": 0, "seconds": 0.0}
+
+        produced = 0
+        while limit is None or produced < limit:
+            size = batch_size if limit is None else min(batch_size, limit - produced)
+            start = time.perf_counter()
+            batch = pd.DataFrame({
+                "event": events[rng.integers(len(events), size=size)],
+                "start_time": times[rng.integers(len(times), size=size)],
+                "end_time": times[rng.integers(len(times), size=size)],
+                "date": dates[rng.integers(len(dates), size=size)],
+            })
+            self.attach_predicates(batch, rng)
+            batch["sequence"] = label_spans(batch)
+            self.stream_stats["seconds"] += time.perf_counter() - start
+            self.stream_stats["examples"] += size
+
+            for full_text, sequence in zip(batch["full_text"], batch["sequence"]):
+                yield {"full_text": full_text, "sequence": sequence}
+            produced += size
+
+    def store_sequences(self, workers=None):
+        data = self.data
+        if "event_start" not in data:
+            logger.error("Missing component spans, run concat_predicates() before store_sequences()")
+            return None
+        data["sequence"] = label_spans(data, workers=workers)
+        mismatched = data["sequence"].str.count(" ") != data["full_text"].str.count(" ")
+        if mismatched.any():
+            logger.error(f"Sequence length mismatch at indices {data.index[mismatched].tolist()[:10]}")
+            return None
     
-    def save_data(self, filename="data/aug_TIM.csv"):
+    def save_data(self, filename="data/aug_TIM.csv", manifest_path="data/aug_manifest.json", tag_cache=None):
         try:
-            self.data.to_csv(filename, index=False)
+            if is_columnar(filename):
+                write_dataset(self.data, filename, tag_cache=tag_cache)
+            else:
+                self.data.to_csv(filename, index=False)
             logger.info(f"Data saved to {filename}")
+            if manifest_path:
+                self.save_manifest(manifest_path, self.data["source"].dropna().value_counts().to_dict())
         except Exception as e:
             logger.error(f"Error saving data to CSV: {e}")
             raise
-                    
+
+    def save_manifest(self, manifest_path, sources):
+        tmp_path = f"{manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"events_path": self.events_path, "sources": {source: int(rows) for source, rows in sources.items()}}, f)
+        os.replace(tmp_path, manifest_path)
+
+    def augment_incremental(self, filename="data/aug_TIM.csv", manifest_path="data/aug_manifest.json", tag_cache=None, workers=None): #MARK: Incremental
+        """
+        Augment only raw event rows whose content hash is not in the manifest.
+
+        New rows are augmented and appended to the CSV a chunk at a time. When source
+        rows disappeared or changed, the CSV is then rewritten chunk by chunk without
+        their output rows, and only those rows' texts are evicted from `tag_cache`.
+        """
+        manifest = {}
+        if os.path.exists(manifest_path) and os.path.exists(filename):
+            with open(manifest_path, "r") as f:
+                manifest = json.load(f).get("sources", {})
+
+        header = pd.read_csv(filename, nrows=0).columns if manifest else None
+        current = set()
+        added = Counter()
+        for chunk, fingerprints in self.raw_chunks():
+            current.update(fingerprints)
+            new_rows = ~fingerprints.isin(manifest.keys())
+            if not new_rows.any():
+                continue
+            added.update(dict.fromkeys(fingerprints[new_rows], 0))
+            events = self.augment_events(self.explode_events(chunk[new_rows], fingerprints[new_rows]), workers=workers)
+            if events.empty:
+                continue
+            if header is None:
+                events.to_csv(filename, index=False)
+                header = events.columns
+            else:
+                events.reindex(columns=header).to_csv(filename, mode="a", header=False, index=False)
+            added.update(events["source"].value_counts().to_dict())
+        if header is None:
+            pd.DataFrame(columns=AUGMENT_COLUMNS).to_csv(filename, index=False)
+
+        removed = set(manifest) - current
+        if removed:
+            with DatasetWriter(filename, columns=header) as writer:
+                for existing in pd.read_csv(filename, chunksize=self.chunksize):
+                    dropped = existing["source"].isin(removed)
+                    if tag_cache is not None and dropped.any():
+                        tag_cache.invalidate(existing.loc[dropped, "full_text"])
+                    writer.write(existing[~dropped])
+
+        sources = {source: rows for source, rows in manifest.items() if source not in removed}
+        sources.update(added)
+        self.save_manifest(manifest_path, sources)
+
+        summary = {"new": len(current - set(manifest)), "removed": len(removed), "unchanged": len(current & set(manifest)), "rows_added": sum(added.values())}
+        logger.info(f"Incremental augmentation: {summary['new']} new/changed raw rows, {summary['removed']} removed, "
+                    f"{summary['unchanged']} unchanged, {summary['rows_added']} rows appended to {filename}")
+        return summary
+
 class Process: #MARK: Processing 
     def __init__(self, label, label_length, feature_text): 
         self.nlp = nlp
@@ -117,19 +336,17 @@ class Process: #MARK: Processing
         self.feature_text = feature_text
 
     def validate_lengths(self, sequences):
-        for seq in sequences:
-            if len(seq) != self.label_length:
-                logger.error(f"Sequence length mismatch: {len(seq)} vs {self.label_length}")
-                return False
+        if sequences.shape[1] != self.label_length:
+            logger.error(f"Sequence length mismatch: {sequences.shape[1]} vs {self.label_length}")
+            return False
         return True
 
-    def get_sequences(self, max_permutations=None):
+    def get_sequences(self, max_permutations=None, rng=None):
+        """Candidate label sequences as an int8 (candidates, label_length) array of VOCAB label codes."""
         if not max_permutations:
             max_permutations = 1000
 
-        sequences_iter = itertools.product(self.label, repeat=self.label_length)
-        sequences = list(itertools.islice(sequences_iter, max_permutations))
-        random.shuffle(sequences)
+        sequences = VOCAB.candidates(self.label, self.label_length, max_permutations, rng=rng or random)
 
         if not self.validate_lengths(sequences):
             logger.error("Validation failed: Sequence lengths do not match the expected label length.")
@@ -140,39 +357,132 @@ class Process: #MARK: Processing
         doc = nlp(self.feature_text)
         tags = [token.pos_ for token in doc]
         return tags
+
+def tagger_config():
+    # Recorded in model bundles so a model is not silently used with a different POS tagger
+    meta = nlp.meta
+    return {"name": f"{meta.get('lang')}_{meta.get('name')}", "version": meta.get("version"), "pipeline": list(nlp.pipe_names)}
+
+class TagCache: #MARK: Tag cache
+    """POS tags per text, computed once with `nlp.pipe` and shared by every trainer that reads the same data."""
+    def __init__(self, filename=None):
+        self.filename = filename
+        self.tags = {}
+        if filename and os.path.exists(filename):
+            with open(filename, "r") as f:
+                self.tags = json.load(f)
+            logger.info(f"Loaded {len(self.tags)} cached tag sequences from {filename}")
+
+    def build(self, texts, batch_size=256):
+        missing = [text for text in dict.fromkeys(texts) if text not in self.tags]
+        for text, doc in zip(missing, nlp.pipe(missing, batch_size=batch_size)):
+            self.tags[text] = [token.pos_ for token in doc]
+        return self
+
+    def invalidate(self, texts):
+        for text in texts:
+            self.tags.pop(text, None)
+
+    def get(self, text):
+        if text not in self.tags:
+            self.tags[text] = [token.pos_ for token in nlp(text)]
+        return self.tags[text]
+
+    def save(self, filename=None):
+        filename = filename or self.filename
+        tmp_path = f"{filename}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.tags, f)
+        os.replace(tmp_path, filename)
+        logger.info(f"Saved {len(self.tags)} tag sequences to {filename}")
 class Score: #MARK: Scoring
-    def __init__(self, possible_labels, true_label, weights, feature_text): 
+    def __init__(self, possible_labels, true_label, weights, feature_text, templates=None, hashing=None, transitions=None): 
         self.possible_labels = possible_labels
         self.true_label = true_label
         self.weights = weights
         self.feature_text = feature_text
+        self.templates = templates
+        self.hashing = hashing
+        self.transitions = transitions
         self.z = None
+        self.features = None
+        self.lexical_indices = None
+        self.lexical_activations = None
+        self.true_activations = None
+
+    @property
+    def sparse_features(self):
+        return self.hashing is not None or self.transitions is not None
+
+    def feature_matrix(self, tags):
+        # Unweighted (candidates, features) values; they only depend on tags and text, so every pass reuses them
+        if self.features is None:
+            self.features = FeatureFunctions(tags, None, self.weights, self.feature_text, self.templates).feature_matrix(self.possible_labels)
+        return self.features
+
+    def weighted_features(self, tags, weights=None):
+        features = self.feature_matrix(tags)
+        weights = self.weights if weights is None else weights
+        return features * np.asarray(weights[:features.shape[1]], dtype=float)
+
+    def hashed_indices(self, tags):
+        if self.lexical_indices is None:
+            self.lexical_indices = self.hashing.indices(self.feature_text.split(" "), length=len(tags))
+        return self.lexical_indices
+
+    def hashed_offset(self, tags):
+        # Hashed word/suffix/shape weights sit after the template weights, transition weights after those
+        return self.feature_matrix(tags).shape[1]
+
+    def transition_offset(self, tags):
+        return self.hashed_offset(tags) + (self.hashing.size if self.hashing is not None else 0)
+
+    def build_activations(self, tags, sequences):
+        parts = []
+        if self.hashing is not None:
+            parts.append(self.hashing.activations(self.hashed_indices(tags), sequences, self.hashed_offset(tags)))
+        if self.transitions is not None:
+            parts.append(self.transitions.activations(sequences, self.transition_offset(tags)))
+        return CSRActivations.hstack(parts)
+
+    def sparse_activations(self, tags, true_label=False):
+        """CSR activations of the hashed and transition features for the candidates (or the true label)."""
+        if true_label:
+            if self.true_activations is None:
+                self.true_activations = self.build_activations(tags, self.true_label)
+            return self.true_activations
+        if self.lexical_activations is None:
+            self.lexical_activations = self.build_activations(tags, self.possible_labels)
+        return self.lexical_activations
+
+    def total_scores(self, tags):
+        scores = self.weighted_features(tags).sum(axis=1)
+        if self.sparse_features and len(scores):
+            scores = scores + self.sparse_activations(tags).dot(self.weights)
+        return scores
+
+    def true_score(self, true_scores, tags, label):
+        """Score of the true sequence: its template outputs plus its hashed lexical and transition weights."""
+        score = np.sum(true_scores)
+        if self.sparse_features:
+            if np.array_equal(label, self.true_label):
+                activations = self.sparse_activations(tags, true_label=True)
+            else:
+                activations = self.build_activations(tags, label)
+            score += activations.dot(self.weights)[0]
+        return score
 
     def score_sequences(self, tags):
-        scores = []
         try:
-            for seq in self.possible_labels:
-                scorer = FeatureFunctions(tags, seq, self.weights, self.feature_text)
-                outputs = scorer.call_features(is_training=False)
-                if outputs is not None:
-                    score = np.sum(outputs)
-                    scores.append(score)
-            return scores
+            return self.total_scores(tags)
         except Exception as e:
             logger.error(f"Error scoring sequences: {e}")
             return None
     
     def z_out(self, tags):
-        total = 0
-        
         try:
-            for seq in self.possible_labels:
-                scorer = FeatureFunctions(tags, seq, self.weights, self.feature_text)
-                outputs = scorer.call_features()
-                if outputs is not None:
-                    score = np.sum(outputs)
-                    total += np.exp(score)
-                
+            with np.errstate(over="ignore"):
+                total = np.exp(self.total_scores(tags)).sum()
         except Exception as e:
             logger.error(f"Error calculating Z value: {e}")
             return None
@@ -199,13 +509,23 @@ class Score: #MARK: Scoring
         except Exception as e:
             logger.error(f"Error calculating single probability: {e}")
             return 1e-10
+
+    def probabilities(self, scores):
+        # Vectorized `probability` over a whole candidate set
+        if self.z is None or not np.isfinite(self.z):
+            logger.error("Z value is not set or invalid. Please call z_out() before calculating probability.")
+            return np.full(len(scores), 1e-10)
+        with np.errstate(over="ignore", divide="ignore", invalid="ignore"):
+            return np.maximum(np.exp(scores) / self.z, 1e-10)
         
 class BackProp: #MARK: BackProp
-    def __init__(self, weights, tags, sequences, feature_text="", learning_rate=0.008):
+    def __init__(self, weights, tags, sequences, feature_text="", learning_rate=0.008, l2_strength=0.001, clip=(-0.5, 0.5)):
         self.weights = weights
         self.tags = tags
         self.sequences = sequences
         self.learning_rate = learning_rate
+        self.l2_strength = l2_strength
+        self.clip = clip
         self.feature_text = feature_text
         
     def loss(self, true_probability):
@@ -227,50 +547,53 @@ class BackProp: #MARK: BackProp
             return 10.0
     
     def gradient(self, true_scores, scorer: Score):
-        gradients = []
+        """
+        Clipped gradient as a SparseVector: the template weights plus only the hashed and
+        transition slots that fired for this sentence's candidates or its true label.
+        """
+        weighted = scorer.weighted_features(self.tags, self.weights)
+        expected_f = np.zeros(weighted.shape[1])
+        gradients = SparseVector([], [], len(self.weights))
+        if len(weighted):
+            scores = weighted.sum(axis=1)
+            if scorer.sparse_features:
+                scores = scores + scorer.sparse_activations(self.tags).dot(self.weights)
+            probabilities = scorer.probabilities(scores)
+            valid = np.isfinite(probabilities) & (probabilities > 0)
+            if not valid.all():
+                logger.warning(f"Invalid score probabilities for {int((~valid).sum())} sequences")
+            contributions = np.where(np.isfinite(weighted), weighted, 0.0) * probabilities[:, None]
+            expected_f = contributions[valid].sum(axis=0)
 
-        expected_f = [0.0] * len(self.weights)  
-        for seq in self.sequences:
-            feature_functions = FeatureFunctions(self.tags, seq, self.weights, self.feature_text)
-            scores = feature_functions.call_features()
-            score_probability = scorer.probability(scores)
-            
-            if scores is not None and score_probability is not None:
-                if np.isfinite(score_probability) and score_probability > 0:
-                    for i, feature_output in enumerate(scores):
-                        if i < len(expected_f) and np.isfinite(feature_output):
-                            expected_f[i] += float(feature_output) * float(score_probability)
-                else:
-                    logger.warning(f"Invalid score_probability: {score_probability}")
-
-        for i in range(len(self.weights)):
-            if i < len(true_scores):
-                gradient = expected_f[i] - float(true_scores[i])
-                gradients.append(gradient)
-            else:
-                gradients.append(0.0)
+            if scorer.sparse_features:
+                # Expected slot counts under the candidates' probabilities minus the true sequence's counts
+                expected = scorer.sparse_activations(self.tags).weighted_sum(np.where(valid, probabilities, 0.0))
+                gradients = expected - scorer.sparse_activations(self.tags, true_label=True).row(0)
 
-        return np.clip(gradients, -1, 1) 
+        count = min(len(self.weights), len(true_scores), len(expected_f))
+        gradients = gradients + SparseVector.from_dense(expected_f[:count] - np.asarray(true_scores[:count], dtype=float),
+                                                        size=len(self.weights))
+        return gradients.clip(-1, 1)
     #MARK: HP
-    def normalize_weights(self, l2_strength=0.001): #0.001
+    def normalize_weights(self, l2_strength=None): #0.001
+        # Full shrink-and-clip pass over every weight; update_weights only visits the touched ones
+        if l2_strength is None:
+            l2_strength = self.l2_strength
         try:
-            l2_norm = np.sqrt(sum(w**2 for w in self.weights))
+            weights = np.asarray(self.weights, dtype=float)
+            l2_norm = np.sqrt(np.dot(weights, weights))
             
             if l2_norm > 0:
-                for i in range(len(self.weights)):
-                    self.weights[i] = self.weights[i] / (1 + l2_strength * l2_norm)
-            
-            for i in range(len(self.weights)):
-                self.weights[i] = np.clip(self.weights[i], -0.5, 0.5)
+                weights = weights / (1 + l2_strength * l2_norm)
             
+            self.weights = np.clip(weights, self.clip[0], self.clip[1])
             return self.weights
         except Exception as e:
             logger.error(f"Error normalizing weights: {e}")
             return self.weights
     
     def update_weights(self, gradients):
-        for i in range(len(self.weights)):
-            self.weights[i] -= self.learning_rate * gradients[i]
-
-        self.weights = self.normalize_weights()
-        return self.weights
\ No newline at end of file
+        if not isinstance(gradients, SparseVector):
+            gradients = SparseVector.from_dense(gradients)
+        self.weights = SparseWeights.load(self.weights).update(gradients, self.learning_rate, self.l2_strength, self.clip)
+        return self.weights
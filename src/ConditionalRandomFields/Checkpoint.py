@@ -0,0 +1,81 @@
+import os
+import json
+import random
+import logging
+import tempfile
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_VERSION = 1
+
+class Checkpoint: #MARK: Checkpoint
+    """
+    Periodic, atomic training checkpoints.
+
+    A checkpoint holds everything needed to continue an interrupted run from the
+    exact row it stopped at: weights, optimizer state, the `random`/`numpy` RNG
+    states, the epoch, the row offset inside that epoch and the running loss.
+    """
+    def __init__(self, filename="data/checkpoint.json", every=500):
+        self.filename = filename
+        self.every = every
+
+    def due(self, rows_done):
+        return self.every is not None and self.every > 0 and rows_done > 0 and rows_done % self.every == 0
+
+    def exists(self):
+        return os.path.exists(self.filename)
+
+    def save(self, state):
+        state = dict(state)
+        state["version"] = CHECKPOINT_VERSION
+        state["rng"] = capture_rng()
+        directory = os.path.dirname(os.path.abspath(self.filename))
+        os.makedirs(directory, exist_ok=True)
+
+        fd, tmp_path = tempfile.mkstemp(prefix=".checkpoint-", suffix=".tmp", dir=directory)
+        try:
+            with os.fdopen(fd, "w") as f:
+                json.dump(state, f, default=_to_builtin)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.filename)
+        except Exception as e:
+            logger.error(f"Error saving checkpoint to {self.filename}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def load(self, restore_rng=True):
+        with open(self.filename, "r") as f:
+            state = json.load(f)
+
+        if state.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"Unsupported checkpoint version {state.get('version')} in {self.filename}")
+        if restore_rng and state.get("rng"):
+            restore_rng_state(state["rng"])
+        logger.info(f"Loaded checkpoint from {self.filename}: epoch {state['epoch'] + 1}, row {state['row']}")
+        return state
+
+def capture_rng():
+    py_state = random.getstate()
+    np_state = np.random.get_state()
+    return {
+        "python": [py_state[0], list(py_state[1]), py_state[2]],
+        "numpy": [np_state[0], np_state[1].tolist(), int(np_state[2]), int(np_state[3]), float(np_state[4])],
+    }
+
+def restore_rng_state(state):
+    version, internal, gauss = state["python"]
+    random.setstate((version, tuple(internal), gauss))
+    name, keys, pos, has_gauss, cached = state["numpy"]
+    np.random.set_state((name, np.array(keys, dtype=np.uint32), pos, has_gauss, cached))
+
+def _to_builtin(value):
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,71 @@
+import re
+import logging
+import pandas as pd
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MONTHS = {"january", "february", "march", "april", "may", "june", "july", "august", "september", "october", "november", "december",
+          "jan", "feb", "mar", "apr", "jun", "jul", "aug", "sep", "sept", "oct", "nov", "dec"}
+WEEKDAYS = {"monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday",
+            "mon", "tue", "tues", "wed", "thu", "thurs", "fri", "sat", "sun"}
+TIME_TOKEN = re.compile(r"^\d{1,2}(:\d{2})?([ap]\.?m\.?)?$", re.IGNORECASE)
+DATE_TOKEN = re.compile(r"^\d{1,4}([/.-]\d{1,2}([/.-]\d{2,4})?|st|nd|rd|th)?,?$", re.IGNORECASE)
+DAY_TOKEN = re.compile(r"^\d{1,2}(st|nd|rd|th)?,?$", re.IGNORECASE)
+# Month names that are also everyday words ("I may call mom"): only a month next to a day number
+AMBIGUOUS_MONTHS = {"may", "mar"}
+
+def delexicalize_token(token, previous=None, following=None): #MARK: Delexicalize
+    lowered = token.lower().strip(",.")
+    if lowered in MONTHS and (lowered not in AMBIGUOUS_MONTHS
+                              or any(neighbor is not None and DAY_TOKEN.match(neighbor) for neighbor in (previous, following))):
+        return "<MONTH>"
+    if lowered in WEEKDAYS:
+        return "<WEEKDAY>"
+    if TIME_TOKEN.match(token):
+        # Keep the shape the features can see (":" and am/pm) but drop the literal digits
+        shape = re.sub(r"\d+", "0", lowered)
+        return "<TIME:" + re.sub(r"[ap](\.?m\.?)", "xm", shape) + ">"
+    if DATE_TOKEN.match(token):
+        return "<DATE>"
+    return token
+
+def delexicalize(text):
+    tokens = str(text).split(" ")
+    return " ".join(delexicalize_token(token, tokens[i - 1] if i > 0 else None, tokens[i + 1] if i + 1 < len(tokens) else None)
+                    for i, token in enumerate(tokens))
+
+def compact(data, weight_column="weight"): #MARK: Compact
+    """
+    Collapse rows that only differ in their time/date literals.
+
+    Rows are grouped by (delexicalized text, label sequence); the first row of each
+    group is kept with a multiplicity weight equal to the group size (summed if the
+    input already carries weights). Returns the compacted frame and a report with
+    the row counts and the compression ratio.
+    """
+    frame = data.copy()
+    if weight_column not in frame:
+        frame[weight_column] = 1
+    frame["template"] = frame["full_text"].map(delexicalize)
+
+    groups = frame.groupby(["template", "sequence"], sort=False)
+    compacted = groups.head(1).copy()
+    compacted[weight_column] = groups[weight_column].sum().to_numpy()
+    compacted = compacted.drop(columns=["template"]).reset_index(drop=True)
+
+    report = {
+        "rows": len(frame),
+        "templates": len(compacted),
+        "compression_ratio": len(frame) / len(compacted) if len(compacted) else 0.0,
+    }
+    logger.info(f"Compacted {report['rows']} rows into {report['templates']} templates "
+                f"({report['compression_ratio']:.1f}x fewer rows)")
+    return compacted, report
+
+def compact_file(filename="data/aug_TIM.csv", output=None):
+    output = output or filename.replace(".csv", ".compact.csv")
+    compacted, report = compact(pd.read_csv(filename))
+    compacted.to_csv(output, index=False)
+    logger.info(f"Compacted data saved to {output}")
+    return output, report
@@ -0,0 +1,76 @@
+import time
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.ConditionalRandomFields.CRF import Train, load_dataset
+from src.ConditionalRandomFields.Split import SplitIndex
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def train_fold(filename, fold, folds, epochs, seed, num_features): #MARK: Fold worker
+    start = time.perf_counter()
+    split = SplitIndex(filename, folds=folds)
+    weights = None
+    trainer = None
+    for epoch in range(epochs):
+        trainer = Train(weights=weights, filename=filename, num_features=num_features, seed=seed, epoch=epoch,
+                        split=split, fold=fold, verbose=False)
+        trainer.train()
+        weights = trainer.weights
+    trainer.validation()
+
+    return {
+        "fold": fold,
+        "train_loss": float(trainer.avg_loss),
+        "validation_loss": float(trainer.validation_avg_loss),
+        "seconds": time.perf_counter() - start,
+        "weights": [float(weight) for weight in weights],
+    }
+
+class CrossValidate: #MARK: Cross validation
+    def __init__(self, filename="data/aug_TIM.csv", folds=5, epochs=5, seed=0, num_features=None, workers=None):
+        self.filename = filename
+        self.folds = folds
+        self.epochs = epochs
+        self.seed = seed
+        self.num_features = num_features
+        self.workers = workers or folds
+        self.results = []
+
+    def run(self):
+        # Build the split index once up front so the workers only ever read it, never race to write it
+        SplitIndex(self.filename, folds=self.folds).load(len(load_dataset(self.filename)))
+
+        start = time.perf_counter()
+        self.results = []
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            futures = {
+                pool.submit(train_fold, self.filename, fold, self.folds, self.epochs, self.seed, self.num_features): fold
+                for fold in range(self.folds)
+            }
+            for future in as_completed(futures):
+                fold = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error(f"Fold {fold} failed: {e}")
+                    continue
+                self.results.append(result)
+                logger.info(f"Fold {fold + 1}/{self.folds} done in {result['seconds']:.1f}s | "
+                            f"train loss {result['train_loss']:.4f} | validation loss {result['validation_loss']:.4f}")
+
+        self.results.sort(key=lambda result: result["fold"])
+        self.wall_time = time.perf_counter() - start
+        return self.results
+
+    def report(self):
+        if not self.results:
+            return "No folds completed"
+        lines = [f"{'fold':>4} | {'train loss':>10} | {'val loss':>10} | {'seconds':>8}"]
+        for result in self.results:
+            lines.append(f"{result['fold']:>4} | {result['train_loss']:>10.4f} | {result['validation_loss']:>10.4f} | {result['seconds']:>8.1f}")
+        losses = [result["validation_loss"] for result in self.results]
+        lines.append(f"mean validation loss {np.mean(losses):.4f} ± {np.std(losses):.4f} | wall time {self.wall_time:.1f}s "
+                     f"(sum of folds {sum(result['seconds'] for result in self.results):.1f}s)")
+        return "\n".join(lines)
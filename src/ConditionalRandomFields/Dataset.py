@@ -0,0 +1,173 @@
+import os
+import logging
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+from src.ConditionalRandomFields.Labeling import LABELS, LABEL_CODES
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+COLUMNAR_SUFFIXES = (".parquet", ".arrow")
+# Columns the trainer needs; everything else (source, spans, ...) stays on disk
+TRAINING_COLUMNS = ["full_text", "labels", "weight"]
+
+def is_columnar(filename):
+    return str(filename).endswith(COLUMNAR_SUFFIXES)
+
+def list_column(values, offsets, value_type):
+    return pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), pa.array(values, type=value_type))
+
+def to_table(frame, tag_cache=None): #MARK: To table
+    """
+    Arrow table with list-typed `tokens`, `labels` (int8 codes of LABELS) and, when a
+    tag cache is given, `tags` next to the frame's scalar columns.
+
+    The space-joined `sequence` column is split once here and not stored again.
+    """
+    texts = frame["full_text"].astype(str)
+    tokens = texts.str.split(" ").explode()
+    lengths = texts.str.count(" ").to_numpy() + 1
+    offsets = np.r_[0, np.cumsum(lengths)]
+
+    sequences = frame["sequence"].astype(str).str.split(" ").explode()
+    if len(sequences) != len(tokens):
+        raise ValueError("Every sequence needs one label per whitespace token of its full_text")
+    codes = sequences.map(LABEL_CODES).to_numpy()
+    if pd.isna(codes).any():
+        raise ValueError(f"Unknown labels in sequence column: {sorted(set(sequences[pd.isna(codes)]))}")
+
+    scalars = frame.drop(columns=[column for column in ("sequence", "tokens", "labels", "tags") if column in frame])
+    table = pa.Table.from_pandas(scalars.reset_index(drop=True), preserve_index=False)
+    table = table.append_column("tokens", list_column(tokens.to_numpy(), offsets, pa.string()))
+    table = table.append_column("labels", list_column(codes.astype(np.int8), offsets, pa.int8()))
+    if tag_cache is not None:
+        tags = [tag for text in texts for tag in tag_cache.get(text)]
+        tag_lengths = [len(tag_cache.get(text)) for text in texts]
+        table = table.append_column("tags", list_column(tags, np.r_[0, np.cumsum(tag_lengths)], pa.string()))
+    return table
+
+def write_dataset(frame, filename, tag_cache=None):
+    """Write `frame` as Parquet (`.parquet`) or an uncompressed Arrow IPC file (`.arrow`)."""
+    table = to_table(frame, tag_cache=tag_cache)
+    tmp_path = f"{filename}.tmp"
+    if str(filename).endswith(".arrow"):
+        with pa.OSFile(tmp_path, "wb") as sink, ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    else:
+        pq.write_table(table, tmp_path)
+    os.replace(tmp_path, filename)
+    logger.info(f"Wrote {table.num_rows} rows ({', '.join(table.column_names)}) to {filename}")
+    return filename
+
+class DatasetWriter: #MARK: Chunked writer
+    """
+    Writes a dataset one frame at a time as CSV, Parquet or Arrow IPC, so only the
+    current frame is ever in memory. Output goes to a temporary file that replaces
+    `filename` on a clean close; on an error it is removed.
+    """
+    def __init__(self, filename, tag_cache=None, columns=None):
+        self.filename = filename
+        self.tag_cache = tag_cache
+        self.columns = columns
+        self.tmp_path = f"{filename}.tmp"
+        self.rows = 0
+        self.sink = None
+        self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+        return False
+
+    def write(self, frame):
+        if frame.empty:
+            return
+        # Categories differ between chunks; plain strings keep one schema for the whole file
+        frame = frame.astype({column: str for column in frame.columns if isinstance(frame[column].dtype, pd.CategoricalDtype)})
+        if not is_columnar(self.filename):
+            frame.to_csv(self.tmp_path, mode="a" if self.rows else "w", header=not self.rows, index=False)
+        else:
+            self.write_table(to_table(frame, tag_cache=self.tag_cache))
+        self.rows += len(frame)
+
+    def write_table(self, table):
+        if self.writer is None:
+            if str(self.filename).endswith(".arrow"):
+                self.sink = pa.OSFile(self.tmp_path, "wb")
+                self.writer = ipc.new_file(self.sink, table.schema)
+            else:
+                self.writer = pq.ParquetWriter(self.tmp_path, table.schema)
+        self.writer.write_table(table)
+
+    def empty_table(self):
+        # The layout to_table() gives: scalar columns, then list-typed tokens and labels
+        scalars = [column for column in self.columns or [] if column not in ("sequence", "tokens", "labels", "tags")]
+        fields = [pa.field(column, pa.string()) for column in scalars]
+        fields += [pa.field("tokens", pa.list_(pa.string())), pa.field("labels", pa.list_(pa.int8()))]
+        return pa.schema(fields).empty_table()
+
+    def close(self):
+        if self.rows == 0:
+            if is_columnar(self.filename):
+                self.write_table(self.empty_table())
+            else:
+                pd.DataFrame(columns=self.columns or []).to_csv(self.tmp_path, index=False)
+        if self.writer is not None:
+            self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+        os.replace(self.tmp_path, self.filename)
+        logger.info(f"Wrote {self.rows} rows to {self.filename}")
+
+    def abort(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.sink is not None:
+            self.sink.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+def read_table(filename, columns=None, memory_map=True): #MARK: Read
+    """
+    Read only `columns` of a dataset file.
+
+    `.arrow` files are memory-mapped and the returned buffers point straight into the
+    mapping (zero-copy); Parquet is decoded from a memory-mapped file.
+    """
+    if str(filename).endswith(".arrow"):
+        source = pa.memory_map(filename, "r") if memory_map else pa.OSFile(filename, "rb")
+        table = ipc.open_file(source).read_all()
+        return table.select(columns) if columns is not None else table
+    return pq.read_table(filename, columns=columns, memory_map=memory_map)
+
+def read_frame(filename, columns=None):
+    """
+    Load a dataset file as the frame the trainer expects.
+
+    Missing optional columns are skipped, and `labels` comes back as `sequence` holding
+    lists of label strings so rows can be featurized without re-splitting text.
+    """
+    available = pq.read_schema(filename).names if str(filename).endswith(".parquet") else read_table(filename).column_names
+    columns = [column for column in columns if column in available] if columns is not None else None
+    table = read_table(filename, columns=columns)
+    frame = table.drop_columns([column for column in ("labels", "tokens", "tags") if column in table.column_names]).to_pandas()
+
+    names = np.array(LABELS)
+    if "labels" in table.column_names:
+        labels = table.column("labels").combine_chunks()
+        values = names[labels.flatten().to_numpy(zero_copy_only=False)]
+        bounds = labels.offsets.to_numpy()
+        bounds = bounds - bounds[0]
+        frame["sequence"] = [values[start:end].tolist() for start, end in zip(bounds[:-1], bounds[1:])]
+    for column in ("tokens", "tags"):
+        if column in table.column_names:
+            frame[column] = table.column(column).to_pylist()
+    return frame
@@ -1,170 +1,82 @@
-import random
 import logging
 import numpy as np
+from src.ConditionalRandomFields.Vocabulary import VOCAB
+from src.ConditionalRandomFields.Templates import FeatureTemplates, FEATURE_TEMPLATES
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 # 🧪 ✅ ❌
 class FeatureFunctions:
-    def __init__(self, tags, sequence, weights, feature_text):
-        self.tags = tags
-        self.sequence = sequence
+    """
+    CRF features of one sentence, defined by declarative templates (see Templates.py).
+
+    The sentence's index tables are built once; every candidate label sequence is then
+    scored against all templates in a single vectorized pass.
+    """
+    def __init__(self, tags, sequence, weights, feature_text, templates: FeatureTemplates = None):
+        self.templates = templates if templates is not None else FEATURE_TEMPLATES
+        self.tags = VOCAB.encode_tags(tags)
+        self.sequence = VOCAB.encode_labels(sequence if sequence is not None else [])
         self.weights = weights
         self.raw_text = feature_text
         self.feature_text = feature_text.split(" ")
         self.previous_weights = None
+        self.tables = self.templates.tables(self.tags, self.feature_text, self.raw_text)
 
-    def f1(self, tag, label, i): # TIME ✅
-        if label == "TM":
-            if "NUM" == tag or "NOUN" == tag:
-                if ":" in self.raw_text or "AM" in self.raw_text.upper() or "PM" in self.raw_text.upper():
-                    return 1
-        return 0
-    
-    def f2(self, tag, label, i): # DATE ✅
-        if label == "D":
-            if any(month in self.feature_text for month in ["today", "January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]):
-                return 1
-        return 0
-    
-    def f3(self, tag, label, i): # DATE ✅
-        if i > 0 and i < len(self.tags) - 1:
-            if tag == "PROPN" and self.tags[i+1] == "NOUN":
-                if label == "D" and i+1 < len(self.sequence) and self.sequence[i+1] == "D":
-                    return 1
-        return 0
+    def feature_matrix(self, sequences):
+        """Unweighted feature values of an int8 (candidates, length) label matrix: a (candidates, features) array."""
+        sequences = np.atleast_2d(sequences)
+        if sequences.shape[1] != len(self.tags):
+            logger.error(f"Tags and sequence lengths do not match: {len(self.tags)} vs {sequences.shape[1]}")
+            return np.zeros((0, self.templates.size))
+        return self.templates.feature_matrix(self.tables, sequences)
     
-    def f5(self, tag, label, i): # TASK ✅ 
-        if i > 0 and i < len(self.tags) - 1:
-            if tag == "NOUN" and (self.tags[i-1] == "PROPN" or self.tags[i+1] == "NOUN"):
-                if label == "T" and ((i-1 >= 0 and self.sequence[i-1] == "T") or (i+1 < len(self.sequence) and self.sequence[i+1] == "T")):
-                    return 1
-        return 0
-    
-    def f7(self, tag, label, i): #TASK ✅
-        if i > 0 and i < len(self.tags) - 1:
-            if tag in ["NOUN", "PROPN", "VERB"] and self.tags[i-1] in ["VERB", "ADP", "ADJ", "ADV", "PRON"]:
-                if label == "T":
-                    return 2
-        return 0
+    @staticmethod
+    def dropout_masks(rng, batch_size, num_weights, drop_rate=0.2, apply_rate=0.5):
+        """
+        Dropout masks for a whole mini-batch in one draw: a (batch_size, num_weights)
+        array of 0/1 where a random `apply_rate` share of the rows each zero out
+        `drop_rate` of the weights (at least one, never all of them).
+        """
+        masks = np.ones((batch_size, num_weights))
+        if drop_rate <= 0 or num_weights < 2 or batch_size == 0:
+            return masks
 
-    def f9(self, tag, label, i): #TIME 🧪
-        if i >= 2 and i < len(self.tags) - 1:  
-            if label == "TM" and self.sequence[i-2] == "TM":
-                return 1
-        return 0
+        num_drops = max(1, min(int(num_weights * drop_rate), num_weights - 1))
+        applied = np.flatnonzero(rng.random(batch_size) < apply_rate)
+        if len(applied) == 0:
+            return masks
 
-    def f10(self, tag, label, i): #FILLER ✅
-        if i == 0 or (i < len(self.tags) - 1 and i + 1 < len(self.sequence)):  
-            if tag in ["ADP", "PRON", "PROPN", "VERB", "NOUN"] and i + 1 < len(self.tags) and self.tags[i+1] in ["ADP", "PRON", "PROPN", "VERB", "NOUN"]:
-                if label == "O" and self.sequence[i+1] == "O":
-                    return 1.5
-        return 0
-    
-    def f11(self, tag, label, i): #DATE ✅ 
-        if i < len(self.feature_text): 
-            if self.feature_text[i] in ["today", "tomorrow", "tonight", "now", "next", "morning", "night", "afternoon", "evening", "noon", "midnight"]:
-                if label == "D":
-                    return 1
-        return 0
+        dropped = np.argsort(rng.random((len(applied), num_weights)), axis=1)[:, :num_drops]
+        masks[applied[:, None], dropped] = 0.0
+        return masks
 
-    def f13(self, tag, label, i): #TASK 🧪
-        if i > 0 and i < len(self.tags) - 1:
-            if tag in ["NOUN", "PROPN", "VERB"] and self.tags[i-1] == "VERB":
-                if label == "T" and self.sequence[i-1] == "T":
-                    return 2
-        return 0
-    
-    def f14(self, tag, label, i): #FILLER + TASK 🧪
-        if i < len(self.tags) - 2:
-            if tag in ["ADP", "PRON", "PROPN", "NOUN"]:
-                if label == "O" and self.sequence[i+1] == "O" and self.sequence[i+2] == "T": 
-                    return 1.5
-        return 0
-    
-    def dropout(self, drop_rate=0.2):
-        if self.weights is None or len(self.weights) == 0:
-            logger.warning("No weights available for dropout")
-            return self.weights
-        
-        try:
-            active_weights = self.weights.copy()
-            
-            max_possible_drops = len(self.weights) - 1
-            calculated_drops = int(len(self.weights) * drop_rate)
-            
-            num_weights_to_drop = max(1, min(calculated_drops, max_possible_drops))
-            
-            if num_weights_to_drop <= 0:
-                return active_weights
-            
-            droppable_indices = [i for i, w in enumerate(self.weights) if w != 0]
-            
-            if len(droppable_indices) == 0:
-                logger.warning("All weights are zero, cannot apply dropout")
-                return active_weights
-            
-            actual_drops = min(num_weights_to_drop, len(droppable_indices))
-            
-            if actual_drops > 0:
-                weights_to_drop = random.sample(droppable_indices, actual_drops)
-                
-                for idx in weights_to_drop:
-                    active_weights[idx] = 0
-            
-            return active_weights
-            
-        except Exception as e:
-            logger.error(f"Error in dropout function: {e}")
-            return self.weights
-
-    def call_features(self, apply_drop=False, is_training=True):
+    def call_features(self, mask=None, is_training=True):
         if len(self.tags) != len(self.sequence):
             logger.error(f"Tags and sequence lengths do not match: {len(self.tags)} vs {len(self.sequence)}")
             return None
         
-        if is_training and self.weights is not None and apply_drop:
-            active_weights = self.dropout()
-        else:
-            active_weights = self.weights
-            
-        if active_weights is None:
-            logger.warning("Active weights is None, using original weights")
-            active_weights = self.weights
-        
-        feature_functions = [
-            self.f1, self.f2, self.f3,
-            self.f5, self.f7, self.f9,
-            self.f10, self.f11, self.f13, 
-            self.f14]
-        
-        if len(active_weights) < len(feature_functions):
-            logger.error(f"Not enough weights: {len(active_weights)} weights for {len(feature_functions)} features")
+        if self.weights is None:
+            logger.error("No weights to score features with")
             return None
-        
-        outputs = [0.0] * len(feature_functions)
+
+        num_features = self.templates.size
+        if len(self.weights) < num_features:
+            logger.error(f"Not enough weights: {len(self.weights)} weights for {num_features} features")
+            return None
+
+        # Only the template weights are read, so a large (hashed) weight vector is never copied
+        active_weights = np.asarray(self.weights[:num_features], dtype=float)
+        if is_training and mask is not None:
+            # Masks cover the template weights; any weights after them are left as they are
+            mask = np.asarray(mask, dtype=float)[:num_features]
+            active_weights = active_weights.copy()
+            active_weights[:len(mask)] *= mask
         
         try:
-            for i in range(len(self.tags)):
-                if i >= len(self.sequence):  
-                    logger.warning(f"Index {i} exceeds sequence length {len(self.sequence)}")
-                    break
-                    
-                tag = self.tags[i]
-                label = self.sequence[i]
-                
-                for j, feature_function in enumerate(feature_functions):
-                    if j < len(active_weights):
-                        try:
-                            feature_value = feature_function(tag, label, i)
-                            outputs[j] += feature_value * active_weights[j]
-                        except IndexError as e:
-                            logger.error(f"Index error in feature {j} at position {i}: {e}")
-                            continue
-            
-            return outputs
-            
+            values = self.feature_matrix(self.sequence[None, :])[0]
+            return list(values * active_weights)
         except Exception as e:
             logger.error(f"Error in call_features: {e}")
             return None
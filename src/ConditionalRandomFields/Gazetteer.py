@@ -0,0 +1,128 @@
+import ast
+import logging
+import numpy as np
+import pandas as pd
+from collections import deque
+from src.ConditionalRandomFields.Vocabulary import MONTHS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+RELATIVE_DATES = (["today", "tomorrow", "tonight", "day after tomorrow", "this weekend", "next weekend", "next week", "next month"]
+                  + [f"{when} {day}" for when in ("this", "next") for day in WEEKDAYS])
+TIMES = ["noon", "midnight", "morning", "afternoon", "evening", "night", "this morning", "this afternoon", "this evening",
+         "in the morning", "in the afternoon", "in the evening", "at night", "end of day"]
+
+def ordinal(day):
+    return f"{day}{'th' if 11 <= day % 100 <= 13 else {1: 'st', 2: 'nd', 3: 'rd'}.get(day % 10, 'th')}"
+
+DAYS = [str(day) for day in range(1, 32)] + [ordinal(day) for day in range(1, 32)]
+# "May" is also a modal verb ("I may call mom"), so it only counts as a month next to a day
+AMBIGUOUS_MONTHS = ["May"]
+MONTH_PHRASES = ([month for month in MONTHS if month not in AMBIGUOUS_MONTHS]
+                 + [phrase for month in AMBIGUOUS_MONTHS for day in DAYS for phrase in (f"{month} {day}", f"{day} {month}", f"{day} of {month}")])
+DEFAULT_LEXICONS = {"month": MONTH_PHRASES, "weekday": WEEKDAYS, "relative_date": RELATIVE_DATES, "time": TIMES}
+# Characters stripped from token edges before matching ("Friday," matches "friday")
+PUNCTUATION = ".,!?;:\"()"
+
+def normalize(token):
+    return token.lower().strip(PUNCTUATION)
+
+def task_names_from_events(events_path="data/training-events.csv", chunksize=50_000): #MARK: Task lexicons
+    """Distinct event names in the calendar-history file, cleaned the way augmentation cleans them."""
+    names = {}
+    for chunk in pd.read_csv(events_path, chunksize=chunksize):
+        for value in chunk["events"].astype(str):
+            try:
+                items = ast.literal_eval(value)
+            except Exception:
+                continue
+            for item in items:
+                if len(item) >= 4:
+                    name = str(item[0]).replace("-", " ").replace("'", "").replace("/", " ")
+                    names[name] = None
+    return list(names)
+
+def task_names_from_calendar(events):
+    """Summaries of Google Calendar events (as returned by `get_calendar_events`)."""
+    return list(dict.fromkeys(event["summary"] for event in events if event.get("summary")))
+
+class Gazetteer: #MARK: Gazetteer
+    """
+    Token-level Aho-Corasick automaton over named lexicons.
+
+    Phrases are split on spaces and matched case-insensitively, so "day after
+    tomorrow" or a multi-word task name is found in one left-to-right pass over an
+    utterance however many phrases are loaded; overlapping matches are all reported.
+    """
+    def __init__(self, lexicons=None):
+        self.lexicons = {category: list(phrases) for category, phrases in (lexicons if lexicons is not None else DEFAULT_LEXICONS).items()}
+        self.categories = list(self.lexicons)
+        self.category_ids = {category: i for i, category in enumerate(self.categories)}
+        self.build()
+
+    def config(self):
+        return {"lexicons": self.lexicons}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(config["lexicons"])
+
+    def build(self):
+        # Trie: goto[node] maps a token to the next node; outputs[node] lists (phrase length, category id)
+        self.goto = [{}]
+        self.outputs = [[]]
+        for category, phrases in self.lexicons.items():
+            for phrase in phrases:
+                tokens = [normalize(token) for token in str(phrase).split()]
+                tokens = [token for token in tokens if token]
+                if not tokens:
+                    continue
+                node = 0
+                for token in tokens:
+                    if token not in self.goto[node]:
+                        self.goto.append({})
+                        self.outputs.append([])
+                        self.goto[node][token] = len(self.goto) - 1
+                    node = self.goto[node][token]
+                output = (len(tokens), self.category_ids[category])
+                if output not in self.outputs[node]:
+                    self.outputs[node].append(output)
+
+        # Failure links in breadth-first order; each node inherits its failure node's outputs
+        self.fail = [0] * len(self.goto)
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for token, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and token not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(token, 0)
+                self.outputs[child] = self.outputs[child] + [output for output in self.outputs[self.fail[child]] if output not in self.outputs[child]]
+        logger.debug(f"Gazetteer with {len(self.goto)} states over {', '.join(self.categories)}")
+
+    def matches(self, tokens):
+        """(start, stop, category) of every lexicon phrase in `tokens`."""
+        found = []
+        node = 0
+        for position, token in enumerate(tokens):
+            token = normalize(token)
+            while node and token not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(token, 0)
+            for length, category in self.outputs[node]:
+                found.append((position + 1 - length, position + 1, self.categories[category]))
+        return found
+
+    def mark(self, tokens, length=None):
+        """(positions, categories) bool array: token i lies inside a match of the category."""
+        length = len(tokens) if length is None else length
+        marks = np.zeros((length, len(self.categories)), dtype=bool)
+        for start, stop, category in self.matches(tokens[:length]):
+            marks[start:stop, self.category_ids[category]] = True
+        return marks
+
+DEFAULT_GAZETTEER = Gazetteer()
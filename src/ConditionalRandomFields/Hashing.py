@@ -0,0 +1,94 @@
+import re
+import zlib
+import logging
+import numpy as np
+from functools import lru_cache
+from src.ConditionalRandomFields.Labeling import LABELS
+from src.ConditionalRandomFields.Sparse import CSRActivations, gather
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+HASHED_KINDS = ("word", "suffix", "shape")
+
+def word_shape(token):
+    # "6:30pm" -> "d:dx", "July" -> "Xx": character classes with repeats collapsed
+    shape = re.sub(r"[A-Z]", "X", token)
+    shape = re.sub(r"[a-z]", "x", shape)
+    shape = re.sub(r"[0-9]", "d", shape)
+    return re.sub(r"(.)\1+", r"\1", shape)
+
+class HashedFeatures: #MARK: Hashed features
+    """
+    Word identity, suffix and shape features hashed into a fixed-size weight array.
+
+    Every (feature, label) pair maps to one of `2 ** bits` slots with crc32, so memory
+    stays bounded however many distinct words the data has. A sentence is prepared
+    once into an (positions, kinds, labels) index array; its candidates' activations
+    are a CSR matrix over those slots, so scoring is a gather and the gradient a
+    sparse vector over just the slots that fired.
+    """
+    def __init__(self, bits=18, suffix_length=3, kinds=HASHED_KINDS, num_labels=len(LABELS)):
+        unknown = set(kinds) - set(HASHED_KINDS)
+        if unknown:
+            raise ValueError(f"Unknown hashed feature kinds: {sorted(unknown)}")
+        self.bits = bits
+        self.size = 2 ** bits
+        self.suffix_length = suffix_length
+        self.kinds = tuple(kinds)
+        self.num_labels = num_labels
+        self._keys = lru_cache(maxsize=100_000)(self._token_keys)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        state.pop("_keys")
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._keys = lru_cache(maxsize=100_000)(self._token_keys)
+
+    def config(self):
+        return {"bits": self.bits, "suffix_length": self.suffix_length, "kinds": list(self.kinds)}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(bits=config["bits"], suffix_length=config["suffix_length"], kinds=config["kinds"])
+
+    def _token_keys(self, token):
+        lowered = token.lower()
+        values = {"word": lowered, "suffix": lowered[-self.suffix_length:], "shape": word_shape(token)}
+        return tuple(zlib.crc32(f"{kind}={values[kind]}".encode("utf-8")) for kind in self.kinds)
+
+    def indices(self, tokens, length=None):
+        """Weight slots of every (position, kind, label): an int64 (length, kinds, labels) array."""
+        length = len(tokens) if length is None else length
+        tokens = list(tokens[:length]) + [""] * (length - len(tokens))
+        keys = np.array([self._keys(token) for token in tokens], dtype=np.int64).reshape(length, len(self.kinds))
+        return (keys[:, :, None] * self.num_labels + np.arange(self.num_labels)) % self.size
+
+    def emissions(self, weights, indices):
+        """(positions, labels) score of putting each label at each position."""
+        return gather(weights, indices).sum(axis=1)
+
+    def activations(self, indices, sequences, offset=0):
+        """CSR (candidates, weights) matrix: row c fires slot `indices[i, k, sequences[c, i]]` for every i, k."""
+        sequences = np.atleast_2d(sequences)
+        length, kinds = indices.shape[:2]
+        fired = indices.transpose(0, 2, 1)[np.arange(length), sequences]
+        per_row = length * kinds
+        return CSRActivations(np.arange(len(sequences) + 1) * per_row, fired.reshape(-1) + offset,
+                              np.ones(fired.size), offset + self.size)
+
+    def scores(self, weights, indices, sequences):
+        return self.activations(indices, sequences).dot(weights)
+
+    def gradient(self, indices, sequences, probabilities, true_sequence, offset=0):
+        """
+        Sparse gradient of the negative log-likelihood as a SparseVector: expected slot
+        counts under the candidates' `probabilities` minus the true sequence's counts.
+        `offset` shifts the slots to where the hashed weights start in the weight vector.
+        """
+        expected = self.activations(indices, sequences, offset).weighted_sum(probabilities)
+        observed = self.activations(indices, true_sequence, offset).row(0)
+        return expected - observed
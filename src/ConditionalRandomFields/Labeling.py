@@ -0,0 +1,106 @@
+import logging
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Label alphabet of the model; a label's integer code is its position here
+LABELS = ["T", "TM", "D", "O"]
+LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+
+# Component columns of an augmented row and the label their tokens get
+SPAN_COMPONENTS = [("predicate", "O"), ("event", "T"), ("date", "D"), ("start_time", "TM"), ("end_time", "TM")]
+# Gold span columns of data/TIM.csv
+TIM_COMPONENTS = [("task", "T"), ("date", "D"), ("time", "TM")]
+
+def token_offsets(texts): #MARK: Token offsets
+    """Explode whitespace tokens of every text with their row position and character start offset."""
+    tokens = texts.astype(str).str.split(" ").explode()
+    rows = np.repeat(np.arange(len(texts)), texts.astype(str).str.count(" ").to_numpy() + 1)
+    widths = tokens.str.len().to_numpy() + 1
+    ends = np.cumsum(widths)
+    row_starts = np.zeros(len(texts), dtype=np.int64)
+    first_token = np.r_[0, np.flatnonzero(np.diff(rows)) + 1]
+    row_starts[rows[first_token]] = ends[first_token] - widths[first_token]
+    starts = ends - widths - row_starts[rows]
+    return rows, starts
+
+def token_codes(frame, components=SPAN_COMPONENTS, text_column="full_text"):
+    """
+    Label code of every whitespace token of `text_column`, flattened in row order.
+
+    `frame` needs, for each (component, label) pair, the component text and its
+    `<component>_start` character offset (negative when the component is absent).
+    A token takes the label of the first span that contains its first character;
+    tokens outside every span are "O". Returns the token row positions and int8 codes.
+    """
+    rows, starts = token_offsets(frame[text_column])
+    conditions = []
+    choices = []
+    for component, label in components:
+        span_start = frame[f"{component}_start"].to_numpy(dtype=np.int64)[rows]
+        span_end = span_start + frame[component].fillna("").astype(str).str.len().to_numpy()[rows]
+        conditions.append((span_start >= 0) & (starts >= span_start) & (starts < span_end))
+        choices.append(LABEL_CODES[label])
+
+    codes = np.select(conditions, choices, default=LABEL_CODES["O"]).astype(np.int8)
+    return rows, codes
+
+def label_frame(frame, components=SPAN_COMPONENTS, text_column="full_text"): #MARK: Span labels
+    """Space-joined label sequence of every row, see `token_codes`."""
+    rows, codes = token_codes(frame, components, text_column)
+    return join_labels(rows, codes, frame.index)
+
+def join_labels(rows, codes, index):
+    labels = np.array(LABELS)[codes]
+    # Tokens are already in row order: join everything once and split rows back apart
+    last = np.r_[np.diff(rows) != 0, True]
+    pieces = np.where(last, np.char.add(labels, "\n"), np.char.add(labels, " "))
+    sequences = "".join(pieces.tolist()).split("\n")[:-1]
+    return pd.Series(sequences, index=index)
+
+def label_spans(frame, workers=None, chunksize=50_000):
+    if not workers or workers <= 1 or len(frame) <= chunksize:
+        return label_frame(frame)
+
+    columns = ["full_text"] + [column for component, _ in SPAN_COMPONENTS for column in (component, f"{component}_start")]
+    chunks = [frame.iloc[start:start + chunksize][columns] for start in range(0, len(frame), chunksize)]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return pd.concat(list(pool.map(label_frame, chunks)))
+
+def locate_spans(frame, components=TIM_COMPONENTS, text_column="text"): #MARK: Gold spans
+    """Add `<component>_start` offsets by finding each component in the text (case-insensitive, -1 if absent)."""
+    lowered = frame[text_column].astype(str).str.lower()
+    for component, _ in components:
+        needles = frame[component].fillna("").astype(str).str.lower()
+        frame[f"{component}_start"] = [text.find(needle) if needle else -1 for text, needle in zip(lowered, needles)]
+    return frame
+
+def tim_frame(data):
+    """
+    Turn the gold `text, task, time, date` layout of data/TIM.csv into training rows.
+
+    Every span column is aligned to the whitespace tokens of `text` in one vectorized
+    pass. The result has the `full_text`/`sequence` columns the trainer reads plus
+    `labels`, the int8 label codes of each row (see LABELS).
+    """
+    frame = locate_spans(data.copy())
+    missing = np.zeros(len(frame), dtype=bool)
+    for component, _ in TIM_COMPONENTS:
+        missing |= frame[component].notna().to_numpy() & (frame[f"{component}_start"].to_numpy() < 0)
+    if missing.any():
+        logger.warning(f"{int(missing.sum())} rows have span text that does not occur in their text; those tokens are labeled O")
+
+    rows, codes = token_codes(frame, TIM_COMPONENTS, text_column="text")
+    boundaries = np.flatnonzero(np.diff(rows)) + 1
+    frame["labels"] = np.split(codes, boundaries)
+    frame["full_text"] = frame["text"]
+    frame["sequence"] = join_labels(rows, codes, frame.index)
+    return frame
+
+def load_tim(filename="data/TIM.csv"):
+    frame = tim_frame(pd.read_csv(filename))
+    logger.info(f"Loaded {len(frame)} labeled rows from {filename}")
+    return frame
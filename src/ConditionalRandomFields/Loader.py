@@ -0,0 +1,92 @@
+import time
+import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class DataLoader: #MARK: Data loader
+    """
+    Ordered background prefetching for the training loop.
+
+    Up to `depth` upcoming items are featurized by `workers` threads (or processes)
+    while the caller works on the current one; items come back in input order.
+    `stats()` reports how long the consumer stalled waiting for input and how full
+    the prefetch queue was, which tells whether an epoch is input- or compute-bound.
+    `initializer(*initargs)` runs once per worker (once in-process when `workers` is 0).
+    """
+    def __init__(self, items, featurize, workers=2, depth=64, backend="thread", initializer=None, initargs=()):
+        if backend not in ("thread", "process"):
+            raise ValueError(f"Unknown loader backend: {backend}")
+        self.items = items
+        self.featurize = featurize
+        self.workers = workers
+        self.depth = max(1, depth)
+        self.backend = backend
+        self.initializer = initializer
+        self.initargs = initargs
+
+        self.consumed = 0
+        self.stall_seconds = 0.0
+        self.depth_total = 0
+        self.depth_max = 0
+        self.started = None
+        self.finished = None
+
+    def __iter__(self):
+        self.started = time.perf_counter()
+        if self.workers <= 0:
+            yield from self._serial()
+        else:
+            yield from self._prefetch()
+        self.finished = time.perf_counter()
+
+    def _serial(self):
+        if self.initializer is not None:
+            self.initializer(*self.initargs)
+        for item in self.items:
+            start = time.perf_counter()
+            result = self.featurize(item)
+            self.stall_seconds += time.perf_counter() - start
+            self.consumed += 1
+            yield result
+
+    def _prefetch(self):
+        executor = ThreadPoolExecutor if self.backend == "thread" else ProcessPoolExecutor
+        items = iter(self.items)
+        pending = deque()
+        with executor(max_workers=self.workers, initializer=self.initializer, initargs=self.initargs) as pool:
+            exhausted = False
+            while True:
+                while not exhausted and len(pending) < self.depth:
+                    try:
+                        pending.append(pool.submit(self.featurize, next(items)))
+                    except StopIteration:
+                        exhausted = True
+                if not pending:
+                    break
+
+                ready = sum(1 for future in pending if future.done())
+                self.depth_total += ready
+                self.depth_max = max(self.depth_max, ready)
+
+                future = pending.popleft()
+                start = time.perf_counter()
+                result = future.result()
+                self.stall_seconds += time.perf_counter() - start
+                self.consumed += 1
+                yield result
+
+    def stats(self):
+        elapsed = ((self.finished or time.perf_counter()) - self.started) if self.started else 0.0
+        stall_fraction = self.stall_seconds / elapsed if elapsed > 0 else 0.0
+        return {
+            "items": self.consumed,
+            "seconds": elapsed,
+            "stall_seconds": self.stall_seconds,
+            "stall_fraction": stall_fraction,
+            "avg_queue_depth": self.depth_total / self.consumed if self.consumed else 0.0,
+            "max_queue_depth": self.depth_max,
+            "bound": "input" if stall_fraction > 0.5 else "compute",
+        }
@@ -0,0 +1,217 @@
+import os
+import json
+import time
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from src.ConditionalRandomFields.CRF import Predict, save_model
+from src.ConditionalRandomFields.CRFFunctions import Process, FeatureFunctions, Score, BackProp, tagger_config
+from src.ConditionalRandomFields.Bundle import write_bundle, is_bundle
+from src.ConditionalRandomFields.Sparse import SparseWeights
+from src.ConditionalRandomFields.Vocabulary import VOCAB
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+LABEL_ALPHABET = ["T", "TM", "D", "O"]
+METHODS = ("perceptron", "crf")
+
+class CorrectionJournal: #MARK: Journal
+    """
+    Append-only JSONL log of the corrections applied since the model was last saved.
+
+    Every entry carries the running update number, and the saved model records the
+    number it includes, so replaying the journal after a crash never applies a
+    correction twice. Lines are flushed (not fsynced) as they are written.
+    """
+    def __init__(self, filename):
+        self.filename = filename
+        self.file = None
+
+    def entries(self):
+        if not os.path.exists(self.filename):
+            return []
+        entries = []
+        with open(self.filename, "r") as f:
+            for number, line in enumerate(f, 1):
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # Only the last line can be cut short by a crash mid-write
+                    logger.warning(f"Skipping unreadable line {number} of {self.filename}")
+        return entries
+
+    def append(self, entry):
+        if self.file is None:
+            self.file = open(self.filename, "a")
+        self.file.write(json.dumps(entry) + "\n")
+        self.file.flush()
+
+    def clear(self):
+        self.close()
+        if os.path.exists(self.filename):
+            os.remove(self.filename)
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+class OnlineLearner: #MARK: Online learner
+    """
+    A resident model that learns from user corrections one example at a time.
+
+    `method="perceptron"` steps on the difference between the parse the user saw and
+    their correction (the training gradient with the wrong parse as the only
+    candidate), so an update only visits the features of those two sequences.
+    `method="crf"` takes the full regularized training step over sampled candidates.
+    Both use the training L2 and clipping. Corrections are journaled next to the model
+    and the model file is rewritten every `flush_every` updates or `flush_seconds`.
+    """
+    def __init__(self, filename="data/weights.json", journal_path=None, method="perceptron", learning_rate=0.008,
+                 l2_strength=0.001, clip=(-0.5, 0.5), flush_every=50, flush_seconds=300, max_permutations=1000, recent=64):
+        if method not in METHODS:
+            raise ValueError(f"Unknown update method {method!r}, expected one of {METHODS}")
+        if not os.path.exists(filename):
+            raise FileNotFoundError(f"No model to update at {filename}")
+        self.filename = filename
+        self.method = method
+        self.learning_rate = learning_rate
+        self.l2_strength = l2_strength
+        self.clip = tuple(clip)
+        self.flush_every = flush_every
+        self.flush_seconds = flush_seconds
+        self.max_permutations = max_permutations
+        self.lock = threading.RLock()
+        # Tags, feature tables and shown parse of the latest utterances, so a correction needs no spaCy, decode or table build
+        self.recent = OrderedDict()
+        self.recent_size = recent
+
+        model = Predict("", filename)
+        self.templates, self.hashing, self.transitions = model.templates, model.hashing, model.transitions
+        self.metadata = dict(model.metadata)
+        self.weights = SparseWeights(np.asarray(model.weights, dtype=float))
+        values = self.weights.values
+        if values.size and values.min() >= self.clip[0] and values.max() <= self.clip[1]:
+            # Trained with these bounds already, so even the first update can stay sparse
+            self.weights.clip_bounds = self.clip
+        self.updates = self.saved_updates = int(self.metadata.get("online_updates", 0))
+        self.last_flush = time.monotonic()
+        self.update_seconds = 0.0
+        self.timed_updates = 0
+
+        self.journal = CorrectionJournal(journal_path or f"{filename}.journal")
+        self.replay()
+
+    def replay(self):
+        pending = [entry for entry in self.journal.entries() if entry.get("update", 0) > self.saved_updates]
+        for entry in pending:
+            features = FeatureFunctions(entry["tags"], None, self.weights, entry["text"], self.templates)
+            self.step(entry["text"], entry["labels"], entry.get("predicted"), features, entry.get("method", self.method))
+            self.updates = entry["update"]
+        if pending:
+            logger.info(f"Replayed {len(pending)} journaled corrections onto {self.filename}")
+
+    def remember(self, text, tags, labels, features=None):
+        if features is None:
+            features = FeatureFunctions(tags, None, self.weights, text, self.templates)
+        self.recent[text] = {"tags": tags, "labels": labels, "features": features}
+        self.recent.move_to_end(text)
+        while len(self.recent) > self.recent_size:
+            self.recent.popitem(last=False)
+
+    def predict(self, text): #MARK: Predict
+        with self.lock:
+            if text in self.recent:
+                tags, features = self.recent[text]["tags"], self.recent[text]["features"]
+            else:
+                tags, features = Process(LABEL_ALPHABET, len(text.split(" ")), text).get_tags(), None
+            labels = Predict(text, model=self).predict(tags=tags)
+            self.remember(text, tags, list(labels) if labels else None, features)
+            return labels
+
+    def process_labels(self, text, labels):
+        return Predict(text, model=self).process_labels(labels)
+
+    def step(self, text, labels, predicted, features: FeatureFunctions, method):
+        """One gradient step towards `labels`; returns False when there was nothing to learn."""
+        label = VOCAB.encode_labels(labels)
+        tags = features.tags
+        if method == "perceptron":
+            if predicted is None or list(predicted) == list(labels):
+                return False
+            sequences = VOCAB.encode_labels(predicted)[None, :]
+        else:
+            sequences = Process(LABEL_ALPHABET, len(labels), text).get_sequences(max_permutations=self.max_permutations)
+            if not (sequences == label).all(axis=1).any():
+                sequences = np.vstack([sequences, label])
+
+        # Candidates and the correction in one pass over the sentence's cached tables
+        values = features.feature_matrix(np.vstack([sequences, label]))
+        scorer = Score(sequences, label, self.weights, text, self.templates, self.hashing, self.transitions)
+        scorer.features = values[:-1]
+        true_scores = values[-1] * np.asarray(self.weights[:values.shape[1]], dtype=float)
+        scorer.z_out(tags)
+        backprop = BackProp(self.weights, tags, sequences, text, learning_rate=self.learning_rate,
+                            l2_strength=self.l2_strength, clip=self.clip)
+        self.weights = backprop.update_weights(backprop.gradient(true_scores, scorer))
+        return True
+
+    def correct(self, text, labels, predicted=None, method=None): #MARK: Correct
+        """
+        Learn that `text` should be labeled `labels` (one label per space-separated
+        token). `predicted` defaults to the parse this learner last returned for `text`.
+        """
+        labels = labels.split(" ") if isinstance(labels, str) else list(labels)
+        method = method or self.method
+        if method not in METHODS:
+            raise ValueError(f"Unknown update method {method!r}, expected one of {METHODS}")
+        if len(labels) != len(text.split(" ")):
+            raise ValueError(f"{len(labels)} labels for {len(text.split(' '))} tokens in {text!r}")
+        with self.lock:
+            if text not in self.recent or (predicted is None and self.recent[text]["labels"] is None and method == "perceptron"):
+                self.predict(text)
+            recent = self.recent[text]
+            tags, features = recent["tags"], recent["features"]
+            predicted = list(predicted) if predicted is not None else recent["labels"]
+
+            start = time.perf_counter()
+            if not self.step(text, labels, predicted, features, method):
+                return False
+            self.update_seconds += time.perf_counter() - start
+            self.timed_updates += 1
+            self.updates += 1
+            self.journal.append({"update": self.updates, "text": text, "labels": labels, "predicted": predicted,
+                                 "tags": list(tags), "method": method, "time": time.time()})
+            self.remember(text, tags, labels, features)
+            if (self.updates - self.saved_updates >= self.flush_every
+                    or time.monotonic() - self.last_flush >= self.flush_seconds):
+                self.flush()
+            return True
+
+    def flush(self): #MARK: Flush
+        """Write the updated model over its file, then drop the journal it now includes."""
+        with self.lock:
+            if self.updates == self.saved_updates:
+                return
+            metadata = {**self.metadata, "online_updates": self.updates}
+            if is_bundle(self.filename):
+                write_bundle(self.filename, self.weights.dense(), self.templates, self.hashing, self.transitions,
+                             tagger=tagger_config(), metadata=metadata)
+            else:
+                save_model(self.filename, self.weights, self.templates, self.hashing, self.transitions, metadata=metadata)
+            self.journal.clear()
+            self.metadata = metadata
+            applied = self.updates - self.saved_updates
+            self.saved_updates = self.updates
+            self.last_flush = time.monotonic()
+            logger.info(f"Saved {applied} online updates to {self.filename} ({self.stats()['avg_update_ms']:.3f} ms/update)")
+
+    def close(self):
+        self.flush()
+        self.journal.close()
+
+    def stats(self):
+        return {"updates": self.updates, "unsaved": self.updates - self.saved_updates,
+                "avg_update_ms": 1000 * self.update_seconds / self.timed_updates if self.timed_updates else 0.0}
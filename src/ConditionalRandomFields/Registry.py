@@ -0,0 +1,104 @@
+import os
+import re
+import logging
+import threading
+import numpy as np
+from collections import OrderedDict
+from src.ConditionalRandomFields.Bundle import ModelBundle, BUNDLE_SUFFIX
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+MODEL_ID = re.compile(r"[A-Za-z0-9_][A-Za-z0-9_.-]*")
+
+class ModelRegistry: #MARK: Registry
+    """
+    Per-user models kept resident in least-recently-used order under a memory cap.
+
+    A model id maps to `<root>/<model_id>.crfm` unless registered to another bundle.
+    Weights are read into memory on first use; when the resident models exceed
+    `max_bytes`, the least recently used ones are dropped (the model just requested
+    always stays). Models share compiled templates and hashed-feature tables through
+    one `shared` dict, and every prediction runs on the process's single spaCy pipeline.
+    """
+    def __init__(self, root="data/models", max_bytes=256 * 2**20, verify=True):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.verify = verify
+        self.paths = {}
+        self.models = OrderedDict()
+        self.shared = {}
+        self.lock = threading.RLock()
+        self.counters = {"hits": 0, "misses": 0, "evictions": 0}
+
+    def register(self, model_id, filename):
+        with self.lock:
+            self.paths[self.check_id(model_id)] = filename
+            self.models.pop(model_id, None)
+
+    @staticmethod
+    def check_id(model_id):
+        # Ids become file names, so nothing that could leave the model directory
+        if not isinstance(model_id, str) or not MODEL_ID.fullmatch(model_id):
+            raise ValueError(f"Invalid model id: {model_id!r}")
+        return model_id
+
+    def path(self, model_id):
+        return self.paths.get(model_id, os.path.join(self.root, f"{self.check_id(model_id)}{BUNDLE_SUFFIX}"))
+
+    @property
+    def resident_bytes(self):
+        return sum(model.nbytes for model in self.models.values())
+
+    def get(self, model_id) -> ModelBundle: #MARK: Lookup
+        with self.lock:
+            if model_id in self.models:
+                self.counters["hits"] += 1
+                self.models.move_to_end(model_id)
+                return self.models[model_id]
+
+            self.counters["misses"] += 1
+            model = ModelBundle.load(self.path(model_id), verify=self.verify, shared=self.shared)
+            # Copy out of the memory map so the bundle file can be replaced (e.g. after fine-tuning) while resident
+            model.weights = np.array(model.weights)
+            self.models[model_id] = model
+            self.evict_to_fit()
+            logger.info(f"Loaded model {model_id} ({model.nbytes / 2**20:.1f} MiB); {len(self.models)} resident, "
+                        f"{self.resident_bytes / 2**20:.1f}/{self.max_bytes / 2**20:.1f} MiB")
+            return model
+
+    def evict_to_fit(self):
+        while len(self.models) > 1 and self.resident_bytes > self.max_bytes:
+            model_id, _ = self.models.popitem(last=False)
+            self.counters["evictions"] += 1
+            logger.info(f"Evicted model {model_id}")
+        if self.resident_bytes > self.max_bytes:
+            logger.warning(f"Model {next(iter(self.models))} alone needs {self.resident_bytes} bytes, over the {self.max_bytes} byte cap")
+        self.release_shared()
+
+    def evict(self, model_id):
+        """Drop a model now, e.g. after its bundle was retrained; the next call reloads it."""
+        with self.lock:
+            if self.models.pop(model_id, None) is not None:
+                self.counters["evictions"] += 1
+            self.release_shared()
+
+    def release_shared(self):
+        # Compiled templates / hashing tables only stay while a resident model uses them
+        live = {key for model in self.models.values() for key in model.shared_keys}
+        for key in [key for key in self.shared if key not in live]:
+            del self.shared[key]
+
+    def predict(self, model_id, text):
+        """Best label sequence for `text` under the model `model_id`."""
+        # Imported here so the registry itself does not load the spaCy pipeline
+        from src.ConditionalRandomFields.CRF import Predict
+        from src.ConditionalRandomFields.CRFFunctions import tagger_config
+        model = self.get(model_id)
+        model.check_tagger(tagger_config())
+        return Predict(text, model=model).predict()
+
+    def stats(self):
+        with self.lock:
+            return {**self.counters, "resident": list(self.models), "resident_bytes": self.resident_bytes,
+                    "shared_objects": len(self.shared)}
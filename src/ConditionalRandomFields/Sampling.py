@@ -0,0 +1,78 @@
+import logging
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class HardExampleSampler: #MARK: Hard example sampler
+    """
+    Loss-proportional row sampling for training epochs.
+
+    The sampler keeps a running (exponentially decayed) loss per training row.
+    After `warmup_epochs` full passes, each epoch draws `epoch_fraction` of the
+    rows with probability proportional to that loss, mixed with a uniform share
+    so no row is starved. Every drawn row carries the importance weight
+    1 / (N * p), which keeps the expected gradient equal to a full epoch's.
+    """
+    def __init__(self, epoch_fraction=0.3, uniform_mix=0.2, decay=0.5, warmup_epochs=1, seed=0):
+        if not 0 < epoch_fraction <= 1:
+            raise ValueError("epoch_fraction must be in (0, 1]")
+        if not 0 < uniform_mix <= 1:
+            raise ValueError("uniform_mix must be in (0, 1]")
+        self.epoch_fraction = epoch_fraction
+        self.uniform_mix = uniform_mix
+        self.decay = decay
+        self.warmup_epochs = warmup_epochs
+        self.seed = seed
+        self.losses = None
+        self.current = None
+
+    def attach(self, num_rows):
+        if self.losses is None:
+            self.losses = np.full(num_rows, np.nan)
+        elif len(self.losses) != num_rows:
+            raise ValueError(f"Sampler tracks {len(self.losses)} rows but the training split has {num_rows}")
+
+    def update(self, row, loss):
+        previous = self.losses[row]
+        self.losses[row] = loss if np.isnan(previous) else self.decay * previous + (1 - self.decay) * loss
+
+    def probabilities(self):
+        losses = self.losses.copy()
+        seen = ~np.isnan(losses)
+        # Rows that have never been scored are treated as the hardest seen so far
+        losses[~seen] = losses[seen].max() if seen.any() else 1.0
+        losses = np.clip(losses, 1e-12, None)
+        num_rows = len(losses)
+        return (1 - self.uniform_mix) * losses / losses.sum() + self.uniform_mix / num_rows
+
+    def draw(self, epoch):
+        if self.current is not None and self.current[0] == epoch:
+            return self.current[1], self.current[2]
+
+        num_rows = len(self.losses)
+        if epoch < self.warmup_epochs or np.isnan(self.losses).all():
+            rows = np.random.default_rng([self.seed, epoch]).permutation(num_rows)
+            weights = np.ones(num_rows)
+        else:
+            p = self.probabilities()
+            size = max(1, int(num_rows * self.epoch_fraction))
+            rows = np.random.default_rng([self.seed, epoch]).choice(num_rows, size=size, replace=True, p=p)
+            weights = 1.0 / (num_rows * p[rows])
+            logger.info(f"Hard-example epoch {epoch + 1}: {size}/{num_rows} rows, importance weights {weights.min():.2f}-{weights.max():.2f}")
+
+        self.current = (epoch, rows, weights)
+        return rows, weights
+
+    def state_dict(self):
+        return {
+            "losses": [None if np.isnan(loss) else float(loss) for loss in self.losses] if self.losses is not None else None,
+            "current": None if self.current is None else [self.current[0], self.current[1].tolist(), self.current[2].tolist()],
+        }
+
+    def load_state_dict(self, state):
+        if state.get("losses") is not None:
+            self.losses = np.array([np.nan if loss is None else loss for loss in state["losses"]], dtype=float)
+        if state.get("current") is not None:
+            epoch, rows, weights = state["current"]
+            self.current = (epoch, np.array(rows, dtype=int), np.array(weights, dtype=float))
@@ -0,0 +1,155 @@
+import json
+import time
+import random
+import logging
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from src.ConditionalRandomFields.CRF import Train, load_dataset
+from src.ConditionalRandomFields.CRFFunctions import TagCache
+from src.ConditionalRandomFields.Split import SplitIndex
+from src.ConditionalRandomFields.Templates import FEATURE_TEMPLATES, select_templates
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SEARCH_SPACE = {
+    "learning_rate": [0.002, 0.004, 0.008, 0.016, 0.032],
+    "l2_strength": [0.0, 0.0005, 0.001, 0.005],
+    "drop_rate": [0.0, 0.1, 0.2, 0.3],
+    "clip": [0.25, 0.5, 1.0],
+}
+
+_TAG_CACHE = None
+
+def _init_worker(tag_cache_path):
+    global _TAG_CACHE
+    _TAG_CACHE = TagCache(tag_cache_path)
+
+def run_trial(filename, config, start_epoch, epochs, weights, seed, num_features=None, names=None): #MARK: Trial worker
+    """
+    Train `epochs` more epochs from `weights` (fresh ones if None) with the hyperparameters
+    in `config`, then validate. `names` restricts the model to those feature templates.
+    """
+    start = time.perf_counter()
+    random.seed(seed + start_epoch)
+    np.random.seed(seed + start_epoch)
+    templates = select_templates(names) if names is not None else FEATURE_TEMPLATES
+    if weights is None:
+        weights = list(np.random.default_rng(seed).random(num_features or templates.size) * (1 - 0.1) - 0.1)
+
+    trainer = None
+    for epoch in range(start_epoch, start_epoch + epochs):
+        trainer = Train(weights=weights, filename=filename, num_features=num_features, seed=seed, epoch=epoch, templates=templates,
+                        learning_rate=config["learning_rate"], l2_strength=config["l2_strength"],
+                        clip=(-config["clip"], config["clip"]), drop_rate=config["drop_rate"],
+                        tag_cache=_TAG_CACHE, verbose=False)
+        trainer.train()
+        weights = trainer.weights
+    trainer.validation()
+
+    return {
+        "train_loss": float(trainer.avg_loss),
+        "validation_loss": float(trainer.validation_avg_loss),
+        "weights": [float(weight) for weight in weights],
+        "seconds": time.perf_counter() - start,
+    }
+
+def prepare_data(filename, tag_cache_path):
+    """Build the split index and tag cache once, before the workers start, so they only read them."""
+    data = load_dataset(filename)
+    SplitIndex(filename).load(len(data))
+    tag_cache = TagCache(tag_cache_path).build(data["full_text"].tolist())
+    tag_cache.save(tag_cache_path)
+    return data, tag_cache
+
+class HyperparameterSearch: #MARK: Search
+    """
+    Grid or random search over the training hyperparameters with successive halving.
+
+    Every surviving configuration is trained for the current rung's epoch budget in
+    a process pool; after each rung only the best ``1 / eta`` continue (from their
+    current weights) with ``eta`` times the budget, so poor configurations stop early.
+    """
+    def __init__(self, filename="data/aug_TIM.csv", space=None, strategy="random", trials=27, min_epochs=1, max_epochs=9,
+                 eta=3, workers=None, seed=0, num_features=None, tag_cache_path="data/tag_cache.json"):
+        if strategy not in ("grid", "random"):
+            raise ValueError(f"Unknown search strategy: {strategy}")
+        self.filename = filename
+        self.space = space or SEARCH_SPACE
+        self.strategy = strategy
+        self.trials = trials
+        self.min_epochs = min_epochs
+        self.max_epochs = max_epochs
+        self.eta = eta
+        self.workers = workers
+        self.seed = seed
+        self.num_features = num_features
+        self.tag_cache_path = tag_cache_path
+        self.leaderboard = []
+
+    def configs(self):
+        names = list(self.space)
+        if self.strategy == "grid":
+            return [dict(zip(names, values)) for values in itertools.product(*(self.space[name] for name in names))]
+
+        rng = np.random.default_rng(self.seed)
+        return [{name: self.space[name][rng.integers(len(self.space[name]))] for name in names} for _ in range(self.trials)]
+
+    def prepare(self):
+        prepare_data(self.filename, self.tag_cache_path)
+
+    def run(self):
+        self.prepare()
+        trials = [{"trial": i, "config": config, "epochs": 0, "weights": None, "seconds": 0.0,
+                   "train_loss": None, "validation_loss": None, "stopped_at": None}
+                  for i, config in enumerate(self.configs())]
+        logger.info(f"Searching {len(trials)} configurations ({self.strategy}) with eta={self.eta}")
+
+        survivors = trials
+        budget = self.min_epochs
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker, initargs=(self.tag_cache_path,)) as pool:
+            while survivors:
+                futures = {
+                    pool.submit(run_trial, self.filename, trial["config"], trial["epochs"], budget - trial["epochs"],
+                                trial["weights"], self.seed + trial["trial"], self.num_features): trial
+                    for trial in survivors
+                }
+                for future in as_completed(futures):
+                    trial = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"Trial {trial['trial']} failed: {e}")
+                        trial["validation_loss"] = float("inf")
+                        continue
+                    trial["epochs"] = budget
+                    trial["seconds"] += result["seconds"]
+                    trial["weights"] = result["weights"]
+                    trial["train_loss"] = result["train_loss"]
+                    trial["validation_loss"] = result["validation_loss"]
+
+                survivors = sorted(survivors, key=lambda trial: trial["validation_loss"])
+                logger.info(f"Rung at {budget} epoch(s): best validation loss {survivors[0]['validation_loss']:.4f}")
+                if budget >= self.max_epochs or len(survivors) == 1:
+                    break
+
+                keep = max(1, len(survivors) // self.eta)
+                for trial in survivors[keep:]:
+                    trial["stopped_at"] = budget
+                survivors = survivors[:keep]
+                budget = min(budget * self.eta, self.max_epochs)
+
+        self.leaderboard = sorted(trials, key=lambda trial: (-trial["epochs"], trial["validation_loss"]))
+        return self.leaderboard
+
+    def save(self, filename="data/search_leaderboard.json"):
+        with open(filename, "w") as f:
+            json.dump([{key: value for key, value in trial.items()} for trial in self.leaderboard], f, indent=2)
+        logger.info(f"Leaderboard saved to {filename}")
+
+    def report(self, top=10):
+        lines = [f"{'rank':>4} | {'val loss':>8} | {'epochs':>6} | {'seconds':>8} | config"]
+        for rank, trial in enumerate(self.leaderboard[:top], start=1):
+            lines.append(f"{rank:>4} | {trial['validation_loss']:>8.4f} | {trial['epochs']:>6} | {trial['seconds']:>8.1f} | {trial['config']}")
+        return "\n".join(lines)
@@ -0,0 +1,213 @@
+import logging
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+def gather(weights, indices):
+    """`weights[indices]` for any weight container, without densifying a SparseWeights."""
+    if isinstance(weights, (np.ndarray, SparseWeights)):
+        return weights[indices]
+    return np.asarray(weights, dtype=float)[indices]
+
+class SparseVector: #MARK: Sparse vector
+    """
+    A `size`-long vector stored as sorted, unique `indices` and their `values`.
+
+    Gradients are built this way so that an update only visits the weights whose
+    features fired for the sentence; duplicate indices are summed on construction.
+    """
+    def __init__(self, indices, values, size):
+        indices = np.asarray(indices, dtype=np.int64).ravel()
+        values = np.asarray(values, dtype=float).ravel()
+        self.size = int(size)
+        self.indices, inverse = np.unique(indices, return_inverse=True)
+        self.values = np.bincount(inverse, weights=values, minlength=len(self.indices))
+
+    @classmethod
+    def from_dense(cls, values, offset=0, size=None):
+        values = np.asarray(values, dtype=float)
+        return cls(np.arange(len(values)) + offset, values, size if size is not None else offset + len(values))
+
+    def __add__(self, other):
+        return SparseVector(np.r_[self.indices, other.indices], np.r_[self.values, other.values], max(self.size, other.size))
+
+    def __sub__(self, other):
+        return self + other * -1.0
+
+    def __mul__(self, scalar):
+        vector = SparseVector.__new__(SparseVector)
+        vector.size, vector.indices, vector.values = self.size, self.indices, self.values * scalar
+        return vector
+
+    __rmul__ = __mul__
+
+    def __len__(self):
+        return self.size
+
+    def clip(self, low, high):
+        return SparseVector(self.indices, np.clip(self.values, low, high), self.size)
+
+    def mean(self):
+        return float(self.values.sum() / self.size) if self.size else 0.0
+
+    def dense(self):
+        vector = np.zeros(self.size)
+        vector[self.indices] = self.values
+        return vector
+
+    def __array__(self, dtype=None, copy=None):
+        return self.dense() if dtype is None else self.dense().astype(dtype)
+
+class CSRActivations: #MARK: CSR activations
+    """
+    Feature activations of one sentence in compressed sparse row form: row `r` (a
+    candidate label sequence) fires features `indices[indptr[r]:indptr[r + 1]]` with
+    values `data[...]`. Columns index the weight vector, so scoring is a gather and
+    the expected feature counts a scatter over just the fired columns.
+    """
+    def __init__(self, indptr, indices, data, num_columns):
+        self.indptr = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data = np.asarray(data, dtype=float)
+        self.num_columns = int(num_columns)
+
+    @classmethod
+    def hstack(cls, parts):
+        """Side-by-side activations of the same rows, e.g. hashed and transition features."""
+        if len(parts) == 1:
+            return parts[0]
+        row_ids = np.concatenate([part.row_ids() for part in parts])
+        order = np.argsort(row_ids, kind="stable")
+        counts = np.bincount(row_ids, minlength=parts[0].num_rows)
+        return cls(np.r_[0, np.cumsum(counts)], np.concatenate([part.indices for part in parts])[order],
+                   np.concatenate([part.data for part in parts])[order], max(part.num_columns for part in parts))
+
+    @property
+    def num_rows(self):
+        return len(self.indptr) - 1
+
+    @property
+    def nnz(self):
+        return len(self.indices)
+
+    def row_ids(self):
+        return np.repeat(np.arange(self.num_rows), np.diff(self.indptr))
+
+    def row(self, row):
+        start, stop = self.indptr[row], self.indptr[row + 1]
+        return SparseVector(self.indices[start:stop], self.data[start:stop], self.num_columns)
+
+    def dot(self, weights):
+        """Per-row score `A @ weights`, touching only the fired columns."""
+        products = gather(weights, self.indices) * self.data
+        return np.bincount(self.row_ids(), weights=products, minlength=self.num_rows)
+
+    def weighted_sum(self, row_weights):
+        """`A.T @ row_weights` as a SparseVector, e.g. expected counts under candidate probabilities."""
+        row_weights = np.asarray(row_weights, dtype=float)
+        return SparseVector(self.indices, self.data * np.repeat(row_weights, np.diff(self.indptr)), self.num_columns)
+
+class SparseWeights: #MARK: Sparse weights
+    """
+    Weight vector whose L2-shrink-and-clip update only writes the entries a gradient
+    touches.
+
+    Weights are held as `scale * values`: shrinking every weight by 1 / (1 + l2 * norm)
+    only changes `scale`, and the norm is kept up to date from the touched entries.
+    Untouched weights only ever shrink, so once everything has been clipped in one full
+    pass, clipping the touched entries is enough - updates match the dense ones exactly.
+    """
+    REFRESH_EVERY = 1024
+
+    def __init__(self, values):
+        self.values = np.array(values, dtype=float).ravel()
+        self.scale = 1.0
+        self.squared_norm = float(self.values @ self.values)
+        self.clip_bounds = None
+        self.updates = 0
+
+    @classmethod
+    def load(cls, weights, size=None):
+        """Build from a SparseWeights, a dense sequence, or a sparse {index: weight} mapping."""
+        if isinstance(weights, SparseWeights):
+            return weights
+        if isinstance(weights, dict):
+            if "values" in weights:
+                return cls.from_dict(weights["values"], size=weights.get("size", size))
+            return cls.from_dict(weights, size=size)
+        return cls(weights)
+
+    @classmethod
+    def from_dict(cls, weights, size=None):
+        indices = np.array([int(index) for index in weights], dtype=np.int64)
+        if size is None:
+            size = int(indices.max()) + 1 if len(indices) else 0
+        values = np.zeros(size)
+        values[indices] = [float(weight) for weight in weights.values()]
+        return cls(values)
+
+    def to_dict(self):
+        """Non-zero weights as {"index": weight}; the saved model format."""
+        dense = self.dense()
+        nonzero = np.flatnonzero(dense)
+        return {str(index): float(weight) for index, weight in zip(nonzero.tolist(), dense[nonzero].tolist())}
+
+    def state(self):
+        return {"size": len(self), "values": self.to_dict()}
+
+    def __len__(self):
+        return len(self.values)
+
+    def __getitem__(self, key):
+        return self.scale * self.values[key]
+
+    def __iter__(self):
+        return iter(self.dense())
+
+    def __array__(self, dtype=None, copy=None):
+        return self.dense() if dtype is None else self.dense().astype(dtype)
+
+    def dense(self):
+        return self.scale * self.values
+
+    def tolist(self):
+        return self.dense().tolist()
+
+    def _fold(self):
+        # Move the scale back into the values and recompute the norm from scratch
+        self.values *= self.scale
+        self.scale = 1.0
+        self.squared_norm = float(self.values @ self.values)
+
+    def update(self, gradient: SparseVector, learning_rate, l2_strength, clip):
+        """w -= learning_rate * gradient; w /= 1 + l2_strength * ||w||; w = clip(w)."""
+        clip = tuple(clip)
+        if self.clip_bounds != clip:
+            # First update (or new bounds): one dense pass clips every weight
+            weights = self.dense()
+            weights[gradient.indices] -= learning_rate * gradient.values
+            norm = np.sqrt(weights @ weights)
+            if norm > 0:
+                weights = weights / (1 + l2_strength * norm)
+            self.values = np.clip(weights, clip[0], clip[1])
+            self.scale = 1.0
+            self.squared_norm = float(self.values @ self.values)
+            self.clip_bounds = clip
+            return self
+
+        indices = gradient.indices
+        current = self.scale * self.values[indices]
+        stepped = current - learning_rate * gradient.values
+        squared_norm = max(self.squared_norm - current @ current + stepped @ stepped, 0.0)
+        norm = np.sqrt(squared_norm)
+        factor = 1 / (1 + l2_strength * norm) if norm > 0 else 1.0
+        updated = np.clip(stepped * factor, clip[0], clip[1])
+
+        self.scale *= factor
+        self.squared_norm = factor ** 2 * (squared_norm - stepped @ stepped) + updated @ updated
+        self.values[indices] = updated / self.scale
+        self.updates += 1
+        if self.updates % self.REFRESH_EVERY == 0 or self.scale < 1e-100:
+            self._fold()
+        return self
@@ -0,0 +1,154 @@
+import os
+import json
+import hashlib
+import logging
+import numpy as np
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class SplitIndex: #MARK: Split index
+    """
+    Persisted, non-overlapping row split for a dataset file.
+
+    The index is computed once from a seeded permutation and stored next to the
+    data (``data/splits/<name>.split.json``) together with a fingerprint of the
+    file contents, so every epoch and every process sees the same train,
+    validation, test and k-fold partitions until the dataset itself changes.
+
+    When rows were only appended (the stored fingerprint still matches the start
+    of the file, as after an incremental augmentation run), existing rows keep
+    their partitions and only the new rows are assigned. Any other change,
+    including dropped rows, recomputes the whole split.
+    """
+    def __init__(self, filename="data/aug_TIM.csv", training_size=0.8, validation_size=0.2, folds=5, seed=0, index_path=None):
+        self.filename = filename
+        self.training_size = training_size
+        self.validation_size = validation_size
+        self.folds = folds
+        self.seed = seed
+        if index_path is None:
+            name, suffix = os.path.splitext(os.path.basename(filename))
+            # Columnar copies of a CSV keep their own index next to the CSV's
+            name = name if suffix == ".csv" else f"{name}{suffix}"
+            index_path = os.path.join(os.path.dirname(filename) or ".", "splits", f"{name}.split.json")
+        self.index_path = index_path
+
+        self.train = []
+        self.validation = []
+        self.test = []
+        self.fold_rows = []
+
+    def fingerprint(self, prefix_size=None):
+        # Hash of the whole file, plus the hash of its first `prefix_size` bytes when asked
+        digest = hashlib.sha1()
+        prefix = None
+        read = 0
+        with open(self.filename, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                if prefix_size is not None and prefix is None and read + len(block) >= prefix_size:
+                    digest.update(block[:prefix_size - read])
+                    prefix = digest.hexdigest()
+                    digest.update(block[prefix_size - read:])
+                else:
+                    digest.update(block)
+                read += len(block)
+        if prefix_size == 0:
+            prefix = hashlib.sha1().hexdigest()
+        return digest.hexdigest(), prefix
+
+    def params(self):
+        return {"training_size": self.training_size, "validation_size": self.validation_size, "folds": self.folds, "seed": self.seed}
+
+    def load(self, num_rows):
+        stored = None
+        if os.path.exists(self.index_path):
+            try:
+                with open(self.index_path, "r") as f:
+                    stored = json.load(f)
+                if not {"fingerprint", "rows", "params"} <= set(stored):
+                    raise KeyError("fingerprint, rows and params")
+            except (KeyError, TypeError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable split index {self.index_path}: {e}")
+                stored = None
+
+        fingerprint, prefix = self.fingerprint(stored.get("size") if stored else None)
+        if stored is not None and stored["params"] == self.params():
+            if stored["fingerprint"] == fingerprint and stored["rows"] == num_rows:
+                self._assign(stored)
+                return self
+            if prefix == stored["fingerprint"] and num_rows > stored["rows"]:
+                logger.info(f"{num_rows - stored['rows']} rows appended to {self.filename}, extending {self.index_path}")
+                stored = self.extend(stored, num_rows, fingerprint)
+                self.save(stored)
+                self._assign(stored)
+                return self
+        if stored is not None:
+            logger.info(f"Split index {self.index_path} is stale, recomputing")
+
+        stored = self.create(num_rows, fingerprint)
+        self.save(stored)
+        self._assign(stored)
+        return self
+
+    def create(self, num_rows, fingerprint):
+        if self.training_size + self.validation_size > 1:
+            raise ValueError("training_size and validation_size must not add up to more than 1")
+
+        order = np.random.default_rng(self.seed).permutation(num_rows)
+        train_end = int(round(num_rows * self.training_size))
+        validation_end = min(num_rows, train_end + int(round(num_rows * self.validation_size)))
+        folds = [fold.tolist() for fold in np.array_split(order, self.folds)] if self.folds else []
+        return {
+            "fingerprint": fingerprint,
+            "size": os.path.getsize(self.filename),
+            "rows": num_rows,
+            "params": self.params(),
+            "train": order[:train_end].tolist(),
+            "validation": order[train_end:validation_end].tolist(),
+            "test": order[validation_end:].tolist(),
+            "folds": folds,
+        }
+
+    def extend(self, stored, num_rows, fingerprint):
+        # Assign rows stored["rows"]..num_rows-1 with the same proportions, leaving existing rows where they are
+        new_rows = np.arange(stored["rows"], num_rows)
+        order = np.random.default_rng([self.seed, stored["rows"]]).permutation(new_rows)
+        train_end = int(round(len(order) * self.training_size))
+        validation_end = min(len(order), train_end + int(round(len(order) * self.validation_size)))
+        folds = [list(fold) for fold in stored["folds"]]
+        if folds:
+            # Smallest folds first, so the folds stay balanced as rows trickle in
+            by_size = sorted(range(len(folds)), key=lambda k: (len(folds[k]), k))
+            for k, rows in zip(by_size, np.array_split(order, len(folds))):
+                folds[k].extend(rows.tolist())
+        return {
+            **stored,
+            "fingerprint": fingerprint,
+            "size": os.path.getsize(self.filename),
+            "rows": num_rows,
+            "train": stored["train"] + order[:train_end].tolist(),
+            "validation": stored["validation"] + order[train_end:validation_end].tolist(),
+            "test": stored["test"] + order[validation_end:].tolist(),
+            "folds": folds,
+        }
+
+    def save(self, stored):
+        os.makedirs(os.path.dirname(self.index_path) or ".", exist_ok=True)
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(stored, f)
+        os.replace(tmp_path, self.index_path)
+        logger.info(f"Split index saved to {self.index_path}")
+
+    def fold(self, k):
+        if not self.fold_rows:
+            raise ValueError("Split index was created without folds")
+        training = [row for i, fold in enumerate(self.fold_rows) if i != k for row in fold]
+        return training, list(self.fold_rows[k])
+
+    def _assign(self, stored):
+        self.train = stored["train"]
+        self.validation = stored["validation"]
+        self.test = stored["test"]
+        self.fold_rows = stored["folds"]
@@ -0,0 +1,264 @@
+import logging
+import numpy as np
+from src.ConditionalRandomFields.Vocabulary import VOCAB, Vocabulary, MONTHS, DATE_WORDS
+from src.ConditionalRandomFields.Gazetteer import Gazetteer, DEFAULT_GAZETTEER, DEFAULT_LEXICONS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+FILLER_TAGS = ["ADP", "PRON", "PROPN", "VERB", "NOUN"]
+
+# A template fires at position i when i is inside `span` (slice bounds over the sentence),
+# any clause of `when` holds and the candidate labels match any pattern of `labels`; it then
+# adds `value` to its feature. Clause keys:
+#   tags / words     {offset: [...]}: POS tag / token at i + offset is one of the values
+#   text_contains    [...]: one of the substrings occurs in the upper-cased text
+#   text_words       [...]: one of the words is a token of the text
+#   gazetteer        {offset: [...]}: token at i + offset is inside a gazetteer match of one of the categories
+# Label patterns are {offset: label}; offsets outside the sentence never match.
+DEFAULT_TEMPLATES = [
+    {"name": "f1", "when": [{"tags": {0: ["NUM", "NOUN"]}, "text_contains": [":", "AM", "PM"]}], "labels": {0: "TM"}}, # TIME ✅
+    {"name": "f2", "when": [{"text_words": ["today"] + MONTHS}], "labels": {0: "D"}}, # DATE ✅
+    {"name": "f3", "span": [1, -1], "when": [{"tags": {0: ["PROPN"], 1: ["NOUN"]}}], "labels": {0: "D", 1: "D"}}, # DATE ✅
+    {"name": "f5", "span": [1, -1], "when": [{"tags": {0: ["NOUN"], -1: ["PROPN"]}}, {"tags": {0: ["NOUN"], 1: ["NOUN"]}}],
+     "labels": [{0: "T", -1: "T"}, {0: "T", 1: "T"}]}, # TASK ✅
+    {"name": "f7", "span": [1, -1], "when": [{"tags": {0: ["NOUN", "PROPN", "VERB"], -1: ["VERB", "ADP", "ADJ", "ADV", "PRON"]}}],
+     "labels": {0: "T"}, "value": 2}, # TASK ✅
+    {"name": "f9", "span": [2, -1], "labels": {0: "TM", -2: "TM"}}, # TIME 🧪
+    {"name": "f10", "span": [0, -1], "when": [{"tags": {0: FILLER_TAGS, 1: FILLER_TAGS}}], "labels": {0: "O", 1: "O"}, "value": 1.5}, # FILLER ✅
+    {"name": "f11", "when": [{"words": {0: DATE_WORDS}}], "labels": {0: "D"}}, # DATE ✅
+    {"name": "f13", "span": [1, -1], "when": [{"tags": {0: ["NOUN", "PROPN", "VERB"], -1: ["VERB"]}}], "labels": {0: "T", -1: "T"}, "value": 2}, # TASK 🧪
+    {"name": "f14", "span": [0, -2], "when": [{"tags": {0: ["ADP", "PRON", "PROPN", "NOUN"]}}], "labels": {0: "O", 1: "O", 2: "T"}, "value": 1.5}, # FILLER + TASK 🧪
+]
+# Opt-in lexicon features (train.py --gazetteer); "task" is filled from calendar history
+GAZETTEER_TEMPLATES = [
+    {"name": "g1", "when": [{"gazetteer": {0: ["month", "weekday", "relative_date"]}}], "labels": {0: "D"}}, # DATE
+    {"name": "g2", "when": [{"gazetteer": {0: ["time"]}}], "labels": {0: "TM"}}, # TIME
+    {"name": "g3", "when": [{"gazetteer": {0: ["task"]}}], "labels": {0: "T"}}, # TASK
+]
+
+class FeatureTemplates: #MARK: Templates
+    """
+    Compiles declarative feature templates into lookup tables.
+
+    Conditions become boolean tag/word lookup rows and label patterns become
+    (offset, label code) tables, so `tables()` prepares a sentence with a handful of
+    array operations and `feature_matrix()` scores every candidate label sequence in
+    one gather, however many templates there are. `size` is the weight count.
+    Gazetteer conditions are answered by `gazetteer` (the default lexicons if unset).
+    """
+    def __init__(self, templates=None, vocab: Vocabulary = VOCAB, gazetteer: Gazetteer = None):
+        self.templates = [dict(template) for template in (templates if templates is not None else DEFAULT_TEMPLATES)]
+        self.names = [template.get("name", f"t{i}") for i, template in enumerate(self.templates)]
+        if len(set(self.names)) != len(self.names):
+            raise ValueError("Feature template names must be unique")
+        self.size = len(self.templates)
+        self.vocab = vocab
+        self.gazetteer = gazetteer
+        self.compile()
+
+    def compile(self):
+        words = [word for template in self.templates for clause in template.get("when", [{}])
+                 for values in list(clause.get("words", {}).values()) + [clause.get("text_words", [])] for word in values]
+        self.words = {word: i for i, word in enumerate(dict.fromkeys(words), start=1)}
+        needles = [needle.upper() for template in self.templates for clause in template.get("when", [{}]) for needle in clause.get("text_contains", [])]
+        self.needles = list(dict.fromkeys(needles))
+
+        clause_template, conditions, text_needles, text_words = [], [], [], []
+        pattern_template, patterns = [], []
+        for t, template in enumerate(self.templates):
+            unknown = set(template) - {"name", "span", "when", "labels", "value"}
+            if unknown:
+                raise ValueError(f"Template {self.names[t]} has unknown keys: {sorted(unknown)}")
+            for clause in template.get("when", None) or [{}]:
+                unknown = set(clause) - {"tags", "words", "text_contains", "text_words", "gazetteer"}
+                if unknown:
+                    raise ValueError(f"Template {self.names[t]} has unknown condition keys: {sorted(unknown)}")
+                c = len(clause_template)
+                clause_template.append(t)
+                for offset, tags in clause.get("tags", {}).items():
+                    lookup = np.zeros(len(self.vocab.tags), dtype=bool)
+                    lookup[[self.vocab.tag(tag) for tag in tags]] = True
+                    conditions.append((c, int(offset), "tag", lookup))
+                for offset, values in clause.get("words", {}).items():
+                    lookup = np.zeros(len(self.words) + 1, dtype=bool)
+                    lookup[[self.words[word] for word in values]] = True
+                    conditions.append((c, int(offset), "word", lookup))
+                for offset, categories in clause.get("gazetteer", {}).items():
+                    if self.gazetteer is None:
+                        self.gazetteer = DEFAULT_GAZETTEER
+                    missing = set(categories) - set(self.gazetteer.categories)
+                    if missing:
+                        raise ValueError(f"Template {self.names[t]} uses gazetteer categories {sorted(missing)} the gazetteer does not have")
+                    lookup = np.zeros(len(self.gazetteer.categories), dtype=bool)
+                    lookup[[self.gazetteer.category_ids[category] for category in categories]] = True
+                    conditions.append((c, int(offset), "gazetteer", lookup))
+                text_needles.append([self.needles.index(needle.upper()) for needle in clause.get("text_contains", [])])
+                text_words.append([self.words[word] for word in clause.get("text_words", [])])
+
+            alternatives = template["labels"] if isinstance(template["labels"], list) else [template["labels"]]
+            for alternative in alternatives:
+                pattern_template.append(t)
+                patterns.append(sorted((int(offset), self.vocab.label(label)) for offset, label in alternative.items()))
+
+        self.values = np.array([float(template.get("value", 1)) for template in self.templates])
+        self.spans = [tuple(template.get("span", (0, None))) for template in self.templates]
+        self.span_start = np.array([start or 0 for start, _ in self.spans], dtype=np.int64)
+        self.span_stop = np.array([stop or 0 for _, stop in self.spans], dtype=np.int64)
+        self.span_stop_open = np.array([stop is None for _, stop in self.spans], dtype=bool)
+
+        # Condition tables: one row per (clause, offset) test
+        self.clause_template = np.array(clause_template, dtype=np.int64)
+        self.condition_clause = np.array([c for c, _, _, _ in conditions], dtype=np.int64)
+        self.condition_offset = np.array([offset for _, offset, _, _ in conditions], dtype=np.int64)
+        self.condition_is_tag = np.array([kind == "tag" for _, _, kind, _ in conditions], dtype=bool)
+        self.tag_lookup = np.array([lookup if kind == "tag" else np.zeros(len(self.vocab.tags), dtype=bool) for _, _, kind, lookup in conditions]).reshape(len(conditions), len(self.vocab.tags))
+        self.word_lookup = np.array([lookup if kind == "word" else np.zeros(len(self.words) + 1, dtype=bool) for _, _, kind, lookup in conditions]).reshape(len(conditions), len(self.words) + 1)
+        self.condition_is_gazetteer = np.array([kind == "gazetteer" for _, _, kind, _ in conditions], dtype=bool)
+        if self.condition_is_gazetteer.any():
+            categories = len(self.gazetteer.categories)
+            self.gazetteer_lookup = np.array([lookup if kind == "gazetteer" else np.zeros(categories, dtype=bool) for _, _, kind, lookup in conditions])
+        else:
+            self.gazetteer, self.gazetteer_lookup = None, None
+        self.clause_needles = np.zeros((len(clause_template), len(self.needles)), dtype=bool)
+        self.clause_text_words = np.zeros((len(clause_template), len(self.words) + 1), dtype=bool)
+        for c, (needle_ids, word_ids) in enumerate(zip(text_needles, text_words)):
+            self.clause_needles[c, needle_ids] = True
+            self.clause_text_words[c, word_ids] = True
+        self.clause_has_needles = self.clause_needles.any(axis=1)
+        self.clause_has_text_words = self.clause_text_words.any(axis=1)
+
+        # Label pattern tables: one row per alternative, padded to the longest pattern
+        width = max((len(pattern) for pattern in patterns), default=0)
+        self.pattern_template = np.array(pattern_template, dtype=np.int64)
+        self.pattern_offsets = np.zeros((len(patterns), width), dtype=np.int64)
+        self.pattern_codes = np.zeros((len(patterns), width), dtype=np.int8)
+        self.pattern_used = np.zeros((len(patterns), width), dtype=bool)
+        for p, pattern in enumerate(patterns):
+            for k, (offset, code) in enumerate(pattern):
+                self.pattern_offsets[p, k] = offset
+                self.pattern_codes[p, k] = code
+                self.pattern_used[p, k] = True
+        order = np.argsort(self.pattern_template, kind="stable")
+        self.pattern_template, self.pattern_offsets = self.pattern_template[order], self.pattern_offsets[order]
+        self.pattern_codes, self.pattern_used = self.pattern_codes[order], self.pattern_used[order]
+        self.pattern_start = np.searchsorted(self.pattern_template, np.arange(self.size))
+        self.pattern_count = np.bincount(self.pattern_template, minlength=self.size)
+
+    def encode_words(self, tokens):
+        return np.array([self.words.get(token, 0) for token in tokens], dtype=np.int64)
+
+    def active_positions(self, tags, tokens, text): #MARK: Sentence tables
+        """(templates, positions) mask of where each template's conditions hold."""
+        n = len(tags)
+        if n == 0:
+            return np.zeros((self.size, 0), dtype=bool)
+        positions = np.arange(n)
+        words = np.zeros(n, dtype=np.int64)
+        encoded = self.encode_words(tokens[:n])
+        words[:len(encoded)] = encoded
+
+        clauses = np.ones((len(self.clause_template), n), dtype=bool)
+        if len(self.condition_clause):
+            index = positions[None, :] + self.condition_offset[:, None]
+            inside = (index >= 0) & (index < n)
+            index = np.clip(index, 0, n - 1)
+            rows = np.arange(len(self.condition_clause))[:, None]
+            held = np.where(self.condition_is_tag[:, None], self.tag_lookup[rows, tags[index]], self.word_lookup[rows, words[index]])
+            if self.gazetteer_lookup is not None:
+                # One automaton pass marks every (position, category) inside a lexicon match
+                marks = self.gazetteer.mark(tokens, n)
+                held = np.where(self.condition_is_gazetteer[:, None], (marks[index] & self.gazetteer_lookup[:, None, :]).any(axis=2), held)
+            held &= inside
+            np.logical_and.at(clauses, self.condition_clause, held)
+
+        upper = text.upper()
+        needle_hits = np.array([needle in upper for needle in self.needles], dtype=bool)
+        text_word_hits = np.zeros(len(self.words) + 1, dtype=bool)
+        text_word_hits[self.encode_words(tokens)] = True
+        text_word_hits[0] = False
+        text_ok = ((~self.clause_has_needles | (self.clause_needles & needle_hits).any(axis=1))
+                   & (~self.clause_has_text_words | (self.clause_text_words & text_word_hits).any(axis=1)))
+        clauses &= text_ok[:, None]
+
+        active = np.zeros((self.size, n), dtype=bool)
+        np.logical_or.at(active, self.clause_template, clauses)
+        # Slice semantics: negative bounds count from the end, a missing stop means the end
+        starts = np.where(self.span_start < 0, n + self.span_start, self.span_start)
+        stops = np.where(self.span_stop_open, n, np.where(self.span_stop < 0, n + self.span_stop, self.span_stop))
+        return active & (positions[None, :] >= starts[:, None]) & (positions[None, :] < stops[:, None])
+
+    def tables(self, tags, tokens, text):
+        """
+        Index tables for one sentence: one row per (template, position, label pattern)
+        that can fire, holding the absolute label positions and codes to compare.
+        """
+        n = len(tags)
+        template, position = np.nonzero(self.active_positions(tags, tokens, text))
+        counts = self.pattern_count[template]
+        group = np.repeat(np.arange(len(template)), counts)
+        pattern = np.repeat(self.pattern_start[template] - np.cumsum(np.r_[0, counts[:-1]]), counts) + np.arange(counts.sum())
+
+        label_positions = position[group][:, None] + self.pattern_offsets[pattern]
+        used = self.pattern_used[pattern]
+        possible = ~(used & ((label_positions < 0) | (label_positions >= n))).any(axis=1)
+        group, pattern, label_positions, used = group[possible], pattern[possible], label_positions[possible], used[possible]
+        # Many templates share a label pattern at a position: test each distinct (positions, codes) row once
+        checks = np.concatenate([np.where(used, label_positions, -1), np.where(used, self.pattern_codes[pattern], -1)], axis=1)
+        checks, row_check = np.unique(checks, axis=0, return_inverse=True)
+        width = used.shape[1]
+        return {
+            "group": group,
+            "template": template,
+            "row_check": row_check.reshape(-1),
+            "positions": np.clip(checks[:, :width], 0, max(n - 1, 0)),
+            "codes": checks[:, width:],
+            "used": checks[:, :width] >= 0,
+        }
+
+    def feature_matrix(self, tables, sequences):
+        """Unweighted (candidates, templates) feature values of an int8 (candidates, length) label matrix."""
+        features = np.zeros((len(sequences), self.size))
+        if len(tables["group"]) == 0 or len(sequences) == 0:
+            return features
+        # Work position-major (rows x candidates) so every reduction runs over contiguous rows
+        labels = np.ascontiguousarray(sequences.T)
+        matched = ((labels[tables["positions"]] == tables["codes"][:, :, None]) | ~tables["used"][:, :, None]).all(axis=1)[tables["row_check"]]
+        group_starts = np.r_[0, np.flatnonzero(np.diff(tables["group"])) + 1]
+        # Label alternatives of one (template, position) fire at most once
+        fired = segment_reduce(matched, group_starts, np.logical_or)
+        # Groups are ordered by template, so each template's positions are one contiguous block
+        templates = tables["template"][tables["group"][group_starts]]
+        template_starts = np.r_[0, np.flatnonzero(np.diff(templates)) + 1]
+        features[:, templates[template_starts]] = segment_reduce(fired.astype(float), template_starts, np.add).T
+        return features * self.values
+
+def segment_reduce(rows, starts, ufunc):
+    """
+    `ufunc.reduceat(rows, starts, axis=0)` for many short segments.
+
+    Segments are folded one offset at a time (at most the longest segment's length
+    steps), which is far cheaper than reduceat's per-segment loop when most are tiny.
+    """
+    lengths = np.diff(np.r_[starts, len(rows)])
+    result = rows[starts].copy()
+    for offset in range(1, lengths.max(initial=1)):
+        longer = lengths > offset
+        result[longer] = ufunc(result[longer], rows[starts[longer] + offset])
+    return result
+
+def gazetteer_templates(gazetteer: Gazetteer = None):
+    """The default templates plus the lexicon features, answered by `gazetteer` (no task names if unset)."""
+    if gazetteer is None:
+        gazetteer = Gazetteer({**DEFAULT_LEXICONS, "task": []})
+    return FeatureTemplates(DEFAULT_TEMPLATES + GAZETTEER_TEMPLATES, gazetteer=gazetteer)
+
+def select_templates(names, gazetteer: Gazetteer = None):
+    """Templates picked by name (in `names` order) from the default and lexicon templates, e.g. for a pruned model."""
+    available = {template["name"]: template for template in DEFAULT_TEMPLATES + GAZETTEER_TEMPLATES}
+    unknown = [name for name in names if name not in available]
+    if unknown:
+        raise ValueError(f"Unknown feature templates: {unknown}")
+    return FeatureTemplates([available[name] for name in names], gazetteer=gazetteer)
+
+FEATURE_TEMPLATES = FeatureTemplates()
@@ -0,0 +1,71 @@
+import logging
+import numpy as np
+from src.ConditionalRandomFields.Labeling import LABELS
+from src.ConditionalRandomFields.Sparse import CSRActivations, gather
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+class Transitions: #MARK: Transitions
+    """
+    Learned label-transition weights: an L x L matrix scoring label[i - 1] -> label[i],
+    plus start and end weights for the first and last label.
+
+    They live as one small dense block of the weight vector (matrix row-major, then
+    start, then end) at `offset`, so they are trained with the other weights. Every
+    candidate fires the same number of slots (start, one per adjacent pair, end).
+    """
+    def __init__(self, num_labels=len(LABELS)):
+        self.num_labels = num_labels
+        self.size = num_labels * num_labels + 2 * num_labels
+
+    def config(self):
+        return {"num_labels": self.num_labels}
+
+    @classmethod
+    def from_config(cls, config):
+        return cls(num_labels=config["num_labels"])
+
+    def unpack(self, weights, offset):
+        """(matrix, start, end) views of the transition block as dense arrays."""
+        block = gather(weights, np.arange(offset, offset + self.size))
+        square = self.num_labels * self.num_labels
+        return (block[:square].reshape(self.num_labels, self.num_labels),
+                block[square:square + self.num_labels], block[square + self.num_labels:])
+
+    def activations(self, sequences, offset=0):
+        sequences = np.atleast_2d(sequences).astype(np.int64)
+        count, length = sequences.shape
+        if length == 0:
+            return CSRActivations(np.zeros(count + 1), [], [], offset + self.size)
+        square = self.num_labels * self.num_labels
+        fired = np.concatenate([square + sequences[:, :1],
+                                sequences[:, :-1] * self.num_labels + sequences[:, 1:],
+                                square + self.num_labels + sequences[:, -1:]], axis=1) + offset
+        return CSRActivations(np.arange(count + 1) * fired.shape[1], fired.reshape(-1), np.ones(fired.size), offset + self.size)
+
+    def scores(self, weights, offset, sequences):
+        return self.activations(sequences, offset).dot(weights)
+
+    def viterbi(self, weights, offset, emissions):
+        """
+        Best label sequence under `emissions` ((positions, labels) scores) plus the
+        transition weights, and its score. Each step is one L x L matrix add.
+        """
+        matrix, start, end = self.unpack(weights, offset)
+        emissions = np.asarray(emissions, dtype=float)
+        length = len(emissions)
+        if length == 0:
+            return np.zeros(0, dtype=np.int8), 0.0
+        score = start + emissions[0]
+        backpointers = np.zeros((length, self.num_labels), dtype=np.int64)
+        for position in range(1, length):
+            candidates = score[:, None] + matrix
+            backpointers[position] = candidates.argmax(axis=0)
+            score = candidates.max(axis=0) + emissions[position]
+        score = score + end
+
+        path = [int(score.argmax())]
+        for position in range(length - 1, 0, -1):
+            path.append(int(backpointers[position, path[-1]]))
+        return np.array(path[::-1], dtype=np.int8), float(score.max())
@@ -0,0 +1,88 @@
+import time
+import logging
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, wait as wait_futures
+from src.ConditionalRandomFields.CRF import Train
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+_VALIDATOR = None
+
+def validate_snapshot(filename, weights, epoch, train_loss, options): #MARK: Validation worker
+    # The validator process keeps its trainer (and its featurized validation rows) between epochs
+    global _VALIDATOR
+    start = time.perf_counter()
+    if _VALIDATOR is None or _VALIDATOR.filename != filename:
+        _VALIDATOR = Train(weights=weights, filename=filename, verbose=False, **options)
+        _VALIDATOR.filename = filename
+    _VALIDATOR.weights = np.asarray(weights, dtype=float)
+    _VALIDATOR.validation()
+    return {
+        "epoch": epoch,
+        "train_loss": float(train_loss),
+        "validation_loss": float(_VALIDATOR.validation_avg_loss),
+        "seconds": time.perf_counter() - start,
+    }
+
+class AsyncValidator: #MARK: Async validation
+    """
+    Runs validation in a separate process on a snapshot of the weights while the
+    next epoch trains. Results are applied as they arrive: once an epoch's
+    validation loss drifts more than `threshold` from its training loss,
+    `should_stop` is set and the training loop stops at its next check.
+
+    At most `max_pending` snapshots are held: when epochs finish faster than they
+    validate, snapshots still queued behind a newer one are dropped unvalidated.
+    """
+    def __init__(self, filename="data/aug_TIM.csv", threshold=0.75, options=None, max_pending=2):
+        self.filename = filename
+        self.threshold = threshold
+        self.options = options or {}
+        self.max_pending = max(1, max_pending)
+        self.pool = ProcessPoolExecutor(max_workers=1)
+        # (epoch, future) in submission order
+        self.pending = []
+        self.dropped = []
+        self.results = []
+        self.should_stop = False
+        self.stop_result = None
+
+    def submit(self, epoch, weights, train_loss):
+        for stale_epoch, future in list(self.pending):
+            if len(self.pending) < self.max_pending:
+                break
+            if future.cancel():
+                self.pending.remove((stale_epoch, future))
+                self.dropped.append(stale_epoch)
+                logger.warning(f"Skipping validation of epoch {stale_epoch + 1}: epoch {epoch + 1} finished before it started")
+        if len(self.pending) >= self.max_pending:
+            # Everything held is already running; wait for the oldest rather than queue more snapshots
+            wait_futures([self.pending[0][1]])
+        snapshot = np.array(weights, dtype=float)
+        self.pending.append((epoch, self.pool.submit(validate_snapshot, self.filename, snapshot, epoch, train_loss, self.options)))
+
+    def poll(self, wait=False):
+        finished = []
+        for epoch, future in list(self.pending):
+            if not wait and not future.done():
+                continue
+            self.pending.remove((epoch, future))
+            try:
+                result = future.result()
+            except Exception as e:
+                logger.error(f"Validation failed: {e}")
+                continue
+            finished.append(result)
+
+        for result in sorted(finished, key=lambda result: result["epoch"]):
+            self.results.append(result)
+            if not self.should_stop and abs(result["validation_loss"] - result["train_loss"]) > self.threshold:
+                self.should_stop = True
+                self.stop_result = result
+        return finished
+
+    def close(self, wait=True):
+        if wait:
+            self.poll(wait=True)
+        self.pool.shutdown(wait=wait, cancel_futures=not wait)
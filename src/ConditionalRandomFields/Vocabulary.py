@@ -0,0 +1,92 @@
+import logging
+import numpy as np
+from src.ConditionalRandomFields.Labeling import LABELS
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Universal POS tags spaCy emits; anything else is coded as "X"
+TAGS = ["ADJ", "ADP", "ADV", "AUX", "CCONJ", "DET", "INTJ", "NOUN", "NUM", "PART", "PRON", "PROPN", "PUNCT", "SCONJ", "SYM", "VERB", "X", "SPACE"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July", "August", "September", "October", "November", "December"]
+DATE_WORDS = ["today", "tomorrow", "tonight", "now", "next", "morning", "night", "afternoon", "evening", "noon", "midnight"]
+# Words the features look up; token id 0 means "not in the lexicon"
+LEXICON = ["<OOV>"] + MONTHS + DATE_WORDS
+
+class Vocabulary: #MARK: Vocabulary
+    """
+    Integer codes for labels, POS tags and lexicon tokens.
+
+    Strings are mapped once at the API boundary; the CRF core works on int8 label
+    and tag arrays and int16 token ids. Already-encoded integer arrays pass through.
+    """
+    def __init__(self, labels=LABELS, tags=TAGS, lexicon=LEXICON):
+        self.labels = list(labels)
+        self.tags = list(tags)
+        self.lexicon = list(dict.fromkeys(lexicon))
+        self.label_ids = {label: i for i, label in enumerate(self.labels)}
+        self.tag_ids = {tag: i for i, tag in enumerate(self.tags)}
+        self.token_ids = {token: i for i, token in enumerate(self.lexicon)}
+        self.unknown_tag = self.tag_ids["X"]
+
+    @staticmethod
+    def _encoded(values):
+        return isinstance(values, np.ndarray) and np.issubdtype(values.dtype, np.integer)
+
+    def label(self, label):
+        return self.label_ids[label]
+
+    def tag(self, tag):
+        return self.tag_ids[tag]
+
+    def token(self, token):
+        return self.token_ids[token]
+
+    def encode_labels(self, labels):
+        if self._encoded(labels):
+            return labels.astype(np.int8, copy=False)
+        try:
+            return np.array([self.label_ids[label] for label in labels], dtype=np.int8)
+        except KeyError as e:
+            raise ValueError(f"Unknown label {e} (expected one of {self.labels})") from None
+
+    def decode_labels(self, codes):
+        return [self.labels[code] for code in codes]
+
+    def encode_tags(self, tags):
+        if self._encoded(tags):
+            return tags.astype(np.int8, copy=False)
+        return np.array([self.tag_ids.get(tag, self.unknown_tag) for tag in tags], dtype=np.int8)
+
+    def decode_tags(self, codes):
+        return [self.tags[code] for code in codes]
+
+    def encode_tokens(self, tokens):
+        if self._encoded(tokens):
+            return tokens.astype(np.int16, copy=False)
+        return np.array([self.token_ids.get(token, 0) for token in tokens], dtype=np.int16)
+
+    def candidates(self, alphabet, length, limit, rng=None):
+        """
+        The first `limit` sequences of itertools.product(alphabet, repeat=length) as an
+        int8 (candidates, length) array, shuffled with `rng` (a `random.Random`-like
+        object) in exactly the order shuffling the tuple list would give.
+        """
+        alphabet = self.encode_labels(alphabet)
+        base = len(alphabet)
+        count = min(limit, base ** length) if base else 0
+        # Row k of the product is k written in base len(alphabet), most significant digit first
+        digits = np.zeros((count, length), dtype=np.int64)
+        remaining = np.arange(count, dtype=np.int64)
+        for position in range(length - 1, -1, -1):
+            if not remaining.any():
+                break
+            digits[:, position] = remaining % base
+            remaining //= base
+        sequences = alphabet[digits]
+        if rng is not None:
+            order = list(range(count))
+            rng.shuffle(order)
+            sequences = sequences[order]
+        return sequences
+
+VOCAB = Vocabulary()
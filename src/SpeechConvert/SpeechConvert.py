@@ -1,3 +1,4 @@
+from src.ConditionalRandomFields.Online import OnlineLearner
 from src.ConditionalRandomFields.CRF import Predict
 import speech_recognition as sr
 import threading
@@ -11,6 +12,24 @@ is_listening = False
 stop_listening = False
 listener_thread = None
 last_recognized_text = ""
+learner = None
+learner_missing = False
+learner_lock = threading.Lock()
+
+def get_learner(): #MARK: Get learner
+    """
+    The resident model shared by the listener and by corrections, loaded once on first
+    use. Without a trained model it returns None and online correction is skipped.
+    """
+    global learner, learner_missing
+    with learner_lock:
+        if learner is None and not learner_missing:
+            try:
+                learner = OnlineLearner()
+            except FileNotFoundError as e:
+                learner_missing = True
+                print(f"⚠️  {e}: online correction is off until a model is trained")
+        return learner
 
 def continuous_listen(): #MARK: Continuous listen
     """ 
@@ -38,9 +57,13 @@ def continuous_listen(): #MARK: Continuous listen
                         last_recognized_text = text
                         print(f"🗣️  Heard: '{text}'")
                         
-                        predicter = Predict(text)
-                        labels = predicter.predict()
-                        processed_labels = predicter.process_labels(labels)
+                        model = get_learner()
+                        if model is not None:
+                            labels = model.predict(text)
+                            processed_labels = model.process_labels(text, labels)
+                        else:
+                            predicter = Predict(text)
+                            processed_labels = predicter.process_labels(predicter.predict())
                         print(f"🔍 Processed labels: {processed_labels}")
                         
                 except sr.UnknownValueError:
@@ -143,6 +166,26 @@ def get_listener_status(): #MARK: Get listener status
         return "⏸️  Paused"
 
 
+def correct_last(labels): #MARK: Correct last
+    """Teach the model the right labels (e.g. "T T O D") for the last recognized text."""
+    if not last_recognized_text:
+        print("🔇 No text has been recognized yet")
+        return False
+    model = get_learner()
+    if model is None:
+        print("⚠️  No trained model to correct")
+        return False
+    try:
+        if model.correct(last_recognized_text, labels.upper().split()):
+            print(f"🧠 Learned: {dict(zip(last_recognized_text.split(' '), labels.upper().split()))}")
+        else:
+            print("✅ The model already labels it that way")
+        return True
+    except ValueError as e:
+        print(f"❌ {e}")
+        return False
+
+
 def get_last_text(): #MARK: Get last text
     """Get the last recognized text."""
     global last_recognized_text
@@ -164,6 +207,8 @@ def interactive_voice_control(): #MARK: Interactive voice control
     print("  stop    - Stop the listener completely")
     print("  status  - Check listener status")
     print("  last    - Show last recognized text")
+    print("  correct - Fix the last parse, e.g. 'correct T T O D D'")
+    print("  save    - Save learned corrections to the model")
     print("  quit    - Exit the program")
     print("=" * 60)
     
@@ -197,16 +242,26 @@ def interactive_voice_control(): #MARK: Interactive voice control
                 else:
                     print("🔇 No text has been recognized yet")
                 
+            elif command.startswith("correct"):
+                correct_last(command[len("correct"):].strip())
+                
+            elif command == "save":
+                if learner is not None:
+                    learner.flush()
+                    print(f"💾 Saved {learner.updates} corrections to {learner.filename}")
+                
             elif command in ["quit", "exit", "q"]:
                 if listener_thread and listener_thread.is_alive():
                     print("🛑 Stopping listener before exit...")
                     stop_listener()
+                if learner is not None:
+                    learner.close()
                 print("👋 Goodbye!")
                 break
                 
             elif command == "help":
                 print("\nAvailable commands:")
-                print("  start, pause, resume, stop, status, last, quit")
+                print("  start, pause, resume, stop, status, last, correct <labels>, save, quit")
                 
             elif command == "":
                 # Empty command, just show status
@@ -219,6 +274,8 @@ def interactive_voice_control(): #MARK: Interactive voice control
         except KeyboardInterrupt:
             print("\n\n🛑 Interrupted! Stopping listener...")
             stop_listener()
+            if learner is not None:
+                learner.close()
             print("👋 Goodbye!")
             break
         except Exception as e:
@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from src.ConditionalRandomFields import Ablation
+from src.ConditionalRandomFields.Ablation import FeatureAblation, feature_firing, prune_model
+from src.ConditionalRandomFields.Templates import FeatureTemplates
+
+class FakeTagCache:
+    def __init__(self, tags):
+        self.tags = tags
+
+    def get(self, text):
+        return self.tags[text]
+
+class TestPruneModel(unittest.TestCase):
+    def test_drops_near_zero_and_dead_templates(self):
+        model = {"weights": {"0": 0.4, "1": 0.0005, "2": -0.3, "3": 0.25, "5": 0.1}, "size": 6, "templates": ["f1", "f2", "f3"],
+                 "hashing": {"bits": 1, "suffix_length": 3, "kinds": ["word"]}}
+        firing = {"f1": {"rows": 4}, "f2": {"rows": 9}, "f3": {"rows": 0}}
+        pruned = prune_model(model, threshold=1e-3, firing=firing)
+        self.assertEqual(pruned["templates"], ["f1"])
+        self.assertEqual(pruned["pruned"], ["f2", "f3"])
+        # Weights after the templates shift down with them
+        self.assertEqual(pruned["weights"], {"0": 0.4, "1": 0.25, "3": 0.1})
+        self.assertEqual(pruned["size"], 4)
+        self.assertEqual(pruned["hashing"], model["hashing"])
+
+class TestFeatureFiring(unittest.TestCase):
+    def test_counts_rows_values_and_active_positions(self):
+        templates = FeatureTemplates([
+            {"name": "num_time", "when": [{"tags": {0: ["NUM"]}}], "labels": {0: "TM"}},
+            {"name": "verb_task", "when": [{"tags": {0: ["VERB"]}}], "labels": {0: "T"}, "value": 2},
+            {"name": "never", "when": [{"words": {0: ["zzz"]}}], "labels": {0: "T"}},
+        ])
+        data = pd.DataFrame({"full_text": ["call mom at 6pm", "gym at 5", "call at 7"],
+                             "sequence": ["T T O TM", "T O O", ["T", "O", "TM"]]})
+        tag_cache = FakeTagCache({"call mom at 6pm": ["VERB", "NOUN", "ADP", "NUM"], "gym at 5": ["NOUN", "ADP", "NUM"],
+                                  "call at 7": ["VERB", "NUM"]})
+        firing = feature_firing(data, tag_cache, templates)
+        # The last row's tags do not line up with its labels, so it is skipped
+        self.assertEqual(firing["num_time"], {"rows": 1, "value": 1.0, "active_positions": 2})
+        self.assertEqual(firing["verb_task"], {"rows": 1, "value": 2.0, "active_positions": 1})
+        self.assertEqual(firing["never"], {"rows": 0, "value": 0.0, "active_positions": 0})
+
+class TestForwardSelection(unittest.TestCase):
+    # Validation loss per feature list, for the full model, leave-one-out and forward variants alike
+    LOSSES = {("a", "b", "c"): 0.5, ("b", "c"): 0.45, ("a", "c"): 0.6, ("a", "b"): 0.45,
+              ("a",): 0.5, ("b",): 0.4, ("c",): 0.6, ("b", "a"): 0.3, ("b", "a", "c"): 0.35}
+
+    def setUp(self):
+        self.calls = []
+
+    def fake_trial(self, filename, config, start_epoch, epochs, weights, seed, num_features=None, names=None):
+        self.calls.append(tuple(names))
+        return {"train_loss": 1.0, "validation_loss": self.LOSSES[tuple(names)], "weights": [0.1] * len(names), "seconds": 0.0}
+
+    def run_ablation(self, **kwargs):
+        ablation = FeatureAblation(filename="unused.csv", names=["a", "b", "c"], workers=2, **kwargs)
+        with mock.patch.object(Ablation, "run_trial", self.fake_trial), \
+             mock.patch.object(Ablation, "ProcessPoolExecutor", ThreadPoolExecutor), \
+             mock.patch.object(FeatureAblation, "prepare"):
+            ablation.run()
+        return ablation
+
+    def test_adds_best_template_until_loss_stops_improving(self):
+        ablation = self.run_ablation()
+        # b alone is best, then a; adding c makes validation worse, so selection stops there
+        self.assertEqual(ablation.forward_order, ["b", "a"])
+        forward = [variant["features"] for variant in ablation.variants if variant["kind"] == "forward"]
+        self.assertEqual(sorted(map(tuple, forward)), sorted([("a",), ("b",), ("c",), ("b", "a"), ("b", "c"), ("b", "a", "c")]))
+        summary = ablation.summary()
+        self.assertEqual([summary[name]["forward_rank"] for name in "abc"], [2, 1, None])
+        self.assertAlmostEqual(summary["c"]["leave_one_out_delta"], -0.05)
+        self.assertEqual(summary["a"]["weight"], 0.1)
+
+    def test_forward_rounds_caps_selection(self):
+        ablation = self.run_ablation(forward_rounds=1)
+        self.assertEqual(ablation.forward_order, ["b"])
+        self.assertNotIn(("b", "a"), self.calls)
+
+if __name__ == "__main__":
+    unittest.main()
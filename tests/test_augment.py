@@ -0,0 +1,174 @@
+import os
+import sys
+import ast
+import json
+import tempfile
+import unittest
+from unittest import mock
+import pandas as pd
+import augment
+from src.ConditionalRandomFields.CRFFunctions import Augment, TagCache
+from src.ConditionalRandomFields.Dataset import read_frame
+
+EVENTS = [
+    "[('submit report', '7:00am', '5pm', 'friday'), (\"Mike's birthday\", '4:30am', '3pm', 'tomorrow')]",
+    "[('gym/workout', '10:00am', '5pm', ''), ('review pull-request', '7:15am', '8pm', 'March 12')]",
+    "not a list",
+    "[('team standup', '9:00am', '2pm', 'March 12')]",
+    "[('dentist appointment', '2:30am', '5pm', 'friday'), ('gym/workout', '2:30am', '6pm', 'tomorrow')]",
+]
+PREDICATES = {"prefix": ["I need to", "Please add/schedule", "can't forget to"], "suffix": ["for me", "asap", "on my to-do list"]}
+
+def add_row_reference(augmenter, events_path):
+    # The original per-row path: iterrows + literal_eval into add_row, "" dates become "today"
+    for _, row in pd.read_csv(events_path).iterrows():
+        try:
+            for item in ast.literal_eval(row["events"]):
+                augmenter.add_row(item[0], item[1], item[2], item[3] or "today")
+        except Exception:
+            continue
+    return augmenter.data
+
+class TestAugmentFile(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.events_path = os.path.join(self.directory.name, "events.csv")
+        self.predicate_path = os.path.join(self.directory.name, "predicates.csv")
+        pd.DataFrame({"events": EVENTS}).to_csv(self.events_path, index=False)
+        pd.DataFrame(PREDICATES).to_csv(self.predicate_path, index=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def augmenter(self, seed=0):
+        # Two raw rows per chunk, so the file is written in several pieces
+        return Augment(self.events_path, self.predicate_path, chunksize=2, seed=seed)
+
+    def test_split_events_matches_add_row(self):
+        expected = add_row_reference(self.augmenter(), self.events_path)
+        augmenter = self.augmenter()
+        augmenter.split_events()
+        columns = ["event", "start_time", "end_time", "date"]
+        self.assertEqual(augmenter.data[columns].astype(str).values.tolist(), expected[columns].astype(str).values.tolist())
+
+    def test_augment_file_matches_add_row_and_concat_predicates(self):
+        expected = add_row_reference(self.augmenter(), self.events_path)
+        for suffix in (".csv", ".parquet"):
+            with self.subTest(format=suffix):
+                output = os.path.join(self.directory.name, f"aug{suffix}")
+                manifest_path = os.path.join(self.directory.name, "manifest.json")
+                rows = self.augmenter().augment_file(output, manifest_path)
+                frame = read_frame(output) if suffix != ".csv" else pd.read_csv(output)
+                self.assertEqual(rows, len(expected))
+
+                self.assertEqual(frame["event"].tolist(), expected["event"].tolist())
+                self.assertEqual(frame["date"].astype(str).tolist(), expected["date"].tolist())
+                # Phrases are cleaned of "-" and "'" like concat_predicates did, "/" is kept
+                phrases = {phrase.replace("-", " ").replace("'", "") for column in PREDICATES.values() for phrase in column}
+                self.assertIn("Please add/schedule", phrases)
+                for row in frame.itertuples():
+                    self.assertIn(row.predicate, phrases)
+                    tail = f"on {row.date} from {row.start_time} to {row.end_time}"
+                    self.assertIn(row.full_text, (f"{row.predicate} {row.event} {tail}", f"{row.event} {row.predicate} {tail}"))
+
+                with open(manifest_path, "r") as f:
+                    sources = json.load(f)["sources"]
+                # Every raw row is recorded, the unparseable one with no output rows
+                self.assertEqual(sorted(sources.values()), [0, 1, 2, 2, 2])
+                self.assertEqual(sum(sources.values()), len(expected))
+
+    def test_augment_file_labels_every_token(self):
+        output = os.path.join(self.directory.name, "aug.csv")
+        self.augmenter().augment_file(output, manifest_path=None)
+        frame = pd.read_csv(output)
+        for text, sequence in zip(frame["full_text"], frame["sequence"]):
+            self.assertEqual(len(sequence.split(" ")), len(text.split(" ")))
+        self.assertFalse(os.path.exists(f"{output}.tmp"))
+
+class TestAugmentIncremental(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.events_path = os.path.join(self.directory.name, "events.csv")
+        self.predicate_path = os.path.join(self.directory.name, "predicates.csv")
+        self.output = os.path.join(self.directory.name, "aug.csv")
+        self.manifest_path = os.path.join(self.directory.name, "manifest.json")
+        pd.DataFrame(PREDICATES).to_csv(self.predicate_path, index=False)
+        self.run_incremental(EVENTS)
+        self.before = pd.read_csv(self.output)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def run_incremental(self, events, tag_cache=None):
+        pd.DataFrame({"events": events}).to_csv(self.events_path, index=False)
+        augmenter = Augment(self.events_path, self.predicate_path, chunksize=2, seed=len(events))
+        return augmenter.augment_incremental(self.output, self.manifest_path, tag_cache=tag_cache)
+
+    def assertManifestMatchesOutput(self):
+        frame = pd.read_csv(self.output)
+        with open(self.manifest_path, "r") as f:
+            sources = json.load(f)["sources"]
+        self.assertEqual(frame["source"].value_counts().to_dict(), {source: rows for source, rows in sources.items() if rows})
+        return frame, sources
+
+    def test_append_row(self):
+        summary = self.run_incremental(EVENTS + ["[('call mom', '6pm', '7pm', 'sunday')]"])
+        self.assertEqual((summary["new"], summary["removed"], summary["rows_added"]), (1, 0, 1))
+        frame, sources = self.assertManifestMatchesOutput()
+        self.assertEqual(len(sources), 6)
+        # Existing rows are untouched and the new one is appended
+        pd.testing.assert_frame_equal(frame.iloc[:len(self.before)], self.before)
+        self.assertEqual(frame["event"].iloc[-1], "call mom")
+
+    def test_change_row(self):
+        events = list(EVENTS)
+        events[3] = "[('team retro', '9:00am', '2pm', 'March 12')]"
+        summary = self.run_incremental(events)
+        self.assertEqual((summary["new"], summary["removed"], summary["unchanged"]), (1, 1, 4))
+        frame, sources = self.assertManifestMatchesOutput()
+        self.assertEqual(len(sources), 5)
+        self.assertNotIn("team standup", frame["event"].tolist())
+        self.assertEqual(frame["event"].iloc[-1], "team retro")
+        kept = self.before[self.before["event"] != "team standup"].reset_index(drop=True)
+        pd.testing.assert_frame_equal(frame.iloc[:len(kept)], kept)
+
+    def test_delete_row(self):
+        tag_cache = TagCache()
+        tag_cache.tags = {text: ["NOUN"] for text in self.before["full_text"]}
+        events = EVENTS[:1] + EVENTS[2:]
+        summary = self.run_incremental(events, tag_cache=tag_cache)
+        self.assertEqual((summary["new"], summary["removed"], summary["rows_added"]), (0, 1, 0))
+        frame, sources = self.assertManifestMatchesOutput()
+        self.assertEqual(len(sources), 4)
+        deleted = self.before["event"].isin(["gym workout", "review pull request"]) & self.before["date"].isin(["today", "March 12"])
+        deleted &= self.before["source"] == self.before.loc[deleted, "source"].iloc[0]
+        pd.testing.assert_frame_equal(frame, self.before[~deleted].reset_index(drop=True))
+        # Only the deleted rows' texts leave the tag cache
+        self.assertEqual(set(tag_cache.tags), set(frame["full_text"]))
+
+    def test_augment_script_incremental(self):
+        data = os.path.join(self.directory.name, "data")
+        os.makedirs(data)
+        pd.DataFrame({"events": EVENTS}).to_csv(os.path.join(data, "training-events.csv"), index=False)
+        pd.DataFrame(PREDICATES).to_csv(os.path.join(data, "predicate_phrases.csv"), index=False)
+        cwd = os.getcwd()
+        os.chdir(self.directory.name)
+        try:
+            with mock.patch.object(sys, "argv", ["augment.py", "--incremental"]):
+                augment.PrepareData(incremental=augment.parse_args().incremental)
+            first = pd.read_csv("data/aug_TIM.csv")
+            pd.DataFrame({"events": EVENTS[1:] + ["[('call mom', '6pm', '7pm', 'sunday')]"]}).to_csv("data/training-events.csv", index=False)
+            augment.PrepareData(incremental=True)
+            frame = pd.read_csv("data/aug_TIM.csv")
+            with open("data/aug_manifest.json", "r") as f:
+                sources = json.load(f)["sources"]
+        finally:
+            os.chdir(cwd)
+        self.assertEqual(frame["source"].value_counts().to_dict(), {source: rows for source, rows in sources.items() if rows})
+        self.assertEqual(len(sources), 5)
+        self.assertEqual(frame["event"].iloc[-1], "call mom")
+        self.assertNotIn("submit report", frame["event"].tolist())
+        self.assertEqual(len(frame), len(first) - 2 + 1)
+
+if __name__ == "__main__":
+    unittest.main()
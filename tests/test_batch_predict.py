@@ -0,0 +1,44 @@
+import os
+import io
+import sys
+import json
+import tempfile
+import unittest
+import numpy as np
+from unittest import mock
+from src.ConditionalRandomFields.BatchPredict import BatchPredictor, batched, read_utterances
+from src.ConditionalRandomFields.CRF import save_model
+from src.ConditionalRandomFields.Templates import FEATURE_TEMPLATES
+
+class TestBatchPredict(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.model = os.path.join(self.directory.name, "weights.json")
+        save_model(self.model, np.random.default_rng(0).uniform(-0.5, 0.5, FEATURE_TEMPLATES.size), FEATURE_TEMPLATES)
+        self.input = os.path.join(self.directory.name, "utterances.txt")
+        with open(self.input, "w") as f:
+            f.write("call mom on July 3\n\n  gym at 5 pm tomorrow  \nsubmit the report by Friday\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_reading_skips_blank_lines(self):
+        self.assertEqual(list(read_utterances(self.input)), ["call mom on July 3", "gym at 5 pm tomorrow", "submit the report by Friday"])
+        with mock.patch.object(sys, "stdin", io.StringIO("a\n\nb\n")):
+            self.assertEqual(list(read_utterances("-")), ["a", "b"])
+        self.assertEqual(list(batched(range(5), 2)), [[0, 1], [2, 3], [4]])
+
+    def test_records_are_written_in_input_order(self):
+        output = os.path.join(self.directory.name, "parses.jsonl")
+        stats = BatchPredictor(self.model, workers=2, batch_size=1).run(self.input, output)
+        with open(output) as f:
+            records = [json.loads(line) for line in f]
+        self.assertEqual([record["text"] for record in records], list(read_utterances(self.input)))
+        self.assertEqual(stats["utterances"], 3)
+        for record in records:
+            self.assertEqual(set(record), {"text", "labels", "task", "time", "date", "confidence"})
+            self.assertEqual(len(record["labels"]), len(record["text"].split(" ")))
+            self.assertTrue(0 < record["confidence"] <= 1)
+
+if __name__ == "__main__":
+    unittest.main()
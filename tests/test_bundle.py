@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.ConditionalRandomFields.Bundle import ModelBundle, ModelBundleError, write_bundle
+from src.ConditionalRandomFields.Hashing import HashedFeatures
+from src.ConditionalRandomFields.Transitions import Transitions
+from src.ConditionalRandomFields.Templates import FEATURE_TEMPLATES, gazetteer_templates
+from src.ConditionalRandomFields.Vocabulary import Vocabulary
+
+class TestModelBundle(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "model.crfm")
+        self.templates = gazetteer_templates()
+        self.hashing = HashedFeatures(bits=6)
+        self.transitions = Transitions()
+        size = self.templates.size + self.hashing.size + self.transitions.size
+        self.weights = np.random.default_rng(0).normal(size=size)
+        write_bundle(self.path, self.weights, self.templates, self.hashing, self.transitions,
+                     tagger={"name": "en_core_web_md", "version": "3.7.1"})
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_round_trip_is_memory_mapped(self):
+        bundle = ModelBundle.load(self.path)
+        self.assertIsInstance(bundle.weights, np.memmap)
+        np.testing.assert_array_equal(bundle.weights, self.weights)
+        self.assertEqual(bundle.templates.names, self.templates.names)
+        self.assertEqual(bundle.templates.gazetteer.categories, self.templates.gazetteer.categories)
+        self.assertEqual(bundle.hashing.config(), self.hashing.config())
+        self.assertEqual(bundle.transitions.size, self.transitions.size)
+
+    def test_corruption_fails_the_checksum(self):
+        with open(self.path, "r+b") as f:
+            f.seek(-3, os.SEEK_END)
+            f.write(b"\x7f")
+        with self.assertRaises(ModelBundleError):
+            ModelBundle.load(self.path)
+
+    def test_schema_mismatches_fail_fast(self):
+        with self.assertRaises(ModelBundleError):
+            ModelBundle.load(self.path, vocab=Vocabulary(labels=["T", "D", "TM", "O"]))
+        with self.assertRaises(ModelBundleError):
+            write_bundle(self.path, self.weights[:-1], self.templates, self.hashing, self.transitions)
+        with self.assertRaises(ModelBundleError):
+            ModelBundle.load(self.path).check_tagger({"name": "en_core_web_sm", "version": "3.7.1"})
+        with open(self.path, "r+b") as f:
+            f.write(b"NOTMODEL")
+        with self.assertRaises(ModelBundleError):
+            ModelBundle.load(self.path)
+
+    def test_plain_templates_need_no_gazetteer(self):
+        write_bundle(self.path, self.weights[:FEATURE_TEMPLATES.size], FEATURE_TEMPLATES)
+        bundle = ModelBundle.load(self.path)
+        self.assertIsNone(bundle.templates.gazetteer)
+        self.assertIsNone(bundle.hashing)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+import os
+import random
+import tempfile
+import numpy as np
+from src.ConditionalRandomFields.Checkpoint import Checkpoint
+
+class TestCheckpointClass(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "checkpoint.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_save_and_load_round_trip(self):
+        checkpoint = Checkpoint(self.filename, every=10)
+        state = {
+            "seed": 7, "epoch": 2, "row": 30,
+            "weights": [np.float64(0.25), -0.1],
+            "optimizer": {"learning_rate": 0.008, "steps": 30},
+            "progress": {"sum_loss": 12.5, "count": 30},
+        }
+        checkpoint.save(state)
+        loaded = checkpoint.load()
+        self.assertEqual(loaded["row"], 30)
+        self.assertEqual(loaded["weights"], [0.25, -0.1])
+        self.assertEqual(os.listdir(self.directory.name), ["checkpoint.json"])
+
+    def test_rng_state_is_restored(self):
+        checkpoint = Checkpoint(self.filename)
+        random.seed(3)
+        np.random.seed(3)
+        checkpoint.save({"seed": 3, "epoch": 0, "row": 0})
+        expected = (random.random(), np.random.rand())
+
+        random.seed(99)
+        np.random.seed(99)
+        checkpoint.load()
+        self.assertEqual((random.random(), np.random.rand()), expected)
+
+    def test_due(self):
+        checkpoint = Checkpoint(self.filename, every=5)
+        self.assertFalse(checkpoint.due(0))
+        self.assertTrue(checkpoint.due(10))
+        self.assertFalse(checkpoint.due(11))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+import pandas as pd
+from src.ConditionalRandomFields.Compact import compact, delexicalize
+
+class TestCompact(unittest.TestCase):
+    def test_delexicalize_times_and_dates(self):
+        self.assertEqual(delexicalize("Meet with HR at 6:15am"), delexicalize("Meet with HR at 7:45pm"))
+        self.assertEqual(delexicalize("Lunch on July 3"), delexicalize("Lunch on March 12"))
+        self.assertNotEqual(delexicalize("Call mom at 6pm"), delexicalize("Call mom at 6:30pm"))
+
+    def test_may_needs_a_day_to_be_a_month(self):
+        self.assertEqual(delexicalize("I may call mom"), "I may call mom")
+        self.assertEqual(delexicalize("Call mom on May 3"), delexicalize("Call mom on June 12"))
+        self.assertEqual(delexicalize("Dentist 21st May"), "Dentist <DATE> <MONTH>")
+        self.assertNotEqual(delexicalize("I may call mom"), delexicalize("I June call mom"))
+
+    def test_compact_groups_templates_with_weights(self):
+        data = pd.DataFrame({
+            "full_text": ["Meet with HR at 6:15am", "Meet with HR at 7:15pm", "Meet with HR at 8:45am", "Submit the report by 5:00pm"],
+            "sequence": ["T T T O TM", "T T T O TM", "T T T O TM", "T T T O TM"],
+        })
+        compacted, report = compact(data)
+        self.assertEqual(len(compacted), 2)
+        self.assertEqual(compacted["weight"].tolist(), [3, 1])
+        self.assertEqual(compacted["full_text"].iloc[0], "Meet with HR at 6:15am")
+        self.assertAlmostEqual(report["compression_ratio"], 2.0)
+
+    def test_different_label_sequences_stay_apart(self):
+        data = pd.DataFrame({"full_text": ["Gym at 6pm", "Gym at 7pm"], "sequence": ["T O TM", "T T TM"]})
+        compacted, _ = compact(data)
+        self.assertEqual(len(compacted), 2)
+
+if __name__ == "__main__":
+    unittest.main()
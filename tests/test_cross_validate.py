@@ -0,0 +1,43 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from src.ConditionalRandomFields import CrossValidate as CrossValidateModule
+from src.ConditionalRandomFields.CrossValidate import CrossValidate
+from src.ConditionalRandomFields.Dataset import write_dataset
+from src.ConditionalRandomFields.Split import SplitIndex
+
+class TestCrossValidate(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "aug.parquet")
+        write_dataset(pd.DataFrame({"full_text": [f"call mom at {hour}pm" for hour in range(1, 11)],
+                                    "sequence": ["T T O TM"] * 10}), self.filename)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_split_is_built_once_before_the_folds(self):
+        index_path = SplitIndex(self.filename).index_path
+        seen = []
+
+        def fake_fold(filename, fold, folds, epochs, seed, num_features):
+            # Every worker finds the index already written by the parent
+            seen.append(os.path.exists(index_path))
+            return {"fold": fold, "train_loss": 1.0, "validation_loss": 1.0, "seconds": 0.0, "weights": [0.0]}
+
+        with mock.patch.object(CrossValidateModule, "train_fold", fake_fold), \
+             mock.patch.object(CrossValidateModule, "ProcessPoolExecutor", ThreadPoolExecutor):
+            results = CrossValidate(self.filename, folds=5).run()
+        self.assertEqual([result["fold"] for result in results], list(range(5)))
+        self.assertEqual(seen, [True] * 5)
+        self.assertEqual(sorted(row for fold in SplitIndex(self.filename, folds=5).load(10).fold_rows for row in fold), list(range(10)))
+
+    def test_unreadable_dataset_raises(self):
+        with self.assertRaises(FileNotFoundError):
+            CrossValidate(os.path.join(self.directory.name, "missing.csv"), folds=2).run()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+import pandas as pd
+from src.ConditionalRandomFields.Dataset import write_dataset, read_frame, read_table, DatasetWriter
+
+class TestColumnarDataset(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.frame = pd.DataFrame({
+            "full_text": ["call mom on July 3 from 6pm to 7pm", "asap gym today"],
+            "sequence": ["T T O D D O TM O TM", "O T D"],
+            "source": ["a:0", "b:0"],
+        })
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_through_both_formats(self):
+        for suffix in (".parquet", ".arrow"):
+            filename = os.path.join(self.tmp.name, f"aug{suffix}")
+            write_dataset(self.frame, filename)
+            frame = read_frame(filename)
+            self.assertEqual([" ".join(sequence) for sequence in frame["sequence"]], self.frame["sequence"].tolist())
+            self.assertEqual(frame["tokens"].iloc[1], ["asap", "gym", "today"])
+            self.assertEqual(frame["source"].tolist(), ["a:0", "b:0"])
+
+    def test_projection_reads_only_requested_columns(self):
+        filename = os.path.join(self.tmp.name, "aug.arrow")
+        write_dataset(self.frame, filename)
+        self.assertEqual(read_table(filename, columns=["labels"]).column_names, ["labels"])
+        self.assertEqual(read_frame(filename, columns=["full_text", "labels", "weight"]).columns.tolist(), ["full_text", "sequence"])
+
+    def test_chunked_writer_in_every_format(self):
+        for suffix in (".csv", ".parquet", ".arrow"):
+            with self.subTest(format=suffix):
+                filename = os.path.join(self.tmp.name, f"chunked{suffix}")
+                with DatasetWriter(filename, columns=self.frame.columns.tolist()) as writer:
+                    writer.write(self.frame.iloc[:1])
+                    writer.write(self.frame.iloc[1:])
+                frame = pd.read_csv(filename) if suffix == ".csv" else read_frame(filename)
+                self.assertEqual(frame["source"].tolist(), ["a:0", "b:0"])
+
+                # Nothing written still leaves a readable, empty file of the same format
+                empty = os.path.join(self.tmp.name, f"empty{suffix}")
+                with DatasetWriter(empty, columns=self.frame.columns.tolist()):
+                    pass
+                frame = pd.read_csv(empty) if suffix == ".csv" else read_frame(empty)
+                self.assertEqual(len(frame), 0)
+                self.assertIn("full_text", frame.columns)
+                self.assertFalse(os.path.exists(f"{empty}.tmp"))
+
+    def test_label_count_must_match_tokens(self):
+        frame = self.frame.copy()
+        frame.loc[1, "sequence"] = "O T"
+        with self.assertRaises(ValueError):
+            write_dataset(frame, os.path.join(self.tmp.name, "bad.parquet"))
+
+if __name__ == "__main__":
+    unittest.main()
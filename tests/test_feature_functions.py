@@ -0,0 +1,84 @@
+import random
+import unittest
+import numpy as np
+from src.ConditionalRandomFields.FeatureFunctions import FeatureFunctions
+from src.ConditionalRandomFields.Vocabulary import VOCAB
+
+class TestDropoutMasks(unittest.TestCase):
+    def test_masks_are_seeded(self):
+        first = FeatureFunctions.dropout_masks(np.random.default_rng(4), 16, 10)
+        second = FeatureFunctions.dropout_masks(np.random.default_rng(4), 16, 10)
+        np.testing.assert_array_equal(first, second)
+
+    def test_dropped_rows_lose_drop_rate_of_weights(self):
+        masks = FeatureFunctions.dropout_masks(np.random.default_rng(0), 64, 10, drop_rate=0.3)
+        dropped = (masks == 0).sum(axis=1)
+        self.assertTrue(set(dropped.tolist()) <= {0, 3})
+        self.assertTrue(0 < (dropped > 0).sum() < 64)
+
+    def test_zero_drop_rate_keeps_every_weight(self):
+        masks = FeatureFunctions.dropout_masks(np.random.default_rng(0), 8, 10, drop_rate=0.0)
+        self.assertTrue((masks == 1).all())
+
+    def test_mask_is_applied_to_weights(self):
+        features = FeatureFunctions(["NOUN"], ["D"], [1.0] * 10, "today")
+        mask = np.ones(10)
+        self.assertGreater(features.call_features(mask=mask)[1], 0)
+        mask[1] = 0
+        self.assertEqual(features.call_features(mask=mask)[1], 0)
+
+class TestFeatureMatrix(unittest.TestCase):
+    def test_rows_match_call_features(self):
+        tags = ["VERB", "NOUN", "NOUN", "ADP", "PROPN", "NUM", "ADP", "NUM"]
+        text = "schedule team sync on July 3 at 6:00pm"
+        candidates = VOCAB.candidates(["T", "TM", "D", "O"], len(tags), 500, rng=random.Random(0))
+        weights = list(np.linspace(-0.5, 0.5, 11))
+        matrix = FeatureFunctions(tags, None, weights, text).feature_matrix(candidates)
+        self.assertEqual(matrix.shape, (500, 10))
+        for row, candidate in zip(matrix, candidates):
+            expected = FeatureFunctions(tags, candidate, weights, text).call_features(is_training=False)
+            np.testing.assert_allclose(row * weights[:10], expected)
+
+    def test_matches_original_feature_values(self):
+        # Unweighted f1, f2, f3, f5, f7, f9, f10, f11, f13, f14 from the original per-position
+        # FeatureFunctions.call_features, computed once and frozen here
+        cases = [
+            (["VERB", "NOUN", "NOUN", "ADP", "PROPN", "NUM", "ADP", "NUM"], "schedule team sync on July 3 at 6:00pm", {
+                "O T T O D D O TM": [1, 2, 0, 1, 2, 0, 0, 0, 0, 0],
+                "T T T O D D O TM": [1, 2, 0, 1, 2, 0, 0, 0, 2, 0],
+                "O O T O D D TM TM": [1, 2, 0, 0, 0, 0, 1.5, 0, 0, 0],
+                "O O O O O O O O": [0, 0, 0, 0, 0, 0, 6, 0, 0, 0],
+                "T T T T T T T T": [0, 0, 0, 1, 4, 0, 0, 0, 2, 0],
+                "D TM D TM D TM D TM": [3, 4, 0, 0, 0, 2, 0, 0, 0, 0],
+            }),
+            (["PRON", "VERB", "ADP", "VERB", "NOUN", "NOUN", "NOUN"], "I need to call mom tomorrow morning", {
+                "O O O T T D D": [0, 0, 0, 1, 4, 0, 3, 2, 2, 0],
+                "O O T T T D D": [0, 0, 0, 1, 4, 0, 1.5, 2, 2, 1.5],
+                "O O O O T O O": [0, 0, 0, 0, 2, 0, 6, 0, 0, 1.5],
+                "T T T T T T T": [0, 0, 0, 2, 6, 0, 0, 0, 2, 0],
+            }),
+            (["VERB", "PROPN", "NOUN", "ADP", "NOUN", "ADP", "NUM", "NOUN"], "meet Sarah tonight for lunch at 12 PM", {
+                "O T D O T O TM TM": [2, 0, 0, 0, 4, 0, 0, 1, 0, 0],
+                "T T O O T O TM O": [1, 0, 0, 0, 4, 0, 1.5, 0, 2, 1.5],
+                "O O O T T O O TM": [1, 0, 0, 0, 2, 0, 3, 0, 0, 1.5],
+                "O D D O O O TM TM": [2, 0, 1, 0, 0, 0, 3, 1, 0, 0],
+            }),
+            (["NOUN", "ADP", "PROPN", "NOUN"], "dentist on May 5th", {
+                "T O D D": [0, 2, 1, 0, 0, 0, 0, 0, 0, 0],
+                "O O D D": [0, 2, 1, 0, 0, 0, 1.5, 0, 0, 0],
+                "T T O O": [0, 0, 0, 0, 0, 0, 1.5, 0, 0, 0],
+            }),
+        ]
+        for tags, text, expected in cases:
+            with self.subTest(text=text):
+                candidates = np.array([VOCAB.encode_labels(sequence.split(" ")) for sequence in expected])
+                matrix = FeatureFunctions(tags, None, [1.0] * 10, text).feature_matrix(candidates)
+                np.testing.assert_array_equal(matrix, list(expected.values()))
+
+    def test_length_mismatch_scores_nothing(self):
+        features = FeatureFunctions(["NOUN", "NOUN"], ["T"], [1.0] * 10, "a b")
+        self.assertIsNone(features.call_features())
+        self.assertEqual(features.feature_matrix(VOCAB.encode_labels(["T", "T", "T"])).shape, (0, 10))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.ConditionalRandomFields.Gazetteer import Gazetteer, DEFAULT_LEXICONS, task_names_from_events
+from src.ConditionalRandomFields.Templates import FeatureTemplates, gazetteer_templates
+from src.ConditionalRandomFields.Vocabulary import VOCAB
+
+class TestGazetteer(unittest.TestCase):
+    def setUp(self):
+        self.gazetteer = Gazetteer({**DEFAULT_LEXICONS, "task": ["team standup", "standup"]})
+
+    def test_multi_token_and_overlapping_matches(self):
+        matches = self.gazetteer.matches("Move the team standup to the day after tomorrow, in the evening".split(" "))
+        self.assertIn((2, 4, "task"), matches)
+        self.assertIn((3, 4, "task"), matches)
+        self.assertIn((6, 9, "relative_date"), matches)
+        self.assertIn((8, 9, "relative_date"), matches)
+        self.assertIn((9, 12, "time"), matches)
+
+    def test_failure_links_recover_partial_phrases(self):
+        gazetteer = Gazetteer({"a": ["a b c", "b c d"]})
+        self.assertEqual(gazetteer.matches("a b c d".split(" ")), [(0, 3, "a"), (1, 4, "a")])
+
+    def test_may_is_a_month_only_next_to_a_day(self):
+        self.assertNotIn("month", {category for _, _, category in self.gazetteer.matches("I may call mom".split(" "))})
+        self.assertIn((1, 3, "month"), self.gazetteer.matches("on May 3rd, call mom".split(" ")))
+        self.assertIn((1, 4, "month"), self.gazetteer.matches("the 21st of May".split(" ")))
+        self.assertIn((1, 2, "month"), self.gazetteer.matches("in June".split(" ")))
+
+    def test_marks_and_config_round_trip(self):
+        tokens = "standup on Friday".split(" ")
+        marks = Gazetteer.from_config(self.gazetteer.config()).mark(tokens, length=4)
+        self.assertEqual(marks.shape, (4, len(self.gazetteer.categories)))
+        self.assertTrue(marks[0, self.gazetteer.category_ids["task"]])
+        self.assertTrue(marks[2, self.gazetteer.category_ids["weekday"]])
+        self.assertFalse(marks[1].any() or marks[3].any())
+
+    def test_task_names_from_calendar_history(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "events.csv")
+            pd.DataFrame({"events": ["[('gym/workout', '7:00am', '8am', 'friday'), (\"Mike's birthday\", '9:00am', '5pm', '')]"]}).to_csv(path, index=False)
+            self.assertEqual(task_names_from_events(path), ["gym workout", "Mikes birthday"])
+
+class TestGazetteerTemplates(unittest.TestCase):
+    def test_lexicon_features_fire_on_matches(self):
+        templates = gazetteer_templates(Gazetteer({**DEFAULT_LEXICONS, "task": ["team standup"]}))
+        text = "team standup next Friday at noon"
+        tables = templates.tables(VOCAB.encode_tags(["NOUN", "NOUN", "ADJ", "PROPN", "ADP", "NOUN"]), text.split(" "), text)
+        values = templates.feature_matrix(tables, np.array([VOCAB.encode_labels("T T D D O TM".split(" "))]))[0]
+        names = templates.names
+        self.assertEqual([values[names.index(name)] for name in ("g1", "g2", "g3")], [2, 1, 2])
+
+    def test_unknown_categories_are_rejected(self):
+        with self.assertRaises(ValueError):
+            FeatureTemplates([{"name": "bad", "when": [{"gazetteer": {0: ["task"]}}], "labels": {0: "T"}}])
+
+if __name__ == "__main__":
+    unittest.main()
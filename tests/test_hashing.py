@@ -0,0 +1,41 @@
+import pickle
+import unittest
+import numpy as np
+from src.ConditionalRandomFields.Hashing import HashedFeatures, word_shape
+
+class TestHashedFeatures(unittest.TestCase):
+    def setUp(self):
+        self.hashing = HashedFeatures(bits=10)
+        self.tokens = "Call mom at 6:30pm".split(" ")
+
+    def test_indices_stay_in_the_weight_array(self):
+        indices = self.hashing.indices(self.tokens)
+        self.assertEqual(indices.shape, (4, 3, 4))
+        self.assertTrue(((indices >= 0) & (indices < 2 ** 10)).all())
+        np.testing.assert_array_equal(indices, HashedFeatures(bits=10).indices(self.tokens))
+        np.testing.assert_array_equal(indices, pickle.loads(pickle.dumps(self.hashing)).indices(self.tokens))
+
+    def test_word_shape(self):
+        self.assertEqual(word_shape("6:30pm"), "d:dx")
+        self.assertEqual(word_shape("July"), "Xx")
+
+    def test_scores_gather_emission_weights(self):
+        indices = self.hashing.indices(self.tokens)
+        weights = np.random.default_rng(0).normal(size=self.hashing.size)
+        sequences = np.array([[0, 3, 3, 1], [3, 3, 3, 3]], dtype=np.int8)
+        expected = [sum(weights[indices[i, :, label]].sum() for i, label in enumerate(row)) for row in sequences]
+        np.testing.assert_allclose(self.hashing.scores(weights, indices, sequences), expected)
+
+    def test_gradient_is_expected_minus_true_counts(self):
+        indices = self.hashing.indices(self.tokens)
+        sequences = np.array([[0, 3, 3, 1], [3, 3, 3, 3]], dtype=np.int8)
+        gradient = self.hashing.gradient(indices, sequences, np.array([1.0, 0.0]), sequences[0])
+        self.assertTrue(np.allclose(gradient.dense(), 0))
+
+        gradient = self.hashing.gradient(indices, sequences, np.array([0.0, 1.0]), sequences[0], offset=10)
+        self.assertAlmostEqual(gradient.values.sum(), 0.0)
+        self.assertEqual(len(gradient), 10 + self.hashing.size)
+        self.assertTrue(set(gradient.indices) <= set((indices + 10).ravel()))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import numpy as np
+import pandas as pd
+from src.ConditionalRandomFields.Labeling import label_frame, label_spans, tim_frame, LABEL_CODES
+
+def augmented(predicate, event, date, start_time, end_time, prefix=True):
+    head = f"{predicate} {event}" if prefix else f"{event} {predicate}"
+    full_text = f"{head} on {date} from {start_time} to {end_time}"
+    return {
+        "full_text": full_text, "predicate": predicate, "event": event, "date": date,
+        "start_time": start_time, "end_time": end_time,
+        "predicate_start": 0 if prefix else len(event) + 1,
+        "event_start": len(predicate) + 1 if prefix else 0,
+        "date_start": full_text.index(f" on {date}") + 4,
+        "start_time_start": full_text.index(f" from {start_time}") + 6,
+        "end_time_start": full_text.rindex(f" to {end_time}") + 4,
+    }
+
+class TestSpanLabeling(unittest.TestCase):
+    def test_labels_follow_component_spans(self):
+        frame = pd.DataFrame([
+            augmented("Remind me to", "call mom", "July 3", "6:00pm", "7pm"),
+            augmented("asap", "go to the gym", "today", "7am", "8am", prefix=False),
+        ])
+        self.assertEqual(label_frame(frame).tolist(), [
+            "O O O T T O D D O TM O TM",
+            "T T T T O O D O TM O TM",
+        ])
+
+    def test_substrings_are_not_mislabeled(self):
+        # "to" inside the event must not leak the predicate's "O" label
+        frame = pd.DataFrame([augmented("please", "to do list", "today", "9am", "10am", prefix=False)])
+        self.assertEqual(label_frame(frame).iloc[0], "T T T O O D O TM O TM")
+
+    def test_chunked_labeling_matches(self):
+        frame = pd.DataFrame([augmented("I need to", f"task {i}", "today", "1pm", "2pm") for i in range(25)])
+        pd.testing.assert_series_equal(label_spans(frame, workers=2, chunksize=10), label_frame(frame))
+
+class TestTimLoader(unittest.TestCase):
+    def test_gold_spans_become_label_codes(self):
+        data = pd.DataFrame({
+            "text": ["Meet with HR at 8:45am", "Call the client on June 17", "Schedule a team meeting for July 3 at 10:00am"],
+            "task": ["Meet with hr at", "Call the client on", "Schedule a team meeting"],
+            "time": ["8:45am", None, "10:00am"],
+            "date": [None, "June 17", "July 3"],
+        })
+        frame = tim_frame(data)
+        self.assertEqual(frame["sequence"].tolist(), ["T T T T TM", "T T T T D D", "T T T T O D D O TM"])
+        self.assertEqual(frame["labels"].iloc[0].dtype, np.int8)
+        np.testing.assert_array_equal(frame["labels"].iloc[1], [LABEL_CODES[label] for label in "T T T T D D".split(" ")])
+        self.assertEqual(frame["full_text"].tolist(), data["text"].tolist())
+
+if __name__ == "__main__":
+    unittest.main()
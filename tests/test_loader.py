@@ -0,0 +1,42 @@
+import unittest
+import time
+from src.ConditionalRandomFields.Loader import DataLoader
+
+OFFSET = 0
+
+def slow_square(value):
+    time.sleep(0.001 * (value % 3))
+    return value * value
+
+def set_offset(value):
+    global OFFSET
+    OFFSET = value
+
+def offset_square(value):
+    return value * value + OFFSET
+
+class TestDataLoaderClass(unittest.TestCase):
+    def test_items_come_back_in_order(self):
+        loader = DataLoader(range(50), slow_square, workers=4, depth=8)
+        self.assertEqual(list(loader), [value * value for value in range(50)])
+        stats = loader.stats()
+        self.assertEqual(stats["items"], 50)
+        self.assertLessEqual(stats["max_queue_depth"], 8)
+
+    def test_serial_mode(self):
+        loader = DataLoader(iter([1, 2, 3]), slow_square, workers=0)
+        self.assertEqual(list(loader), [1, 4, 9])
+        self.assertIn(loader.stats()["bound"], ("input", "compute"))
+
+    def test_initializer_runs_before_the_first_item(self):
+        for workers, backend in ((0, "thread"), (2, "thread"), (2, "process")):
+            loader = DataLoader(range(5), offset_square, workers=workers, backend=backend, initializer=set_offset, initargs=(100,))
+            self.assertEqual(list(loader), [value * value + 100 for value in range(5)])
+            set_offset(0)
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            DataLoader([], slow_square, backend="gpu")
+
+if __name__ == "__main__":
+    unittest.main()
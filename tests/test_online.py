@@ -0,0 +1,80 @@
+import os
+import json
+import tempfile
+import unittest
+import numpy as np
+from src.ConditionalRandomFields.CRF import save_model
+from src.ConditionalRandomFields.Online import CorrectionJournal, OnlineLearner
+from src.ConditionalRandomFields.Templates import FEATURE_TEMPLATES
+from src.ConditionalRandomFields.Vocabulary import VOCAB
+
+class TestCorrectionJournal(unittest.TestCase):
+    def test_entries_round_trip_and_skip_a_torn_line(self):
+        with tempfile.TemporaryDirectory() as directory:
+            journal = CorrectionJournal(os.path.join(directory, "weights.json.journal"))
+            journal.append({"update": 1, "text": "call mom"})
+            journal.append({"update": 2, "text": "gym at 5"})
+            journal.close()
+            with open(journal.filename, "a") as f:
+                f.write('{"update": 3, "te')
+            self.assertEqual([entry["update"] for entry in journal.entries()], [1, 2])
+            journal.clear()
+            self.assertEqual(journal.entries(), [])
+
+class TestOnlineLearner(unittest.TestCase):
+    text = "call mom on July 3 at 17:00"
+    labels = ["T", "T", "O", "D", "D", "O", "TM"]
+    wrong = ["T", "T", "O", "D", "D", "D", "D"]
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "weights.json")
+        weights = np.random.default_rng(0).uniform(-0.1, 0.1, FEATURE_TEMPLATES.size)
+        save_model(self.filename, weights, FEATURE_TEMPLATES)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_corrections_are_journaled_replayed_and_flushed_once(self):
+        learner = OnlineLearner(self.filename, flush_every=100)
+        before = learner.weights.dense().copy()
+        self.assertTrue(learner.correct(self.text, self.labels, predicted=self.wrong))
+        self.assertFalse(learner.correct(self.text, self.labels, predicted=self.labels))
+        self.assertFalse(np.allclose(learner.weights.dense(), before))
+        learner.journal.close()
+
+        # A restart before the model is saved replays the journal
+        replayed = OnlineLearner(self.filename)
+        np.testing.assert_allclose(replayed.weights.dense(), learner.weights.dense())
+        replayed.flush()
+        self.assertFalse(os.path.exists(replayed.journal.filename))
+        with open(self.filename) as f:
+            self.assertEqual(json.load(f)["metadata"]["online_updates"], 1)
+
+        reloaded = OnlineLearner(self.filename)
+        self.assertEqual(reloaded.updates, 1)
+        np.testing.assert_allclose(reloaded.weights.dense(), learner.weights.dense())
+
+    def test_perceptron_correction_touches_only_fired_columns(self):
+        learner = OnlineLearner(self.filename, l2_strength=0.0)
+        before = learner.weights.dense().copy()
+        self.assertTrue(learner.correct(self.text, self.labels, predicted=self.wrong))
+        changed = np.flatnonzero(learner.weights.dense() != before)
+
+        # Only features that fire on the correction or on the shown parse can move
+        features = learner.recent[self.text]["features"]
+        values = features.feature_matrix(np.array([VOCAB.encode_labels(self.labels), VOCAB.encode_labels(self.wrong)]))
+        fired = np.flatnonzero((values != 0).any(axis=0))
+        self.assertGreater(len(changed), 0)
+        self.assertTrue(set(changed) <= set(fired))
+        self.assertEqual(learner.stats()["updates"], 1)
+
+    def test_rejects_labels_that_do_not_fit(self):
+        learner = OnlineLearner(self.filename)
+        with self.assertRaises(ValueError):
+            learner.correct(self.text, ["T", "O"])
+        with self.assertRaises(ValueError):
+            learner.correct(self.text, self.labels, method="adam")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import os
+import json
+import tempfile
+import unittest
+import numpy as np
+from src.ConditionalRandomFields.CRF import Predict, save_model
+from src.ConditionalRandomFields.Bundle import ModelBundleError
+from src.ConditionalRandomFields.Templates import FEATURE_TEMPLATES
+
+class TestPredictLoading(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "weights.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_old_eleven_weight_file_loads(self):
+        # The layout save_weights wrote with the old num_features=11 default
+        weights = np.linspace(-0.5, 0.5, 11)
+        with open(self.filename, "w") as f:
+            json.dump({"weights": {str(i): float(weight) for i, weight in enumerate(weights)}}, f)
+        with self.assertLogs("src.ConditionalRandomFields.CRF", level="WARNING"):
+            model = Predict("call mom tomorrow", self.filename)
+        self.assertEqual(len(model.weights), FEATURE_TEMPLATES.size)
+        np.testing.assert_allclose(model.weights.dense(), weights[:FEATURE_TEMPLATES.size])
+        self.assertEqual(len(model.predict()), 3)
+
+        # Re-saving upgrades the file to the current layout
+        save_model(self.filename, model.weights, model.templates)
+        np.testing.assert_allclose(Predict("", self.filename).weights.dense(), weights[:FEATURE_TEMPLATES.size])
+
+    def test_current_layout_size_mismatch_still_fails(self):
+        with open(self.filename, "w") as f:
+            json.dump({"weights": {"0": 0.1}, "size": FEATURE_TEMPLATES.size + 3, "templates": FEATURE_TEMPLATES.names}, f)
+        with self.assertRaises(ModelBundleError):
+            Predict("", self.filename)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+from src.ConditionalRandomFields.Bundle import write_bundle
+from src.ConditionalRandomFields.Hashing import HashedFeatures
+from src.ConditionalRandomFields.Registry import ModelRegistry
+from src.ConditionalRandomFields.Templates import FEATURE_TEMPLATES
+
+class TestModelRegistry(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.hashing = HashedFeatures(bits=10)
+        size = FEATURE_TEMPLATES.size + self.hashing.size
+        for i, user in enumerate(["alice", "bob", "carol"]):
+            write_bundle(os.path.join(self.directory.name, f"{user}.crfm"), np.full(size, float(i)), FEATURE_TEMPLATES, self.hashing)
+        self.model_bytes = size * 8
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_least_recently_used_models_are_evicted(self):
+        registry = ModelRegistry(self.directory.name, max_bytes=2 * self.model_bytes)
+        registry.get("alice")
+        registry.get("bob")
+        registry.get("alice")
+        registry.get("carol")
+        stats = registry.stats()
+        self.assertEqual(stats["resident"], ["alice", "carol"])
+        self.assertEqual((stats["hits"], stats["misses"], stats["evictions"]), (1, 3, 1))
+        self.assertLessEqual(stats["resident_bytes"], 2 * self.model_bytes)
+        self.assertEqual(registry.get("carol").weights[0], 2.0)
+
+    def test_models_share_compiled_templates(self):
+        registry = ModelRegistry(self.directory.name)
+        alice, bob = registry.get("alice"), registry.get("bob")
+        self.assertIs(alice.templates, bob.templates)
+        self.assertIs(alice.hashing, bob.hashing)
+        self.assertEqual(registry.stats()["shared_objects"], 2)
+        registry.evict("alice")
+        registry.evict("bob")
+        self.assertEqual(registry.stats()["shared_objects"], 0)
+
+    def test_ids_cannot_leave_the_model_directory(self):
+        registry = ModelRegistry(self.directory.name)
+        for model_id in ["../alice", "a/b", "", ".hidden"]:
+            with self.assertRaises(ValueError):
+                registry.get(model_id)
+        with self.assertRaises(FileNotFoundError):
+            registry.get("dave")
+
+if __name__ == "__main__":
+    unittest.main()
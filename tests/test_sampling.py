@@ -0,0 +1,44 @@
+import unittest
+import numpy as np
+from src.ConditionalRandomFields.Sampling import HardExampleSampler
+
+class TestHardExampleSamplerClass(unittest.TestCase):
+    def setUp(self):
+        self.sampler = HardExampleSampler(epoch_fraction=0.5, uniform_mix=0.2, seed=3)
+        self.sampler.attach(10)
+
+    def test_warmup_epoch_is_a_full_pass(self):
+        rows, weights = self.sampler.draw(0)
+        self.assertEqual(sorted(rows.tolist()), list(range(10)))
+        self.assertTrue((weights == 1).all())
+
+    def test_hard_rows_are_drawn_more_often(self):
+        for row in range(10):
+            self.sampler.update(row, 5.0 if row == 0 else 0.1)
+        probabilities = self.sampler.probabilities()
+        self.assertAlmostEqual(probabilities.sum(), 1.0)
+        self.assertEqual(int(np.argmax(probabilities)), 0)
+        rows, weights = self.sampler.draw(1)
+        self.assertEqual(len(rows), 5)
+        np.testing.assert_allclose(weights, 1.0 / (10 * probabilities[rows]))
+
+    def test_importance_weights_are_unbiased(self):
+        for row in range(10):
+            self.sampler.update(row, row + 1.0)
+        probabilities = self.sampler.probabilities()
+        values = np.arange(10, dtype=float)
+        self.assertAlmostEqual(np.sum(probabilities * values / (10 * probabilities)), values.mean())
+
+    def test_draw_is_stable_within_an_epoch_and_restorable(self):
+        self.sampler.update(0, 1.0)
+        rows, _ = self.sampler.draw(1)
+        self.sampler.update(1, 9.0)
+        np.testing.assert_array_equal(self.sampler.draw(1)[0], rows)
+
+        restored = HardExampleSampler()
+        restored.load_state_dict(self.sampler.state_dict())
+        np.testing.assert_array_equal(restored.draw(1)[0], rows)
+        self.assertEqual(restored.losses[1], 9.0)
+
+if __name__ == "__main__":
+    unittest.main()
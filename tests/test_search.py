@@ -0,0 +1,47 @@
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from src.ConditionalRandomFields import Search
+from src.ConditionalRandomFields.Search import HyperparameterSearch
+
+LEARNING_RATES = [0.001 * i for i in range(1, 10)]
+
+class TestHyperparameterSearch(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def fake_trial(self, filename, config, start_epoch, epochs, weights, seed, num_features=None):
+        # Lower learning rates validate better; more epochs help every config a little
+        self.calls.append((config["learning_rate"], start_epoch, epochs))
+        return {"train_loss": 1.0, "validation_loss": config["learning_rate"] * 10 + 1 / (start_epoch + epochs),
+                "weights": [0.0], "seconds": 0.0}
+
+    def run_search(self):
+        space = {"learning_rate": LEARNING_RATES, "l2_strength": [0.0], "drop_rate": [0.0], "clip": [0.5]}
+        search = HyperparameterSearch(filename="unused.csv", space=space, strategy="grid", min_epochs=1, max_epochs=9, eta=3,
+                                      workers=2, tag_cache_path="unused_tag_cache.json")
+        with mock.patch.object(Search, "run_trial", self.fake_trial), \
+             mock.patch.object(Search, "ProcessPoolExecutor", ThreadPoolExecutor), \
+             mock.patch.object(HyperparameterSearch, "prepare"):
+            return search, search.run()
+
+    def test_successive_halving_promotes_the_best_third(self):
+        search, _ = self.run_search()
+        rungs = {}
+        for learning_rate, start_epoch, epochs in self.calls:
+            rungs.setdefault(start_epoch + epochs, []).append(learning_rate)
+        self.assertEqual({budget: len(rates) for budget, rates in rungs.items()}, {1: 9, 3: 3, 9: 1})
+        self.assertEqual(sorted(rungs[3]), LEARNING_RATES[:3])
+        self.assertEqual(rungs[9], LEARNING_RATES[:1])
+        # Promoted configs continue from where they stopped instead of retraining
+        self.assertTrue(all(start_epoch == 1 for learning_rate, start_epoch, epochs in self.calls if start_epoch + epochs == 3))
+
+    def test_leaderboard_ranks_longest_trained_then_by_validation_loss(self):
+        search, leaderboard = self.run_search()
+        self.assertEqual([trial["config"]["learning_rate"] for trial in leaderboard], LEARNING_RATES)
+        self.assertEqual([trial["epochs"] for trial in leaderboard], [9, 3, 3] + [1] * 6)
+        self.assertEqual([trial["stopped_at"] for trial in leaderboard], [None, 3, 3] + [1] * 6)
+        self.assertIn("rank", search.report().splitlines()[0])
+
+if __name__ == "__main__":
+    unittest.main()
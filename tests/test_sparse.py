@@ -0,0 +1,62 @@
+import unittest
+import numpy as np
+from src.ConditionalRandomFields.Sparse import SparseVector, CSRActivations, SparseWeights
+
+def dense_update(weights, gradient, learning_rate, l2_strength, clip):
+    weights = weights - learning_rate * gradient
+    norm = np.sqrt(weights @ weights)
+    if norm > 0:
+        weights = weights / (1 + l2_strength * norm)
+    return np.clip(weights, clip[0], clip[1])
+
+class TestSparseVector(unittest.TestCase):
+    def test_duplicates_are_summed(self):
+        vector = SparseVector([5, 1, 5], [1.0, 2.0, 3.0], size=8)
+        np.testing.assert_array_equal(vector.indices, [1, 5])
+        np.testing.assert_array_equal(vector.dense(), [0, 2, 0, 0, 0, 4, 0, 0])
+        np.testing.assert_array_equal((vector - SparseVector.from_dense([1.0, 2.0], offset=4, size=8)).dense(),
+                                      [0, 2, 0, 0, -1, 2, 0, 0])
+        self.assertAlmostEqual((vector * 0.5).mean(), 3.0 / 8)
+
+class TestCSRActivations(unittest.TestCase):
+    def test_matches_dense_matrix(self):
+        rng = np.random.default_rng(0)
+        dense = (rng.random((5, 12)) < 0.3) * rng.normal(size=(5, 12))
+        rows, columns = np.nonzero(dense)
+        activations = CSRActivations(np.r_[0, np.cumsum(np.bincount(rows, minlength=5))], columns, dense[rows, columns], 12)
+        weights = rng.normal(size=12)
+        probabilities = rng.random(5)
+        np.testing.assert_allclose(activations.dot(weights), dense @ weights)
+        np.testing.assert_allclose(activations.dot(SparseWeights(weights)), dense @ weights)
+        np.testing.assert_allclose(activations.weighted_sum(probabilities).dense(), dense.T @ probabilities)
+        np.testing.assert_allclose(activations.row(2).dense(), dense[2])
+
+        stacked = CSRActivations.hstack([activations, CSRActivations(np.arange(6), np.arange(5) + 12, np.ones(5), 17)])
+        np.testing.assert_allclose(stacked.dot(np.r_[weights, np.ones(5)]), dense @ weights + 1)
+
+class TestSparseWeights(unittest.TestCase):
+    def test_updates_match_dense_updates(self):
+        rng = np.random.default_rng(1)
+        initial = rng.random(1000) * 0.9 - 0.1
+        sparse = SparseWeights(initial)
+        dense = initial.copy()
+        for step in range(300):
+            touched = rng.choice(1000, size=15, replace=False)
+            values = rng.normal(size=15)
+            gradient = np.zeros(1000)
+            gradient[touched] = values
+            dense = dense_update(dense, gradient, 0.05, 0.01, (-0.5, 0.5))
+            sparse.update(SparseVector(touched, values, 1000), 0.05, 0.01, (-0.5, 0.5))
+        np.testing.assert_allclose(sparse.dense(), dense, atol=1e-12)
+        self.assertAlmostEqual(sparse.squared_norm, dense @ dense)
+
+    def test_round_trips_through_saved_format(self):
+        weights = SparseWeights(np.r_[0.25, -0.5, np.zeros(6), 0.125])
+        saved = weights.to_dict()
+        self.assertEqual(saved, {"0": 0.25, "1": -0.5, "8": 0.125})
+        np.testing.assert_array_equal(SparseWeights.from_dict(saved, size=12).dense()[:9], weights.dense())
+        self.assertEqual(len(SparseWeights.load(weights.state())), 9)
+        self.assertEqual(len(SparseWeights.load({str(i): float(w) for i, w in enumerate(range(4))})), 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import unittest
+import os
+import tempfile
+from src.ConditionalRandomFields.Split import SplitIndex
+
+class TestSplitIndexClass(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "data.csv")
+        with open(self.filename, "w") as f:
+            f.write("full_text,sequence\n")
+            for i in range(50):
+                f.write(f"row {i},O O\n")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_partitions_do_not_overlap(self):
+        split = SplitIndex(self.filename, training_size=0.6, validation_size=0.2).load(50)
+        train, validation, test = set(split.train), set(split.validation), set(split.test)
+        self.assertEqual((len(train), len(validation), len(test)), (30, 10, 10))
+        self.assertFalse(train & validation or train & test or validation & test)
+
+    def test_index_is_persisted_and_reused(self):
+        first = SplitIndex(self.filename).load(50)
+        self.assertTrue(os.path.exists(first.index_path))
+        second = SplitIndex(self.filename).load(50)
+        self.assertEqual(first.train, second.train)
+
+    def test_index_changes_with_dataset(self):
+        first = SplitIndex(self.filename).load(50)
+        with open(self.filename, "w") as f:
+            f.write("full_text,sequence\n")
+            for i in range(51):
+                f.write(f"changed row {i},O O\n")
+        second = SplitIndex(self.filename).load(51)
+        self.assertEqual(len(second.train) + len(second.validation) + len(second.test), 51)
+        self.assertNotEqual(first.train, second.train)
+
+    def test_appended_rows_keep_existing_assignments(self):
+        first = SplitIndex(self.filename, training_size=0.6, validation_size=0.2, folds=5).load(50)
+        with open(self.filename, "a") as f:
+            for i in range(50, 60):
+                f.write(f"row {i},O O\n")
+        second = SplitIndex(self.filename, training_size=0.6, validation_size=0.2, folds=5).load(60)
+        self.assertEqual(second.train[:len(first.train)], first.train)
+        self.assertEqual(second.validation[:len(first.validation)], first.validation)
+        self.assertEqual(second.test[:len(first.test)], first.test)
+        self.assertEqual(sorted(second.train + second.validation + second.test), list(range(60)))
+        self.assertEqual((len(second.train), len(second.validation), len(second.test)), (36, 12, 12))
+        for old, new in zip(first.fold_rows, second.fold_rows):
+            self.assertEqual(new[:len(old)], old)
+        self.assertEqual(sorted(row for fold in second.fold_rows for row in fold), list(range(60)))
+        # The extended index is saved and reused as is
+        self.assertEqual(SplitIndex(self.filename, training_size=0.6, validation_size=0.2, folds=5).load(60).train, second.train)
+
+    def test_folds_cover_every_row_once(self):
+        split = SplitIndex(self.filename, folds=5).load(50)
+        rows = [row for fold in split.fold_rows for row in fold]
+        self.assertEqual(sorted(rows), list(range(50)))
+        training, validation = split.fold(2)
+        self.assertFalse(set(training) & set(validation))
+
+if __name__ == "__main__":
+    unittest.main()
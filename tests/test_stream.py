@@ -0,0 +1,86 @@
+import os
+import itertools
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from src.ConditionalRandomFields.CRFFunctions import Augment
+from src.ConditionalRandomFields.CRF import Train
+
+EVENTS = [
+    "[('submit report', '7:00am', '5pm', 'friday'), (\"Mike's birthday\", '4:30am', '3pm', 'tomorrow')]",
+    "[('gym/workout', '10:00am', '5pm', ''), ('review pull-request', '7:15am', '8pm', 'March 12')]",
+    "[('team standup', '9:00am', '2pm', 'March 12')]",
+]
+PREDICATES = {"prefix": ["I need to", "Please schedule"], "suffix": ["for me", "on my calendar"]}
+
+class TestAugmentStream(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.events_path = os.path.join(self.directory.name, "events.csv")
+        self.predicate_path = os.path.join(self.directory.name, "predicates.csv")
+        pd.DataFrame({"events": EVENTS}).to_csv(self.events_path, index=False)
+        pd.DataFrame(PREDICATES).to_csv(self.predicate_path, index=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def augmenter(self):
+        return Augment(self.events_path, self.predicate_path, chunksize=2)
+
+    def test_same_seed_same_examples(self):
+        first = list(self.augmenter().stream(seed=7, limit=50, batch_size=16))
+        second = list(self.augmenter().stream(seed=7, limit=50, batch_size=16))
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, list(self.augmenter().stream(seed=8, limit=50, batch_size=16)))
+
+    def test_limit_and_batch_size(self):
+        augmenter = self.augmenter()
+        examples = list(augmenter.stream(seed=0, limit=25, batch_size=10))
+        self.assertEqual(len(examples), 25)
+        self.assertEqual(augmenter.stream_stats["examples"], 25)
+
+        # Batches are labeled all at once, so only batch_size examples exist before the first is yielded
+        stream = augmenter.stream(seed=0, batch_size=10)
+        list(itertools.islice(stream, 3))
+        self.assertEqual(augmenter.stream_stats["examples"], 10)
+        list(itertools.islice(stream, 8))
+        self.assertEqual(augmenter.stream_stats["examples"], 20)
+
+    def test_one_label_per_token(self):
+        events, dates, times = self.augmenter().variants()
+        self.assertIn("gym workout", events)
+        self.assertIn("today", dates)
+        for example in self.augmenter().stream(seed=3, limit=200, batch_size=64):
+            self.assertEqual(len(example["sequence"].split(" ")), len(example["full_text"].split(" ")))
+
+    def test_attach_predicates_spans(self):
+        batch = pd.DataFrame({"event": ["call mom", "gym workout"], "start_time": ["5pm", "6am"],
+                              "end_time": ["6pm", "7am"], "date": ["today", "March 12"]})
+        self.augmenter().attach_predicates(batch, np.random.default_rng(0))
+        for row in batch.itertuples():
+            for column in ("predicate", "event", "date", "start_time", "end_time"):
+                start = getattr(row, f"{column}_start")
+                value = str(getattr(row, column))
+                self.assertEqual(row.full_text[start:start + len(value)], value)
+
+class TestTrainStream(unittest.TestCase):
+    def test_stream_with_weighted_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            events_path = os.path.join(directory, "events.csv")
+            predicate_path = os.path.join(directory, "predicates.csv")
+            pd.DataFrame({"events": EVENTS}).to_csv(events_path, index=False)
+            pd.DataFrame(PREDICATES).to_csv(predicate_path, index=False)
+            # A compacted file: its weights must not be applied to the streamed rows
+            filename = os.path.join(directory, "aug.compact.csv")
+            pd.DataFrame({"full_text": [f"call mom at {hour}pm" for hour in range(1, 11)],
+                          "sequence": ["T T O TM"] * 10, "weight": range(1, 11)}).to_csv(filename, index=False)
+
+            stream = Augment(events_path, predicate_path).stream(seed=0)
+            trainer = Train(filename=filename, stream=stream, rows_per_epoch=6, seed=0, loader_workers=0, verbose=False)
+            np.testing.assert_array_equal(trainer.importance, np.ones(6))
+            trainer.train()
+            self.assertEqual(trainer.count, 6)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import os
+import tempfile
+import unittest
+from src.ConditionalRandomFields.CRFFunctions import TagCache
+
+class TestTagCache(unittest.TestCase):
+    def test_save_and_load_round_trip(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "tag_cache.json")
+            cache = TagCache(filename)
+            cache.tags = {"call mom": ["VERB", "NOUN"], "gym at 5": ["NOUN", "ADP", "NUM"]}
+            cache.save()
+            self.assertEqual(os.listdir(directory), ["tag_cache.json"])
+
+            loaded = TagCache(filename)
+            self.assertEqual(loaded.tags, cache.tags)
+            # Cached texts are served without running the tagger
+            self.assertEqual(loaded.build(["call mom"]).get("call mom"), ["VERB", "NOUN"])
+            loaded.invalidate(["call mom"])
+            self.assertNotIn("call mom", loaded.tags)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+import numpy as np
+from src.ConditionalRandomFields.Templates import FeatureTemplates, FEATURE_TEMPLATES, select_templates
+from src.ConditionalRandomFields.Vocabulary import VOCAB
+
+def features(templates, tags, text, *sequences):
+    tables = templates.tables(VOCAB.encode_tags(tags), text.split(" "), text)
+    return templates.feature_matrix(tables, np.array([VOCAB.encode_labels(sequence.split(" ")) for sequence in sequences]))
+
+class TestFeatureTemplates(unittest.TestCase):
+    def test_weight_vector_is_sized_from_templates(self):
+        self.assertEqual(FEATURE_TEMPLATES.size, len(FEATURE_TEMPLATES.names))
+        templates = FeatureTemplates([{"name": "a", "labels": {0: "T"}}, {"name": "b", "labels": {0: "O"}}])
+        self.assertEqual(templates.size, 2)
+
+    def test_conditions_offsets_and_values(self):
+        templates = FeatureTemplates([
+            {"name": "verb_then_task", "when": [{"tags": {-1: ["VERB"]}}], "labels": {0: "T", -1: "T"}, "value": 2},
+            {"name": "month", "when": [{"words": {0: ["July"]}}], "labels": {0: "D"}},
+            {"name": "time_text", "when": [{"text_contains": ["pm"]}], "labels": {0: "TM"}},
+        ])
+        values = features(templates, ["VERB", "NOUN", "ADP", "PROPN", "NUM"], "call mom on July 6pm",
+                          "T T O D TM", "O T O O TM")
+        np.testing.assert_array_equal(values, [[2, 1, 1], [0, 0, 1]])
+
+    def test_label_alternatives_fire_once_per_position(self):
+        templates = FeatureTemplates([{"name": "inside_task", "span": [1, -1], "labels": [{0: "T", -1: "T"}, {0: "T", 1: "T"}]}])
+        values = features(templates, ["NOUN"] * 4, "a b c d", "T T T T", "O T T O", "O T O O")
+        np.testing.assert_array_equal(values[:, 0], [2, 2, 0])
+
+    def test_templates_are_selected_by_name(self):
+        templates = select_templates(["f11", "f2"])
+        self.assertEqual(templates.names, ["f11", "f2"])
+        values = features(templates, ["NOUN", "ADP", "PROPN"], "tomorrow in July", "D O D")[0]
+        reference = features(FEATURE_TEMPLATES, ["NOUN", "ADP", "PROPN"], "tomorrow in July", "D O D")[0]
+        np.testing.assert_array_equal(values, reference[[FEATURE_TEMPLATES.names.index("f11"), FEATURE_TEMPLATES.names.index("f2")]])
+        with self.assertRaises(ValueError):
+            select_templates(["f4"])
+
+    def test_unknown_keys_are_rejected(self):
+        with self.assertRaises(ValueError):
+            FeatureTemplates([{"name": "bad", "labels": {0: "T"}, "weight": 3}])
+        with self.assertRaises(ValueError):
+            FeatureTemplates([{"name": "bad", "when": [{"lemma": {0: ["go"]}}], "labels": {0: "T"}}])
+
+if __name__ == "__main__":
+    unittest.main()
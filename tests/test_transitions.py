@@ -0,0 +1,30 @@
+import itertools
+import unittest
+import numpy as np
+from src.ConditionalRandomFields.Transitions import Transitions
+
+class TestTransitions(unittest.TestCase):
+    def setUp(self):
+        self.transitions = Transitions(num_labels=4)
+        rng = np.random.default_rng(0)
+        # Three unrelated weights in front of the transition block
+        self.weights = np.r_[rng.normal(size=3), rng.normal(size=self.transitions.size)]
+
+    def test_scores_add_start_pairs_and_end(self):
+        matrix, start, end = self.transitions.unpack(self.weights, 3)
+        self.assertEqual(matrix.shape, (4, 4))
+        sequences = np.array([[0, 3, 3, 1], [2, 2, 0, 0]], dtype=np.int8)
+        expected = [start[row[0]] + sum(matrix[a, b] for a, b in zip(row[:-1], row[1:])) + end[row[-1]] for row in sequences]
+        np.testing.assert_allclose(self.transitions.scores(self.weights, 3, sequences), expected)
+        self.assertEqual(self.transitions.activations(sequences, 3).nnz, 2 * 5)
+
+    def test_viterbi_finds_the_best_sequence(self):
+        emissions = np.random.default_rng(1).normal(size=(5, 4))
+        path, score = self.transitions.viterbi(self.weights, 3, emissions)
+        sequences = np.array(list(itertools.product(range(4), repeat=5)))
+        totals = self.transitions.scores(self.weights, 3, sequences) + emissions[np.arange(5), sequences].sum(axis=1)
+        np.testing.assert_array_equal(path, sequences[totals.argmax()])
+        self.assertAlmostEqual(score, totals.max())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+import threading
+import unittest
+from unittest import mock
+from concurrent.futures import ThreadPoolExecutor
+from src.ConditionalRandomFields import Validation
+from src.ConditionalRandomFields.Validation import AsyncValidator
+
+def fake_snapshot(filename, weights, epoch, train_loss, options):
+    # The snapshot's first weight stands in for its validation loss
+    return {"epoch": epoch, "train_loss": float(train_loss), "validation_loss": float(weights[0]), "seconds": 0.0}
+
+class TestAsyncValidator(unittest.TestCase):
+    def setUp(self):
+        patches = [mock.patch.object(Validation, "ProcessPoolExecutor", ThreadPoolExecutor),
+                   mock.patch.object(Validation, "validate_snapshot", fake_snapshot)]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def test_drift_sets_should_stop(self):
+        validator = AsyncValidator(filename="unused.csv", threshold=0.5)
+        validator.submit(0, [1.1, 0.0], train_loss=1.0)
+        validator.submit(1, [2.0, 0.0], train_loss=0.9)
+        finished = validator.poll(wait=True)
+        self.assertEqual([result["epoch"] for result in finished], [0, 1])
+        self.assertTrue(validator.should_stop)
+        self.assertEqual(validator.stop_result["epoch"], 1)
+        # Later results never replace the first drift
+        validator.submit(2, [5.0], train_loss=0.1)
+        validator.close()
+        self.assertEqual(validator.stop_result["epoch"], 1)
+        self.assertEqual(validator.pending, [])
+
+    def test_no_stop_while_losses_agree(self):
+        validator = AsyncValidator(filename="unused.csv", threshold=0.5)
+        for epoch in range(3):
+            validator.submit(epoch, [1.0], train_loss=1.2)
+            validator.poll(wait=True)
+        validator.close()
+        self.assertFalse(validator.should_stop)
+        self.assertIsNone(validator.stop_result)
+        self.assertEqual(len(validator.results), 3)
+
+    def test_stale_snapshots_are_dropped(self):
+        started, release = threading.Event(), threading.Event()
+
+        def slow_snapshot(*args):
+            started.set()
+            release.wait(5)
+            return fake_snapshot(*args)
+
+        with mock.patch.object(Validation, "validate_snapshot", slow_snapshot):
+            validator = AsyncValidator(filename="unused.csv", max_pending=2)
+            validator.submit(0, [1.0], train_loss=1.0)
+            started.wait(5)
+            for epoch in range(1, 5):
+                validator.submit(epoch, [1.0], train_loss=1.0)
+                self.assertLessEqual(len(validator.pending), 2)
+            release.set()
+            validator.close()
+        self.assertEqual(validator.dropped, [1, 2, 3])
+        self.assertEqual([result["epoch"] for result in validator.results], [0, 4])
+
+if __name__ == "__main__":
+    unittest.main()
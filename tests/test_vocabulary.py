@@ -0,0 +1,29 @@
+import random
+import itertools
+import unittest
+import numpy as np
+from src.ConditionalRandomFields.Vocabulary import VOCAB
+
+class TestVocabulary(unittest.TestCase):
+    def test_labels_round_trip_as_int8(self):
+        codes = VOCAB.encode_labels(["T", "TM", "D", "O"])
+        self.assertEqual(codes.dtype, np.int8)
+        self.assertEqual(VOCAB.decode_labels(codes), ["T", "TM", "D", "O"])
+        self.assertIs(VOCAB.encode_labels(codes), codes)
+
+    def test_unknown_values(self):
+        with self.assertRaises(ValueError):
+            VOCAB.encode_labels(["T", "DATE"])
+        self.assertEqual(VOCAB.decode_tags(VOCAB.encode_tags(["NOUN", "???"])), ["NOUN", "X"])
+        np.testing.assert_array_equal(VOCAB.encode_tokens(["May", "may", "today"]) > 0, [True, False, True])
+
+    def test_candidates_match_shuffled_product(self):
+        for alphabet, length in ((["T", "TM", "D", "O"], 4), (["T", "T", "O"], 7)):
+            expected = list(itertools.islice(itertools.product(alphabet, repeat=length), 1000))
+            random.Random(3).shuffle(expected)
+            candidates = VOCAB.candidates(alphabet, length, 1000, rng=random.Random(3))
+            self.assertEqual(candidates.dtype, np.int8)
+            self.assertEqual([tuple(VOCAB.decode_labels(row)) for row in candidates], expected)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,18 @@
-from src.ConditionalRandomFields.CRF import Train
+from src.ConditionalRandomFields.CRF import Train, save_model, load_dataset
+from src.ConditionalRandomFields.CRFFunctions import Augment, TagCache, tagger_config
+from src.ConditionalRandomFields.Bundle import write_bundle
+from src.ConditionalRandomFields.Sparse import SparseWeights
+from src.ConditionalRandomFields.Checkpoint import Checkpoint
+from src.ConditionalRandomFields.Validation import AsyncValidator
+from src.ConditionalRandomFields.Sampling import HardExampleSampler
+from src.ConditionalRandomFields.Templates import FEATURE_TEMPLATES, gazetteer_templates
+from src.ConditionalRandomFields.Gazetteer import Gazetteer, DEFAULT_LEXICONS, task_names_from_events
+from src.ConditionalRandomFields.Hashing import HashedFeatures
+from src.ConditionalRandomFields.Transitions import Transitions
 import numpy as np
+import argparse
 import logging
+import random
 import sys
 import threading
 import time
@@ -12,38 +24,172 @@ import termios
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def TrainModel(epochs=50, num_features=11):
+def TrainModel(filename="data/aug_TIM.csv", epochs=50, num_features=None, seed=None, resume=False, checkpoint_path="data/checkpoint.json", checkpoint_every=500,
+               learning_rate=0.008, l2_strength=0.001, clip=0.5, drop_rate=0.2, batch_size=32, loader_workers=2, prefetch=64,
+               hard_mining=False, epoch_fraction=0.3, stream=False, rows_per_epoch=10_000, hash_bits=None,
+               transitions=False, gazetteer=None, bundle_path="data/model.crfm", tag_cache_path="data/tag_cache.json", loader_backend="thread"):
+    checkpoint = Checkpoint(checkpoint_path, every=checkpoint_every)
+    hashing = HashedFeatures(bits=hash_bits) if hash_bits else None
+    transitions = Transitions() if transitions else None
+    templates = FEATURE_TEMPLATES
+    validator = None
+    state = None
+    weights = None
     
     try: 
-        weights = np.random.rand(num_features)
-        weights = [weight * (1 - 0.1) - 0.1 for weight in weights]  
-        print(f"Initial weights({len(weights)}): {weights}")
+        if resume and checkpoint.exists():
+            state = checkpoint.load()
+            seed = state["seed"]
+            weights = state["weights"]
+            hard_mining = hard_mining or state.get("sampler") is not None
+            hashing = HashedFeatures.from_config(state["hashing"]) if state.get("hashing") else None
+            transitions = Transitions.from_config(state["transitions"]) if state.get("transitions") else None
+            if state.get("gazetteer"):
+                templates = gazetteer_templates(Gazetteer.from_config(state["gazetteer"]))
+            start_epoch = state["epoch"]
+            print(f"♻️ Resuming from {checkpoint_path}: epoch {start_epoch + 1}, row {state['row']}")
+        else:
+            if resume:
+                logger.warning(f"No checkpoint found at {checkpoint_path}, starting a fresh run")
+            if seed is None:
+                seed = random.SystemRandom().randrange(2**31)
+            random.seed(seed)
+            np.random.seed(seed)
+            start_epoch = 0
+            if gazetteer:
+                # Task names from the calendar history join the month/weekday/relative-date/time lexicons
+                templates = gazetteer_templates(Gazetteer({**DEFAULT_LEXICONS, "task": task_names_from_events(gazetteer)}))
+                print(f"📖 Gazetteer features {templates.names[FEATURE_TEMPLATES.size:]} with {len(templates.gazetteer.lexicons['task'])} task names from {gazetteer}")
+            weights = np.random.rand(num_features or templates.size)
+            weights = [weight * (1 - 0.1) - 0.1 for weight in weights]  
+            print(f"Initial weights({len(weights)}) [seed={seed}]: {weights}")
+            if hashing is not None:
+                # Hashed lexical weights start at zero after the template weights
+                weights = weights + [0.0] * hashing.size
+                print(f"➕ {hashing.size} hashed word/suffix/shape weights ({hash_bits} bits)")
+            if transitions is not None:
+                # Transition weights start at zero after the hashed ones
+                weights = weights + [0.0] * transitions.size
+                print(f"➕ {transitions.size} label-transition weights")
+
+        if state is not None and (state.get("stopped") or start_epoch >= epochs):
+            # Nothing left to train: the checkpoint is the end of a finished (or early-stopped) run
+            reason = f"stopped early after epoch {state['stopped']['epoch'] + 1}" if state.get("stopped") else f"all {start_epoch} epochs done"
+            print(f"✅ {checkpoint_path} is from a finished run ({reason}); exporting its weights without training")
+            export_weights(weights, templates, hashing, transitions, bundle_path)
+            return
         
-        for epoch in range(epochs):
+        validator = AsyncValidator(filename=filename, options={"learning_rate": learning_rate, "l2_strength": l2_strength, "clip": (-clip, clip),
+                                                               "hashing": hashing, "transitions": transitions, "templates": templates})
+        sampler = HardExampleSampler(epoch_fraction=epoch_fraction, seed=seed) if hard_mining else None
+        if sampler is not None and state is not None and state.get("sampler"):
+            sampler.load_state_dict(state["sampler"])
+
+        tag_cache = None
+        if tag_cache_path:
+            # Tag every file row once with batched nlp.pipe, so loader workers only look tags up
+            tag_cache = TagCache(tag_cache_path).build(load_dataset(filename)["full_text"].tolist())
+            tag_cache.save(tag_cache_path)
+
+        augmenter = None
+        if stream:
+            augmenter = Augment(seed=seed)
+
+        for epoch in range(start_epoch, epochs):
             print(f"\r🏋️‍♂️ Epoch {epoch + 1}/{epochs} - Starting training...", end="", flush=True)
             
-            trainer = Train(weights=weights)
+            trainer = Train(weights=weights, filename=filename, seed=seed, epoch=epoch, checkpoint=checkpoint, learning_rate=learning_rate,
+                            l2_strength=l2_strength, clip=(-clip, clip), drop_rate=drop_rate, batch_size=batch_size,
+                            loader_workers=loader_workers, prefetch=prefetch, loader_backend=loader_backend, tag_cache=tag_cache, sampler=sampler, hashing=hashing, transitions=transitions, templates=templates,
+                            stream=augmenter.stream(seed=None if seed is None else seed + epoch) if augmenter is not None else None, rows_per_epoch=rows_per_epoch)
+            if state is not None and state["epoch"] == epoch:
+                trainer.resume(state)
             trainer.train()
             weights = trainer.weights
             
-            print(f"\r🏁 Epoch {epoch + 1}/{epochs} completed! Current weights: {weights}    ", 
+            print(f"\r🏁 Epoch {epoch + 1}/{epochs} completed! Current weights: {weights[:trainer.templates.size]}    ", 
                   end="", flush=True)
             
-            time.sleep(0.5)
-            
-            trainer.validation()
-            if abs(trainer.validation_avg_loss - trainer.avg_loss) > 0.75:
-                print(f"\n⚠️ Validation loss drifted significantly: {trainer.validation_avg_loss:.4f} vs {trainer.avg_loss:.4f}. Early stopping...", end="", flush=True)
+            validator.submit(epoch, weights, trainer.avg_loss)
+            state = None
+            report_validation(validator.poll())
+            epoch_state = trainer.checkpoint_state(row=0)
+            epoch_state.update({"epoch": epoch + 1, "progress": {"sum_loss": 0.0, "count": 0}})
+            if validator.should_stop:
+                # --resume must not train past an early stop
+                epoch_state["stopped"] = validator.stop_result
+            checkpoint.save(epoch_state)
+
+            if validator.should_stop:
+                stop = validator.stop_result
+                print(f"\n⚠️ Validation loss drifted significantly after epoch {stop['epoch'] + 1}: {stop['validation_loss']:.4f} vs {stop['train_loss']:.4f}. Early stopping...", end="", flush=True)
                 break
         
+        report_validation(validator.poll(wait=True))
         print()  
         trainer.save_weights()
+        if bundle_path:
+            trainer.save_bundle(bundle_path)
         
     except KeyboardInterrupt:
-        print(f"\n🔥 Training interrupted by Ctrl+C --> Current Weights: {weights}")
+        print(f"\n🔥 Training interrupted by Ctrl+C --> Current Weights: {weights[:templates.size] if weights is not None else None}")
+        print(f"♻️ Run again with --resume to continue from {checkpoint_path}")
     except Exception as e:
         print(f"\n❌ Training failed with error: {e}")
+    finally:
+        if validator is not None:
+            validator.close(wait=False)
+
+def export_weights(weights, templates, hashing, transitions, bundle_path, filename="data/weights.json"):
+    weights = SparseWeights.load(weights)
+    save_model(filename, weights, templates, hashing, transitions)
+    print(f"💾 Weights saved to {filename}")
+    if bundle_path:
+        write_bundle(bundle_path, weights.dense(), templates, hashing, transitions, tagger=tagger_config())
+
+def report_validation(results):
+    for result in results:
+        print(f"\n🧪 Validation for epoch {result['epoch'] + 1}: 📉 Avg. Loss {result['validation_loss']:.4f} "
+              f"(train {result['train_loss']:.4f}) in {result['seconds']:.1f}s", end="", flush=True)
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the CRF task classifier")
+    parser.add_argument("--data", default="data/aug_TIM.csv", help="Training data (e.g. a compacted data/aug_TIM.compact.csv)")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--num-features", type=int, default=None, help="Weight count (defaults to one per feature template)")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for weight init, data sampling and dropout")
+    parser.add_argument("--resume", action="store_true", help="Continue from the last checkpoint")
+    parser.add_argument("--checkpoint", default="data/checkpoint.json", help="Checkpoint file path")
+    parser.add_argument("--checkpoint-every", type=int, default=500, help="Rows between checkpoints")
+    parser.add_argument("--learning-rate", type=float, default=0.008)
+    parser.add_argument("--l2-strength", type=float, default=0.001)
+    parser.add_argument("--clip", type=float, default=0.5, help="Weights are clipped to [-clip, clip]")
+    parser.add_argument("--drop-rate", type=float, default=0.2)
+    parser.add_argument("--batch-size", type=int, default=32, help="Rows per dropout-mask batch")
+    parser.add_argument("--loader-workers", type=int, default=2, help="Featurization workers (0 = featurize inline)")
+    parser.add_argument("--loader-backend", choices=["thread", "process"], default="thread",
+                        help="Featurize in threads (cached tags) or processes (spaCy tagging of streamed rows in parallel)")
+    parser.add_argument("--tag-cache", default="data/tag_cache.json", help="POS tag cache for the --data rows ('' to tag on the fly)")
+    parser.add_argument("--prefetch", type=int, default=64, help="Rows featurized ahead of the gradient step")
+    parser.add_argument("--hard-mining", action="store_true", help="Sample later epochs in proportion to per-row loss")
+    parser.add_argument("--epoch-fraction", type=float, default=0.3, help="Share of training rows drawn per hard-mining epoch")
+    parser.add_argument("--stream", action="store_true", help="Train on examples augmented on the fly instead of the --data file (still used for validation)")
+    parser.add_argument("--rows-per-epoch", type=int, default=10_000, help="Streamed examples per epoch")
+    parser.add_argument("--hash-bits", type=int, default=None, help="Add hashed word/suffix/shape features with 2**bits weights")
+    parser.add_argument("--transitions", action="store_true", help="Learn a label-transition matrix with start/end weights")
+    parser.add_argument("--bundle", default="data/model.crfm", help="Also write a binary model bundle here ('' to skip)")
+    parser.add_argument("--gazetteer", nargs="?", const="data/training-events.csv", default=None,
+                        help="Add lexicon (gazetteer) features, with task names from this calendar-history file")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    TrainModel()
+    args = parse_args()
+    TrainModel(filename=args.data, epochs=args.epochs, num_features=args.num_features, seed=args.seed, resume=args.resume,
+               checkpoint_path=args.checkpoint, checkpoint_every=args.checkpoint_every, learning_rate=args.learning_rate,
+               l2_strength=args.l2_strength, clip=args.clip, drop_rate=args.drop_rate,
+               batch_size=args.batch_size, loader_workers=args.loader_workers, prefetch=args.prefetch,
+               hard_mining=args.hard_mining, epoch_fraction=args.epoch_fraction,
+               stream=args.stream, rows_per_epoch=args.rows_per_epoch, hash_bits=args.hash_bits,
+               transitions=args.transitions, gazetteer=args.gazetteer,
+               bundle_path=args.bundle, tag_cache_path=args.tag_cache, loader_backend=args.loader_backend)
     print("✅ Model training completed successfully!")
\ No newline at end of file